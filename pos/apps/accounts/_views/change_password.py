@@ -1,7 +1,7 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
-from django.contrib.auth import authenticate,update_session_auth_hash
+from django.contrib.auth import authenticate
 from django.contrib.auth.hashers import check_password
 from django.conf import settings
 
@@ -49,7 +49,6 @@ class ChangePasswordView(APIView):
         user.set_password(new_password)
         user.save()
 
-        update_session_auth_hash(request, user)
         self.send_confirmation_email(user)
         
 
@@ -1,14 +1,16 @@
 import os
 from django.shortcuts import get_object_or_404
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Q
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from pos.apps.accounts.models import User
+from pos.apps.accounts.outbox import queue_email
+from pos.apps.accounts.tokens import bump_token_version
 from pos.apps.locations.models import LocationModel
+from pos.utils.permissions import allowed_location_ids
 from pos.utils.logger import POSLogger
-from django.core.mail import send_mail
 from django.conf import settings
 from django.template.loader import render_to_string
 
@@ -33,14 +35,13 @@ def send_welcome_mail(user):
         }
     )
 
-    logger.info(f"Welcome mail being sent to {user.email}")
+    logger.info(f"Welcome mail queued for {user.email}")
 
-    send_mail(
+    queue_email(
         subject=subject,
         message=text_body,
         from_email=from_email,
         recipient_list=to_list,
-        fail_silently=False,
         html_message=html_body
     )
 
@@ -56,32 +57,34 @@ class FranchiseAdminView(APIView):
             return Response({'error': f'Missing fields: {", ".join(missing)}'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            franchise_admin = User.objects.create_user(
-                email=request.data['email'],
-                first_name=request.data['first_name'],
-                last_name=request.data['last_name'],
-                is_franchise_admin=True,
-                created_by=request.user
-            )
-
-            location_ids = request.data.get('location_ids', [])
-            if not isinstance(location_ids, list):
-                franchise_admin.delete()
-                return Response({'error': 'location_ids must be a list'}, status=status.HTTP_400_BAD_REQUEST)
-
-            if request.user.is_franchise_admin:
-                user_locations = set(request.user.locations.values_list('id', flat=True))
-                if not all(loc_id in user_locations for loc_id in location_ids):
+            # The user, its locations and the queued welcome mail commit together
+            with transaction.atomic():
+                franchise_admin = User.objects.create_user(
+                    email=request.data['email'],
+                    first_name=request.data['first_name'],
+                    last_name=request.data['last_name'],
+                    is_franchise_admin=True,
+                    created_by=request.user
+                )
+
+                location_ids = request.data.get('location_ids', [])
+                if not isinstance(location_ids, list):
                     franchise_admin.delete()
-                    return Response({'error': 'Invalid location access'}, status=status.HTTP_403_FORBIDDEN)
+                    return Response({'error': 'location_ids must be a list'}, status=status.HTTP_400_BAD_REQUEST)
 
-            locations = LocationModel.objects.filter(id__in=location_ids)
-            if len(locations) != len(location_ids):
-                franchise_admin.delete()
-                return Response({'error': 'Invalid location IDs'}, status=status.HTTP_400_BAD_REQUEST)
+                if request.user.is_franchise_admin:
+                    user_locations = allowed_location_ids(request.user)
+                    if not all(loc_id in user_locations for loc_id in location_ids):
+                        franchise_admin.delete()
+                        return Response({'error': 'Invalid location access'}, status=status.HTTP_403_FORBIDDEN)
 
-            franchise_admin.locations.set(locations)
-            send_welcome_mail(franchise_admin)
+                locations = LocationModel.objects.filter(id__in=location_ids)
+                if len(locations) != len(location_ids):
+                    franchise_admin.delete()
+                    return Response({'error': 'Invalid location IDs'}, status=status.HTTP_400_BAD_REQUEST)
+
+                franchise_admin.locations.set(locations)
+                send_welcome_mail(franchise_admin)
 
             return Response({
                 'id': franchise_admin.id,
@@ -105,7 +108,7 @@ class FranchiseAdminView(APIView):
             try:
                 admin = get_object_or_404(User, id=admin_id, is_franchise_admin=True)
                 if request.user.is_franchise_admin:
-                    user_locations = set(request.user.locations.values_list('id', flat=True))
+                    user_locations = allowed_location_ids(request.user)
                     admin_locations = set(admin.locations.values_list('id', flat=True))
                     if not (admin == request.user or user_locations & admin_locations or admin.created_by == request.user):
                         return Response({'error': 'No access'}, status=status.HTTP_403_FORBIDDEN)
@@ -124,7 +127,7 @@ class FranchiseAdminView(APIView):
                 if request.user.is_super_admin:
                     franchise_admins = User.objects.filter(is_franchise_admin=True)
                 elif request.user.is_franchise_admin:
-                    user_locations = set(request.user.locations.values_list('id', flat=True))
+                    user_locations = allowed_location_ids(request.user)
                     franchise_admins = User.objects.filter(
                         Q(is_franchise_admin=True) &
                         (Q(locations__id__in=user_locations) | Q(created_by=request.user))
@@ -163,7 +166,7 @@ class FranchiseAdminView(APIView):
             # 2. Location access check - same as POST
             if request.user.is_franchise_admin:
                 # Can only modify admins that share at least one location
-                if not admin.locations.filter(id__in=request.user.locations.all()).exists():
+                if not admin.locations.filter(id__in=allowed_location_ids(request.user)).exists():
                     logger.warning(f"Location mismatch between user {request.user.id} and admin {admin.id}")
                     return Response({'error': 'No shared locations'}, 
                                 status=status.HTTP_403_FORBIDDEN)
@@ -177,7 +180,7 @@ class FranchiseAdminView(APIView):
                                 status=status.HTTP_400_BAD_REQUEST)
                 
                 if request.user.is_franchise_admin:
-                    user_locations = set(request.user.locations.values_list('id', flat=True))
+                    user_locations = allowed_location_ids(request.user)
                     if not set(location_ids).issubset(user_locations):
                         logger.warning(f"User {request.user.id} tried assigning invalid locations")
                         return Response({'error': 'Invalid location access'}, 
@@ -197,6 +200,10 @@ class FranchiseAdminView(APIView):
                     setattr(admin, field, request.data[field])
                     logger.info(f"Updated {field} for admin {admin.id}")
 
+            # Issued tokens carry the admin's email and locations
+            if 'location_ids' in request.data or 'email' in request.data:
+                bump_token_version(admin)
+
             admin.save()
             return Response({'message': 'Franchise admin updated'})
 
@@ -216,6 +223,7 @@ class FranchiseAdminView(APIView):
                 return Response({'error': 'No access'}, status=status.HTTP_403_FORBIDDEN)
 
             admin_email = admin.email
+            bump_token_version(admin)
             admin.delete()
             logger.warning(f"Franchise admin {admin_email} deleted by {request.user.email}")
             return Response({'message': 'Franchise admin permanently deleted'}, status=status.HTTP_204_NO_CONTENT)
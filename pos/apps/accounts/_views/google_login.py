@@ -1,13 +1,12 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from pos.utils.logger import POSLogger
+from pos.apps.accounts.google_certs import verify_google_id_token
+from pos.apps.accounts.tokens import get_tokens_for_user
 from pos.apps.locations.models import LocationModel as Location
 
 
@@ -32,12 +31,8 @@ class GoogleLoginView(APIView):
             return Response({'error': 'No token provided.'}, status=status.HTTP_400_BAD_REQUEST)
         logger.info(f"Received token: {token[:20]}...")
         try:
-            # Verify the token with Google's OAuth2 API
-            idinfo = id_token.verify_oauth2_token(
-                token,
-                google_requests.Request(),
-                settings.GOOGLE_CLIENT_ID
-            )
+            # Verify the token against Google's cached signing certificates
+            idinfo = verify_google_id_token(token, settings.GOOGLE_CLIENT_ID)
 
             # Verify issuer
             if idinfo['iss'] not in ['accounts.google.com', 'https://accounts.google.com']:
@@ -69,17 +64,15 @@ class GoogleLoginView(APIView):
                 )
             
             # Issue our own JWT tokens
-            refresh = RefreshToken.for_user(user)
-            access_token = str(refresh.access_token)
-            refresh_token = str(refresh)
+            tokens = get_tokens_for_user(user)
             if not user.is_super_admin:
                 user_locations = user.locations.filter(is_active=True)
             else:
                 user_locations = Location.objects.all()
 
             return Response({
-                'access': access_token,
-                'refresh': refresh_token,
+                'access': tokens['access'],
+                'refresh': tokens['refresh'],
                 'user': {
                     'id': user.id,
                     'email': user.email,
@@ -1,19 +1,116 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.http import JsonResponse
-from django.contrib.auth import authenticate
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, is_password_usable, make_password
+from django.utils.crypto import salted_hmac
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.response import Response
 from rest_framework import status
+from pos.apps.accounts.metrics import LatencyHistogram
+from pos.apps.accounts.tokens import get_tokens_for_user
 from pos.apps.locations.models import LocationModel as Location
+from pos.utils.permissions import IsSuperAdmin
+from pos.utils.throttling import TokenBucketThrottle, TokenBuckets
 
 User = get_user_model()
 
+# Password hashing runs here instead of on the thread that serves sync code
+# under ASGI, so concurrent logins hash in parallel
+hasher_pool = ThreadPoolExecutor(max_workers=settings.LOGIN_HASHER_THREADS, thread_name_prefix='login-hasher')
+login_latency = LatencyHistogram(settings.LOGIN_LATENCY_BUCKETS)
+
+
+def verify_password(password, encoded):
+    """
+    Returns (valid, new_hash). new_hash is set when the stored hash uses
+    another algorithm or cost than the preferred hasher and should be
+    replaced. Pure CPU, so it is safe to run in hasher_pool.
+    """
+    if encoded is None or not is_password_usable(encoded):
+        # Hash anyway so unknown emails take as long as wrong passwords
+        make_password(password)
+        return False, None
+    if not check_password(password, encoded):
+        return False, None
+    preferred = get_hasher('default')
+    if identify_hasher(encoded).algorithm != preferred.algorithm or preferred.must_update(encoded):
+        return True, make_password(password)
+    return True, None
+
+
+def load_login_user(email):
+    """User with locations prefetched, or None"""
+    return User.objects.prefetch_related('locations').filter(email=email).first()
+
+
+def login_response(user):
+    """Tokens plus the user and location payload returned by every login"""
+    locations = list(user.locations.all())
+    tokens = get_tokens_for_user(user, location_ids=[location.id for location in locations])
+
+    if user.is_super_admin:
+        user_locations = Location.objects.all()
+    else:
+        user_locations = [location for location in locations if location.is_active]
+
+    return {
+        **tokens,
+        'user': {
+            'id': user.id,
+            'email': user.email,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'is_super_admin': user.is_super_admin,
+            'is_franchise_admin': user.is_franchise_admin,
+            'is_staff_member': user.is_staff_member,
+        },
+        'locations' : [
+            {
+                'id': location.id,
+                'name': location.name
+            } for location in user_locations
+        ]
+    }
+
+
+location_login_buckets = TokenBuckets()
+
+
+class LocationLoginThrottle(TokenBucketThrottle):
+    buckets = location_login_buckets
+    rate_setting = 'LOCATION_LOGIN_THROTTLE_RATE'
+    burst_setting = 'LOCATION_LOGIN_THROTTLE_BURST'
+
+
+def location_login_cache_key(location, location_password):
+    # Keyed by the stored hash too, so changing the secret drops every entry
+    digest = salted_hmac('location-login', f'{location.password}:{location_password}').hexdigest()
+    return f'accounts:location_login:{location.id}:{digest}'
+
+
 class LocationLoginView(APIView):
-    """First step for staff - verify location credentials"""
+    """
+    First step for staff - verify location credentials.
+
+    Successful verifications are cached for LOCATION_LOGIN_CACHE_TIMEOUT, so
+    terminal boots cost one indexed lookup instead of a password hash, and
+    LocationLoginThrottle rate limits each client.
+    """
     permission_classes = [AllowAny]
     authentication_classes = []  # Disable authentication for this view
+    throttle_classes = [LocationLoginThrottle]
+
     def post(self, request):
         location_name = request.data.get('location_name')
         location_password = request.data.get('location_password')
@@ -25,9 +122,14 @@ class LocationLoginView(APIView):
             )
         
         try:
-            location = Location.objects.get(name=location_name, is_active=True)
-            if location.password != location_password: 
-                raise Location.DoesNotExist
+            location = Location.objects.only('id', 'name', 'password').get(name=location_name, is_active=True)
+            cache_key = location_login_cache_key(location, location_password)
+            if not cache.get(cache_key):
+                if not location.check_password(location_password):
+                    raise Location.DoesNotExist
+                # check_password may have rehashed the secret
+                cache_key = location_login_cache_key(location, location_password)
+                cache.set(cache_key, True, settings.LOCATION_LOGIN_CACHE_TIMEOUT)
                 
             return Response({
                 'success': True,
@@ -40,28 +142,47 @@ class LocationLoginView(APIView):
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
-class UserLoginView(APIView):
-    """Handles both staff and admin logins"""
-    permission_classes = [AllowAny]
-    authentication_classes = []  # Disable authentication for this view
+@method_decorator(csrf_exempt, name='dispatch')
+class UserLoginView(View):
+    """
+    Handles both staff and admin logins.
+
+    This is an async view so that a shift change burst of logins is not
+    serialized behind one sync thread: database work goes through
+    sync_to_async and the password check runs in hasher_pool. Hashes made
+    with an outdated algorithm or cost are replaced on successful login.
+    Each attempt is timed into login_latency (see LoginMetricsView).
+    """
     def get_tokens_for_user(self, user):
-        refresh = RefreshToken.for_user(user)
-        return {
-            'refresh': str(refresh),
-            'access': str(refresh.access_token),
-        }
-    
-    def post(self, request):
-        email = request.data.get('email')
-        password = request.data.get('password')
+        return get_tokens_for_user(user)
+
+    async def post(self, request):
+        started = time.perf_counter()
+        try:
+            return await self.login(request)
+        finally:
+            login_latency.observe(time.perf_counter() - started)
+
+    def parse_body(self, request):
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body or b'{}')
+            except ValueError:
+                return {}
+            return data if isinstance(data, dict) else {}
+        return request.POST
+
+    async def login(self, request):
+        data = self.parse_body(request)
+        email = data.get('email')
+        password = data.get('password')
 
-        
         if not email or not password:
-            return Response(
+            return JsonResponse(
                 {'error': 'Email and password are required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
+
         # just for testing in development
 
         test_email = "franchiseadmin@gmail.com"
@@ -69,70 +190,43 @@ class UserLoginView(APIView):
 
         if email == test_email and password == test_password:
             # Only in development! Add check if needed
-            user, created = User.objects.get_or_create(
-                email=test_email,
-                defaults={
-                    'first_name': 'franchise',
-                    'last_name': 'admin',
-                    'is_super_admin': False,
-                    'is_franchise_admin': True,
-                    'is_staff_member': False,
-                }
-            )
-            # You can set a password if you want, but it's not necessary for dev
-            tokens = self.get_tokens_for_user(user)
-            user_locations = user.locations.filter(is_active=True)
-            response_data = {
-                **tokens,
-                'user': {
-                    'id': user.id,
-                    'email': user.email,
-                    'first_name': user.first_name,
-                    'last_name': user.last_name,
-                    'is_super_admin': user.is_super_admin,
-                    'is_franchise_admin': user.is_franchise_admin,
-                    'is_staff_member': user.is_staff_member,
-                },
-                'locations' : [
-                    {
-                        'id': location.id,
-                        'name': location.name
-                    } for location in user_locations
-                ]
-            }
-            return Response(response_data)
+            return JsonResponse(await sync_to_async(self.development_login)(test_email))
 
-        # 2. Normal login 
-        user = authenticate(username=email, password=password)
-        if not user or not user.is_active:
-            return Response(
+        # 2. Normal login
+        user = await sync_to_async(load_login_user)(email)
+        valid, new_hash = await asyncio.get_running_loop().run_in_executor(
+            hasher_pool, verify_password, password, user.password if user else None
+        )
+        if not valid or not user.is_active:
+            return JsonResponse(
                 {'error': 'Invalid credentials'},
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
-        tokens = self.get_tokens_for_user(user)
-
-        if user.is_super_admin:
-            user_locations = Location.objects.all()
-        else:
-            user_locations = user.locations.filter(is_active=True)
-
-        response_data = {
-            **tokens,
-            'user': {
-                'id': user.id,
-                'email': user.email,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'is_super_admin': user.is_super_admin,
-                'is_franchise_admin': user.is_franchise_admin,
-                'is_staff_member': user.is_staff_member,
-            },
-            'locations' : [
-                {
-                    'id': location.id,
-                    'name': location.name
-                } for location in user_locations
-            ]
-        }
-        return Response(response_data)
+        if new_hash:
+            user.password = new_hash
+            await sync_to_async(user.save)(update_fields=['password'])
+
+        return JsonResponse(await sync_to_async(login_response)(user))
+
+    def development_login(self, test_email):
+        user, created = User.objects.get_or_create(
+            email=test_email,
+            defaults={
+                'first_name': 'franchise',
+                'last_name': 'admin',
+                'is_super_admin': False,
+                'is_franchise_admin': True,
+                'is_staff_member': False,
+            }
+        )
+        # You can set a password if you want, but it's not necessary for dev
+        return login_response(User.objects.prefetch_related('locations').get(pk=user.pk))
+
+
+class LoginMetricsView(APIView):
+    """Login latency histogram of this worker process (super admins only)"""
+    permission_classes = [IsSuperAdmin]
+
+    def get(self, request):
+        return Response(login_latency.snapshot())
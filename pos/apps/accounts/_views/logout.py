@@ -1,5 +1,7 @@
 """Logout views"""
 
+from datetime import datetime, timezone as dt_timezone
+
 from django.http import JsonResponse
 from django.utils.timezone import now
 from rest_framework import status
@@ -8,6 +10,7 @@ from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import AccessToken
 
 from pos.apps.accounts.models import BlacklistedToken  # Adjust import path as needed
+from pos.apps.accounts.blacklist import jti_blacklist
 from pos.utils.logger import POSLogger
 
 logger = POSLogger(__name__)
@@ -21,7 +24,10 @@ class LogoutView(APIView):
             access_token = AccessToken(access_token_str)
             
             # Blacklist the token
-            BlacklistedToken.objects.create(jti=access_token["jti"], blacklisted_on=now())
+            # Rows are only needed until the token would have expired anyway
+            expires_at = datetime.fromtimestamp(access_token["exp"], tz=dt_timezone.utc)
+            BlacklistedToken.objects.create(jti=access_token["jti"], blacklisted_on=now(), expires_at=expires_at)
+            jti_blacklist.add(access_token["jti"], expires_at)
             
             user = request.user
             user.is_logged_in = False
@@ -3,7 +3,9 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from pos.apps.accounts.models import User
+from pos.apps.accounts.tokens import bump_token_version
 from pos.apps.locations.models import LocationModel
+from pos.utils.permissions import allowed_location_ids
 from pos.utils.logger import POSLogger
 
 logger = POSLogger(__name__)
@@ -73,9 +75,7 @@ class StaffView(APIView):
         
         # Franchise admin can create staff only for locations they have access to
         elif request.user.is_franchise_admin:
-            admin = get_object_or_404(User, id=request.user.id, is_franchise_admin=True)
-            admin_locations = list(admin.locations.values('id'))
-            admin_location_ids = [loc['id'] for loc in admin_locations]
+            admin_location_ids = allowed_location_ids(request.user)
             
             # Check if all requested locations are in admin's accessible locations
             if not all(loc_id in admin_location_ids for loc_id in location_ids):
@@ -138,11 +138,8 @@ class StaffView(APIView):
                 
                 # Check if user has access to view this staff member
                 if request.user.is_franchise_admin:
-                    admin_locations = request.user.locations.all()
-                    staff_locations = staff.locations.all()
-                    
                     # Check if there's an overlap in locations
-                    if not any(loc in admin_locations for loc in staff_locations):
+                    if not allowed_location_ids(request.user) & set(staff.locations.values_list('id', flat=True)):
                         logger.warning(f"Franchise admin {request.user.email} attempted to access unauthorized staff {staff.email}")
                         return Response(
                             {'error': 'You do not have access to this staff member'},
@@ -189,12 +186,10 @@ class StaffView(APIView):
             
             elif request.user.is_franchise_admin:
                 # Franchise admin can only see staff members in their locations
-                admin = get_object_or_404(User, id=request.user.id, is_franchise_admin=True)
-                
                 # Get all staff members that have access to any of the admin's locations
                 staff_query = User.objects.filter(
                     is_staff_member=True,
-                    locations__in=admin.locations.all()
+                    locations__id__in=allowed_location_ids(request.user)
                 ).distinct()
                 
                 # Further filter by location_id if provided
@@ -237,11 +232,8 @@ class StaffView(APIView):
             
             # Check if franchise admin has access to this staff member
             if request.user.is_franchise_admin:
-                admin_locations = request.user.locations.all()
-                staff_locations = staff.locations.all()
-                
                 # Check if there's an overlap in locations
-                if not any(loc in admin_locations for loc in staff_locations):
+                if not allowed_location_ids(request.user) & set(staff.locations.values_list('id', flat=True)):
                     logger.warning(f"Franchise admin {request.user.email} attempted to update unauthorized staff {staff.email}")
                     return Response(
                         {'error': 'You do not have access to this staff member'},
@@ -250,7 +242,7 @@ class StaffView(APIView):
                 
                 # If updating locations, ensure franchise admin has access to all new locations
                 if 'location_ids' in request.data:
-                    admin_location_ids = [loc.id for loc in admin_locations]
+                    admin_location_ids = allowed_location_ids(request.user)
                     if not all(loc_id in admin_location_ids for loc_id in request.data['location_ids']):
                         logger.warning(f"Franchise admin {request.user.email} attempted to assign staff to unauthorized locations")
                         return Response(
@@ -288,6 +280,10 @@ class StaffView(APIView):
             if 'password' in request.data:
                 staff.set_password(request.data['password'])
             
+            # Issued tokens carry the staff member's email and locations
+            if 'location_ids' in request.data or 'email' in request.data:
+                bump_token_version(staff)
+            
             staff.save()
             
             # Return updated staff data with locations
@@ -321,11 +317,8 @@ class StaffView(APIView):
             
             # Check if franchise admin has access to this staff member
             if request.user.is_franchise_admin:
-                admin_locations = request.user.locations.all()
-                staff_locations = staff.locations.all()
-                
                 # Check if there's an overlap in locations
-                if not any(loc in admin_locations for loc in staff_locations):
+                if not allowed_location_ids(request.user) & set(staff.locations.values_list('id', flat=True)):
                     logger.warning(f"Franchise admin {request.user.email} attempted to delete unauthorized staff {staff.email}")
                     return Response(
                         {'error': 'You do not have access to this staff member'},
@@ -333,6 +326,7 @@ class StaffView(APIView):
                     )
             
             staff_email = staff.email
+            bump_token_version(staff)
             staff.delete()
             logger.warning(f"Staff member {staff_email} deleted by {request.user.email}")
             return Response(
@@ -17,16 +17,26 @@ class CustomTokenRefreshView(TokenRefreshView):
         
         try:
             # Check if token is in blacklist before attempting refresh
-            from pos.apps.accounts.models import BlacklistedToken
+            from pos.apps.accounts.blacklist import is_blacklisted
+            from pos.apps.accounts.tokens import token_is_current
             from rest_framework_simplejwt.tokens import RefreshToken
             token = RefreshToken(refresh_token)
             
-            if BlacklistedToken.objects.filter(jti=token.get('jti')).exists():
+            if is_blacklisted(token.get('jti')):
                 logger.warning(f"Attempt to use blacklisted refresh token with JTI: {token.get('jti')}")
                 return Response(
                     {"error": "This refresh token has been invalidated"}, 
                     status=status.HTTP_401_UNAUTHORIZED
                 )
+
+            # Access tokens copy the refresh token's claims, which are stale
+            # once the user's email or locations have changed
+            if 'token_version' in token and not token_is_current(token):
+                logger.warning(f"Attempt to refresh outdated token for user {token.get('user_id')}")
+                return Response(
+                    {"error": "Your access has changed. Please log in again."},
+                    status=status.HTTP_401_UNAUTHORIZED
+                )
             
             response = super().post(request, *args, **kwargs)
             logger.info("Token refresh successful")
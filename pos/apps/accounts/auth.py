@@ -1,11 +1,17 @@
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
-from pos.apps.accounts.models import BlacklistedToken  
+from pos.apps.accounts.blacklist import is_blacklisted
+from pos.apps.accounts.tokens import token_is_current, user_from_claims
 from pos.utils.logger import POSLogger
 
 logger = POSLogger(__name__)
 
 class BlacklistJWTAuthentication(JWTAuthentication):
+    """
+    The API's only authenticator: decodes the JWT once, rejects blacklisted
+    tokens and builds request.user from the token claims (see
+    pos.apps.accounts.tokens), so most requests never load the User row.
+    """
     def get_validated_token(self, raw_token):
         """
         Overrides the parent method to check if the token has been blacklisted
@@ -13,11 +19,21 @@ class BlacklistJWTAuthentication(JWTAuthentication):
         # First validate the token using parent method
         validated_token = super().get_validated_token(raw_token)
 
-        print(f"Checking token with JTI: {validated_token['jti']}")
-        
-        # Check if token is blacklisted
-        if BlacklistedToken.objects.filter(jti=validated_token["jti"]).exists():
+        # Check if token is blacklisted (in-memory, see pos.apps.accounts.blacklist)
+        if is_blacklisted(validated_token["jti"]):
             logger.warning(f"Attempt to use blacklisted token: {validated_token['jti']}")
             raise InvalidToken("Session ended. Please log in again to access this resource.")
             
-        return validated_token
\ No newline at end of file
+        return validated_token
+
+    def get_user(self, validated_token):
+        user = user_from_claims(validated_token)
+        if user is None:
+            # Tokens issued before identity claims were added
+            return super().get_user(validated_token)
+
+        # Claims go stale once the user's email or locations change
+        if not token_is_current(validated_token):
+            logger.warning(f"Attempt to use outdated token for user {user.pk}")
+            raise InvalidToken("Your access has changed. Please log in again.")
+        return user
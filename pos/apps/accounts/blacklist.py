@@ -0,0 +1,104 @@
+"""
+In-process cache of blacklisted token JTIs.
+
+Every worker keeps the JTIs of still-valid blacklisted tokens in memory and
+pulls rows added since its high-water mark (the largest BlacklistedToken id
+seen) at most once per JTI_BLACKLIST_REFRESH_INTERVAL seconds. Ids can commit
+out of order, so each refresh also re-reads rows blacklisted within
+JTI_BLACKLIST_REFRESH_MARGIN seconds before the previous one. Checking a
+token is a dict lookup; LogoutView adds the JTI to the local cache straight
+away, and other workers see it on their next refresh.
+"""
+
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from pos.apps.accounts.models import BlacklistedToken
+
+
+class JTIBlacklist:
+    def __init__(self):
+        self.expiries = {}
+        self.high_water_mark = 0
+        self.scanned_at = None
+        self.refreshed_at = None
+        self.lock = threading.Lock()
+
+    def default_expiry(self, blacklisted_on):
+        # Rows without expires_at are kept for as long as any token could live
+        return blacklisted_on + settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME']
+
+    def refresh(self, force=False):
+        """Load rows added since the high-water mark and forget expired JTIs"""
+        interval = settings.JTI_BLACKLIST_REFRESH_INTERVAL
+        if not force and self.refreshed_at is not None and time.monotonic() - self.refreshed_at < interval:
+            return
+
+        with self.lock:
+            if not force and self.refreshed_at is not None and time.monotonic() - self.refreshed_at < interval:
+                return
+
+            current = timezone.now()
+            new_rows = Q(id__gt=self.high_water_mark)
+            if self.scanned_at is not None:
+                # A row with a lower id can commit after higher ones were read.
+                # blacklisted_on is set before the commit, so look back a margin.
+                margin = timedelta(seconds=settings.JTI_BLACKLIST_REFRESH_MARGIN)
+                new_rows |= Q(blacklisted_on__gte=self.scanned_at - margin)
+
+            # Rows of tokens that expired cannot block anything, so they are never read
+            rows = live_blacklist_rows(current).filter(new_rows).order_by('id').values_list(
+                'id', 'jti', 'expires_at', 'blacklisted_on'
+            )
+            for row_id, jti, expires_at, blacklisted_on in rows:
+                self.expiries[jti] = expires_at or self.default_expiry(blacklisted_on)
+                self.high_water_mark = max(self.high_water_mark, row_id)
+
+            self.expiries = {jti: expires_at for jti, expires_at in self.expiries.items() if expires_at > current}
+            self.scanned_at = current
+            self.refreshed_at = time.monotonic()
+
+    def add(self, jti, expires_at=None):
+        """Record a JTI blacklisted by this process"""
+        with self.lock:
+            self.expiries[jti] = expires_at or self.default_expiry(timezone.now())
+
+    def contains(self, jti):
+        self.refresh()
+        return jti in self.expiries
+
+    def clear(self):
+        with self.lock:
+            self.expiries = {}
+            self.high_water_mark = 0
+            self.scanned_at = None
+            self.refreshed_at = None
+
+
+jti_blacklist = JTIBlacklist()
+
+
+def is_blacklisted(jti):
+    return jti_blacklist.contains(jti)
+
+
+def expired_condition(current):
+    return (
+        Q(expires_at__lte=current)
+        | Q(expires_at__isnull=True, blacklisted_on__lte=current - settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'])
+    )
+
+
+def expired_blacklist_rows():
+    """Rows whose token can no longer be used, blacklisted or not"""
+    return BlacklistedToken.objects.filter(expired_condition(timezone.now()))
+
+
+def live_blacklist_rows(current):
+    """Rows whose token could still be presented at `current`"""
+    return BlacklistedToken.objects.exclude(expired_condition(current))
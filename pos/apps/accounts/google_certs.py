@@ -0,0 +1,114 @@
+"""
+Google ID token verification against a process-local certificate cache.
+
+Google's signing certificates are fetched once and kept, keyed by `kid`, for
+as long as the Cache-Control max-age of the certs response allows. After
+that, verifying a token is pure CPU. An unknown `kid` (Google rotated its
+keys) triggers an early refetch, at most once per
+GOOGLE_CERTS_MIN_REFETCH_INTERVAL: anyone can send tokens with made-up
+`kid`s, and until the interval passes those are rejected as unknown without
+a request to Google. If a refetch fails, the cached certificates keep being
+used.
+
+The fetcher is pluggable (settings.GOOGLE_CERTS_FETCHER, a dotted path to a
+callable returning (certs, max_age)), so tests can run against a local key
+set without network access.
+"""
+
+import json
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from google.auth import jwt
+from google.auth.transport import requests as google_requests
+
+from pos.utils.logger import POSLogger
+
+logger = POSLogger(__name__)
+
+GOOGLE_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+MAX_AGE_PATTERN = re.compile(r'max-age=(\d+)')
+
+
+def fetch_google_certs():
+    """Default fetcher: Google's {kid: PEM certificate} map and its max-age in seconds"""
+    response = google_requests.Request()(GOOGLE_CERTS_URL, method='GET')
+    if response.status != 200:
+        raise ValueError(f"Could not fetch Google certificates, status {response.status}")
+
+    match = MAX_AGE_PATTERN.search(response.headers.get('cache-control', ''))
+    max_age = int(match.group(1)) if match else None
+    data = response.data.decode('utf-8') if isinstance(response.data, bytes) else response.data
+    return json.loads(data), max_age
+
+
+class GoogleCertCache:
+    def __init__(self, fetcher=None):
+        self.fetcher = fetcher
+        self.certs = {}
+        self.expires_at = 0
+        self.fetched_at = None
+        self.lock = threading.Lock()
+
+    def get_fetcher(self):
+        return self.fetcher or import_string(settings.GOOGLE_CERTS_FETCHER)
+
+    def refresh(self):
+        certs, max_age = self.get_fetcher()()
+        if max_age is None:
+            max_age = settings.GOOGLE_CERTS_DEFAULT_MAX_AGE
+        self.certs = dict(certs)
+        self.expires_at = time.monotonic() + max_age
+
+    def may_refetch(self, now):
+        return self.fetched_at is None or now - self.fetched_at >= settings.GOOGLE_CERTS_MIN_REFETCH_INTERVAL
+
+    def get_cert(self, kid):
+        """PEM certificate for kid, fetching the key set only when needed"""
+        if kid in self.certs and time.monotonic() < self.expires_at:
+            return self.certs[kid]
+
+        with self.lock:
+            now = time.monotonic()
+            if (kid not in self.certs or now >= self.expires_at) and self.may_refetch(now):
+                # Counted from the attempt, so failing fetches are not retried per request either
+                self.fetched_at = now
+                try:
+                    self.refresh()
+                except Exception as e:
+                    if kid not in self.certs:
+                        raise
+                    logger.warning(f"Google certificate refresh failed, using cached keys: {str(e)}")
+
+        if kid not in self.certs:
+            raise ValueError(f"Unknown Google signing key {kid}")
+        return self.certs[kid]
+
+    def clear(self):
+        with self.lock:
+            self.certs = {}
+            self.expires_at = 0
+            self.fetched_at = None
+
+
+cert_cache = GoogleCertCache()
+
+
+def verify_google_id_token(token, audience):
+    """
+    Same checks as google.oauth2.id_token.verify_oauth2_token (signature,
+    expiry, audience, issuer) using the cached certificates.
+    Raises ValueError for an invalid token.
+    """
+    kid = jwt.decode_header(token).get('kid')
+    if not kid:
+        raise ValueError('Token has no key id.')
+
+    idinfo = jwt.decode(token, certs={kid: cert_cache.get_cert(kid)}, audience=audience)
+    if idinfo.get('iss') not in GOOGLE_ISSUERS:
+        raise ValueError('Invalid token issuer.')
+    return idinfo
@@ -0,0 +1,67 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.utils.module_loading import import_string
+
+
+def api_view(request):
+    return HttpResponse()
+
+# APIView.as_view marks views the same way
+api_view.csrf_exempt = True
+
+
+def build_handler(middleware_paths):
+    """Middleware chain around api_view, including process_view hooks"""
+    view_hooks = []
+
+    def view(request):
+        for hook in view_hooks:
+            response = hook(request, api_view, (), {})
+            if response is not None:
+                return response
+        return api_view(request)
+
+    handler = view
+    for middleware_path in reversed(middleware_paths):
+        handler = import_string(middleware_path)(handler)
+        if hasattr(handler, 'process_view'):
+            view_hooks.insert(0, handler.process_view)
+    return handler
+
+
+class Command(BaseCommand):
+    help = "Time the API middleware stack against the full browser stack on an API path"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20000)
+        parser.add_argument('--path', default='/orders/history/')
+
+    def handle(self, *args, **options):
+        full_stack = []
+        for middleware_path in settings.MIDDLEWARE:
+            if middleware_path == 'pos.utils.middleware.AdminMiddlewareStack':
+                full_stack.extend(settings.ADMIN_MIDDLEWARE)
+            else:
+                full_stack.append(middleware_path)
+
+        # Requests as a browser-less terminal sends them
+        factory = RequestFactory(HTTP_AUTHORIZATION='Bearer benchmark', HTTP_HOST='localhost')
+        results = {}
+        for name, middleware_paths in (('full', full_stack), ('api', settings.MIDDLEWARE)):
+            handler = build_handler(middleware_paths)
+            requests = [factory.get(options['path']) for _ in range(options['requests'])]
+            handler(factory.get(options['path']))  # warm up
+            started = time.perf_counter()
+            for request in requests:
+                handler(request)
+            results[name] = (time.perf_counter() - started) / options['requests'] * 1e6
+            self.stdout.write(f"{name:>4}: {len(middleware_paths)} middleware, {results[name]:.1f} us per request")
+
+        saved = results['full'] - results['api']
+        self.stdout.write(self.style.SUCCESS(
+            f"API stack saves {saved:.1f} us per request ({saved / results['full'] * 100:.0f}%)"
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from pos.apps.accounts.blacklist import expired_blacklist_rows
+from pos.apps.accounts.models import BlacklistedToken
+
+
+class Command(BaseCommand):
+    help = "Delete blacklisted tokens that have expired, in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+        while True:
+            ids = list(expired_blacklist_rows().values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            deleted, _ = BlacklistedToken.objects.filter(id__in=ids).delete()
+            total += deleted
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} expired blacklisted tokens"))
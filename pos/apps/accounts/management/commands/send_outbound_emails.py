@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from pos.apps.accounts.outbox import deliver_batch
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbound emails in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOUND_EMAIL_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new emails")
+        parser.add_argument('--interval', type=float, default=5, help="Seconds between polls with --loop")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = deliver_batch(batch_size)
+            total_sent += sent
+            total_failed += failed
+            if sent + failed == batch_size:
+                # A full batch: more may be due already
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f"Sent {total_sent} emails, {total_failed} failed"))
@@ -0,0 +1,36 @@
+import bisect
+import threading
+
+
+class LatencyHistogram:
+    """
+    Cumulative latency histogram kept in process memory, in the same shape
+    as a Prometheus histogram: one counter per upper bound (seconds), plus
+    the total count and sum.
+    """
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counts = [0] * (len(self.buckets) + 1)
+            self.count = 0
+            self.sum = 0.0
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def snapshot(self):
+        with self.lock:
+            cumulative = 0
+            buckets = []
+            for bound, count in zip([*self.buckets, float('inf')], self.counts):
+                cumulative += count
+                buckets.append({'le': 'inf' if bound == float('inf') else bound, 'count': cumulative})
+            return {'buckets': buckets, 'count': self.count, 'sum': round(self.sum, 6)}
@@ -3,6 +3,7 @@ from django.db import models
 from django.utils import timezone
 
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
+from pos.utils.permissions import can_access_location
 
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -51,6 +52,8 @@ class User(AbstractBaseUser):
     locations = models.ManyToManyField('locations.LocationModel', blank=True)
 
     is_logged_in = models.BooleanField(default=False)
+    # Bumped whenever claims embedded in issued tokens change (see accounts.tokens)
+    token_version = models.PositiveIntegerField(default=0)
     created_by = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL, related_name='created_users')
 
     objects = UserManager()
@@ -63,9 +66,7 @@ class User(AbstractBaseUser):
     
     def has_location_access(self, location_id):
         """Check if user has access to a specific location"""
-        if self.is_super_admin:
-            return True
-        return self.locations.filter(id=location_id).exists()
+        return can_access_location(self, location_id)
     
     def save(self, *args, **kwargs):
         """Ensure role consistency on save"""
@@ -86,7 +87,38 @@ class BlacklistedToken(models.Model):
         verbose_name_plural = "Blacklisted Tokens"
         indexes = [
             models.Index(fields=["jti"]),
+            models.Index(fields=["expires_at"]),
+            models.Index(fields=["blacklisted_on"]),
         ]
     
     def __str__(self):
-        return f"Blacklisted on {self.blacklisted_on.strftime('%Y-%m-%d %H:%M:%S')} | Token ID: {self.jti}"
\ No newline at end of file
+        return f"Blacklisted on {self.blacklisted_on.strftime('%Y-%m-%d %H:%M:%S')} | Token ID: {self.jti}"
+
+class OutboundEmail(models.Model):
+    """Email queued by a request and delivered by the send_outbound_emails worker"""
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(null=True, blank=True)
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField()  # list of addresses
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.recipients)} ({self.status})"
@@ -0,0 +1,103 @@
+"""
+Email outbox.
+
+Requests only insert OutboundEmail rows (queue_email), inside whatever
+transaction they are already in, so nothing waits on SMTP and an email is
+never sent for a write that rolled back. The send_outbound_emails command
+drains due rows in batches over one SMTP connection per batch, retrying
+failures with exponential backoff until OUTBOUND_EMAIL_MAX_ATTEMPTS.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from pos.apps.accounts.models import OutboundEmail
+from pos.utils.logger import POSLogger
+
+logger = POSLogger(__name__)
+
+
+def queue_email(subject, message, recipient_list, html_message=None, from_email=None):
+    """Store an email for the outbox worker"""
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        html_body=html_message,
+        from_email=from_email or settings.EMAIL_HOST_USER,
+        recipients=list(recipient_list),
+    )
+
+
+def retry_delay(attempts):
+    """Backoff after the given number of failed attempts"""
+    seconds = settings.OUTBOUND_EMAIL_RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.OUTBOUND_EMAIL_MAX_RETRY_DELAY))
+
+
+def record_failure(email, error):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= settings.OUTBOUND_EMAIL_MAX_ATTEMPTS:
+        email.status = 'failed'
+        logger.error(f"Giving up on email {email.id} to {email.recipients}: {str(error)}")
+    else:
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+        logger.warning(f"Email {email.id} failed (attempt {email.attempts}), retrying later: {str(error)}")
+
+
+def deliver_batch(batch_size):
+    """
+    Send up to batch_size due emails over a single connection.
+    Returns (sent, failed) counts; (0, 0) when nothing was due.
+    """
+    with transaction.atomic():
+        # Rows stay locked until the batch is recorded, so parallel workers skip them
+        emails = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if not emails:
+            return 0, 0
+
+        sent = failed = 0
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception as e:
+            for email in emails:
+                record_failure(email, e)
+            failed = len(emails)
+        else:
+            try:
+                for email in emails:
+                    message = EmailMultiAlternatives(
+                        subject=email.subject,
+                        body=email.body,
+                        from_email=email.from_email,
+                        to=email.recipients,
+                        connection=connection,
+                    )
+                    if email.html_body:
+                        message.attach_alternative(email.html_body, 'text/html')
+                    try:
+                        message.send()
+                    except Exception as e:
+                        record_failure(email, e)
+                        failed += 1
+                    else:
+                        email.attempts += 1
+                        email.status = 'sent'
+                        email.sent_at = timezone.now()
+                        sent += 1
+            finally:
+                connection.close()
+
+        OutboundEmail.objects.bulk_update(
+            emails, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+        )
+    return sent, failed
@@ -0,0 +1,99 @@
+"""
+JWT issuing and the claim-backed request user.
+
+Tokens carry the user's email, role flags, accessible location IDs and
+token version, so BlacklistJWTAuthentication can build request.user from
+the token alone. The user is a regular User instance whose other fields are
+deferred: reading one (first_name, password, ...) loads it on first access,
+and save() only writes the fields that were loaded or set.
+
+Changing a user's email or location assignments must call
+bump_token_version, which invalidates every token issued before the change.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+User = get_user_model()
+
+# User fields copied into every token
+CLAIM_FIELDS = ('email', 'is_super_admin', 'is_franchise_admin', 'is_staff_member', 'token_version')
+LOCATIONS_CLAIM = 'location_ids'
+
+
+def get_tokens_for_user(user, location_ids=None):
+    """
+    Refresh and access token pair carrying the user's identity claims.
+    Pass location_ids when the caller already loaded the user's locations.
+    """
+    refresh = RefreshToken.for_user(user)
+    for field in CLAIM_FIELDS:
+        refresh[field] = getattr(user, field)
+    if user.is_super_admin:
+        # Super admins can access every location, so their list stays empty
+        location_ids = []
+    elif location_ids is None:
+        location_ids = user.locations.values_list('id', flat=True)
+    refresh[LOCATIONS_CLAIM] = list(location_ids)
+    return {
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+    }
+
+
+def user_from_claims(validated_token):
+    """
+    User built from token claims without a query, or None for tokens issued
+    before the claims existed.
+    """
+    if any(field not in validated_token for field in (*CLAIM_FIELDS, LOCATIONS_CLAIM)):
+        return None
+
+    try:
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        return None
+
+    # Claims are JSON values (simplejwt may issue the user id as a string), so
+    # convert them the way the database would have returned them
+    loaded = {User._meta.pk.attname: User._meta.pk.to_python(user_id)}
+    for field in CLAIM_FIELDS:
+        loaded[User._meta.get_field(field).attname] = User._meta.get_field(field).to_python(validated_token[field])
+    # from_db expects values in model field order
+    field_names = [field.attname for field in User._meta.concrete_fields if field.attname in loaded]
+    user = User.from_db(DEFAULT_DB_ALIAS, field_names, [loaded[name] for name in field_names])
+    user.location_ids = frozenset(validated_token[LOCATIONS_CLAIM])
+    return user
+
+
+def token_version_cache_key(user_id):
+    return f'accounts:token_version:{user_id}'
+
+
+def current_token_version(user_id):
+    """The user's token version (None if the user is gone), cached briefly"""
+    key = token_version_cache_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = User.objects.filter(pk=user_id).values_list('token_version', flat=True).first()
+        if version is None:
+            return None
+        cache.set(key, version, settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def token_is_current(validated_token):
+    return validated_token.get('token_version') == current_token_version(validated_token[api_settings.USER_ID_CLAIM])
+
+
+def bump_token_version(user):
+    """Invalidate every token issued to the user so far"""
+    User.objects.filter(pk=user.pk).update(token_version=F('token_version') + 1)
+    # Keep a later save() of this instance from writing the old version back
+    user.token_version += 1
+    transaction.on_commit(lambda: cache.delete(token_version_cache_key(user.pk)))
@@ -2,7 +2,7 @@
 
 from django.urls import path
 
-from pos.apps.accounts._views.login import LocationLoginView, UserLoginView
+from pos.apps.accounts._views.login import LocationLoginView, LoginMetricsView, UserLoginView
 from .views import (
     ChangePasswordView,
     FranchiseAdminView,
@@ -16,6 +16,7 @@ from pos.apps.accounts._views.token_refresh import CustomTokenRefreshView
 urlpatterns = [
     path('login-location/', LocationLoginView.as_view(), name='login'),
     path('login/', UserLoginView.as_view(), name='login'),
+    path('login/metrics/', LoginMetricsView.as_view()),
     path('google/login/',GoogleLoginView.as_view(), name='google_login'),
     path('change-password/', ChangePasswordView.as_view()),
     path('franchise-admin/', FranchiseAdminView.as_view()),
@@ -0,0 +1,32 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from pos.apps.dashboard.kpis import hourly_curve
+from pos.apps.dashboard.utils import dashboard_scope
+from pos.utils.logger import POSLogger
+
+logger = POSLogger(__name__)
+
+
+class HourlySalesView(APIView):
+    """
+    Orders and revenue per local hour of a day.
+    Params: location_id, date (see dashboard_scope)
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            location_ids, day = dashboard_scope(request)
+        except PermissionError as e:
+            logger.warning(f"Unauthorized dashboard access attempt by {request.user.email}: {str(e)}")
+            return Response({"error": str(e)}, status=status.HTTP_403_FORBIDDEN)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'date': day,
+            'location_ids': location_ids,
+            'hours': hourly_curve(location_ids, day)
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,37 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from pos.apps.dashboard.kpis import top_items
+from pos.apps.dashboard.utils import dashboard_scope
+from pos.utils.logger import POSLogger
+
+logger = POSLogger(__name__)
+
+
+class TopItemsView(APIView):
+    """
+    Best selling menu items of a day by quantity.
+    Params: location_id, date (see dashboard_scope), limit (default 10, max 50)
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            location_ids, day = dashboard_scope(request)
+        except PermissionError as e:
+            logger.warning(f"Unauthorized dashboard access attempt by {request.user.email}: {str(e)}")
+            return Response({"error": str(e)}, status=status.HTTP_403_FORBIDDEN)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            return Response({"error": "limit must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'date': day,
+            'location_ids': location_ids,
+            'items': top_items(location_ids, day, limit)
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,166 @@
+"""
+Dashboard KPIs read from the sales rollups and cached per location.
+
+Every cache key carries the location's current version number. Order
+writes bump the version of each location they touch (see
+invalidate_locations, called from rollups.apply_deltas on commit), so a
+refresh after a sale recomputes that location only and every other entry
+stays warm. Multi-location views fetch all their per-location entries
+with one get_many and compute the misses with one query.
+"""
+
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+
+from pos.apps.dashboard.models import DailyMenuItemSales, DailySales, HourlySales
+from pos.apps.locations.models import LocationModel
+
+
+def version_key(location_id):
+    return f'dashboard:version:{location_id}'
+
+
+def new_version():
+    # Time based, so a version key that was evicted never restarts at a number
+    # whose entries could still be cached
+    return time.time_ns()
+
+
+def location_versions(location_ids):
+    keys = {location_id: version_key(location_id) for location_id in location_ids}
+    found = cache.get_many(keys.values())
+    versions = {}
+    missing = {}
+    for location_id, key in keys.items():
+        if key in found:
+            versions[location_id] = found[key]
+        else:
+            versions[location_id] = missing[key] = new_version()
+    if missing:
+        cache.set_many(missing, None)
+    return versions
+
+
+def invalidate_locations(location_ids):
+    """Make every cached KPI of these locations stale"""
+    for location_id in set(location_ids):
+        try:
+            cache.incr(version_key(location_id))
+        except ValueError:
+            cache.set(version_key(location_id), new_version(), None)
+
+
+def cached_per_location(name, location_ids, day, compute):
+    """
+    {location_id: value} for one KPI, served from cache where possible.
+    `compute(missing_ids, day)` must return a value for every id it is given.
+    """
+    versions = location_versions(location_ids)
+    keys = {
+        location_id: f'dashboard:{name}:{location_id}:{day.isoformat()}:{versions[location_id]}'
+        for location_id in location_ids
+    }
+    found = cache.get_many(keys.values())
+    values = {location_id: found[key] for location_id, key in keys.items() if key in found}
+
+    missing = [location_id for location_id in location_ids if location_id not in values]
+    if missing:
+        computed = compute(missing, day)
+        cache.set_many({keys[location_id]: computed[location_id] for location_id in missing},
+                       settings.DASHBOARD_CACHE_TIMEOUT)
+        values.update(computed)
+    return values
+
+
+def compute_sales(location_ids, day):
+    sales = {
+        location_id: {'order_count': 0, 'revenue': Decimal('0.00'), 'cancelled_count': 0, 'cancelled_amount': Decimal('0.00')}
+        for location_id in location_ids
+    }
+    rows = DailySales.objects.filter(location_id__in=location_ids, date=day).values(
+        'location_id', 'order_count', 'revenue', 'cancelled_count', 'cancelled_amount'
+    )
+    for row in rows:
+        sales[row.pop('location_id')] = row
+    return sales
+
+
+def compute_hourly(location_ids, day):
+    hourly = {location_id: {} for location_id in location_ids}
+    rows = HourlySales.objects.filter(location_id__in=location_ids, date=day).values(
+        'location_id', 'hour', 'order_count', 'revenue'
+    )
+    for row in rows:
+        hourly[row['location_id']][row['hour']] = (row['order_count'], row['revenue'])
+    return hourly
+
+
+def compute_items(location_ids, day):
+    items = {location_id: [] for location_id in location_ids}
+    rows = DailyMenuItemSales.objects.filter(location_id__in=location_ids, date=day).values(
+        'location_id', 'menu_item__menu_item_id', 'menu_item__menu_item__name', 'quantity', 'revenue'
+    )
+    for row in rows:
+        items[row['location_id']].append({
+            'menu_item_id': row['menu_item__menu_item_id'],
+            'name': row['menu_item__menu_item__name'],
+            'quantity': row['quantity'],
+            'revenue': row['revenue'],
+        })
+    return items
+
+
+def sales_summary(location_ids, day):
+    """Totals for the day across the given locations"""
+    summary = {'order_count': 0, 'revenue': Decimal('0.00'), 'cancelled_count': 0, 'cancelled_amount': Decimal('0.00')}
+    for sales in cached_per_location('sales', location_ids, day, compute_sales).values():
+        for field in summary:
+            summary[field] += sales[field]
+    summary['average_order_value'] = (
+        (summary['revenue'] / summary['order_count']).quantize(Decimal('0.01')) if summary['order_count'] else Decimal('0.00')
+    )
+    return summary
+
+
+def hourly_curve(location_ids, day):
+    """Orders and revenue for each of the 24 local hours of the day"""
+    curve = [{'hour': hour, 'order_count': 0, 'revenue': Decimal('0.00')} for hour in range(24)]
+    for hours in cached_per_location('hourly', location_ids, day, compute_hourly).values():
+        for hour, (order_count, revenue) in hours.items():
+            curve[hour]['order_count'] += order_count
+            curve[hour]['revenue'] += revenue
+    return curve
+
+
+def top_items(location_ids, day, limit):
+    """Best sellers by quantity, merged across locations by master menu item"""
+    merged = defaultdict(lambda: {'quantity': 0, 'revenue': Decimal('0.00')})
+    for items in cached_per_location('items', location_ids, day, compute_items).values():
+        for item in items:
+            entry = merged[item['menu_item_id']]
+            entry['name'] = item['name']
+            entry['quantity'] += item['quantity']
+            entry['revenue'] += item['revenue']
+    ranked = sorted(merged.items(), key=lambda entry: (-entry[1]['quantity'], -entry[1]['revenue'], entry[0]))
+    return [{'menu_item_id': menu_item_id, **entry} for menu_item_id, entry in ranked[:limit]]
+
+
+def location_leaderboard(location_ids, day):
+    """Locations ranked by revenue for the day"""
+    sales = cached_per_location('sales', location_ids, day, compute_sales)
+    names = dict(LocationModel.objects.filter(id__in=location_ids).values_list('id', 'name'))
+    board = [
+        {
+            'location_id': location_id,
+            'location_name': names.get(location_id),
+            'order_count': sales[location_id]['order_count'],
+            'revenue': sales[location_id]['revenue'],
+        }
+        for location_id in location_ids
+    ]
+    board.sort(key=lambda entry: (-entry['revenue'], -entry['order_count'], entry['location_id']))
+    return board
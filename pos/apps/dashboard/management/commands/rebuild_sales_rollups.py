@@ -0,0 +1,120 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import Coalesce, ExtractHour
+from django.utils import timezone
+
+from pos.apps.dashboard.kpis import invalidate_locations
+from pos.apps.dashboard.models import DailyMenuItemSales, DailyPaymentModeSales, DailySales, HourlySales
+from pos.apps.locations.models import LocationModel
+from pos.apps.orders.models import Order, OrderItem
+
+
+class Command(BaseCommand):
+    help = "Recompute the dashboard sales rollups from orders (backfill or repair)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--location', type=int, help="Only rebuild this location")
+        parser.add_argument('--date-from', help="First day to rebuild (YYYY-MM-DD)")
+        parser.add_argument('--date-to', help="Last day to rebuild (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        try:
+            date_from = date.fromisoformat(options['date_from']) if options['date_from'] else None
+            date_to = date.fromisoformat(options['date_to']) if options['date_to'] else None
+        except ValueError:
+            raise CommandError("Dates must be in YYYY-MM-DD format")
+
+        # token_date is the local day of placed_at, which is the rollup day
+        day_filter = {}
+        if options['location']:
+            day_filter['location_id'] = options['location']
+        if date_from:
+            day_filter['date__gte'] = date_from
+        if date_to:
+            day_filter['date__lte'] = date_to
+        order_filter = {
+            key.replace('date', 'token_date'): value for key, value in day_filter.items()
+        }
+        item_filter = {f'order__{key}': value for key, value in order_filter.items()}
+
+        orders = Order.objects.filter(**order_filter)
+        active = orders.filter(is_cancelled=False)
+        money = DecimalField(max_digits=12, decimal_places=2)
+
+        with transaction.atomic():
+            for model in (DailySales, HourlySales, DailyPaymentModeSales, DailyMenuItemSales):
+                model.objects.filter(**day_filter).delete()
+
+            daily = DailySales.objects.bulk_create([
+                DailySales(
+                    location_id=row['location_id'],
+                    date=row['token_date'],
+                    order_count=row['order_count'],
+                    revenue=row['revenue'],
+                    cancelled_count=row['cancelled_count'],
+                    cancelled_amount=row['cancelled_amount'],
+                )
+                for row in orders.values('location_id', 'token_date').annotate(
+                    order_count=Count('id', filter=Q(is_cancelled=False)),
+                    revenue=Coalesce(Sum('total_amount', filter=Q(is_cancelled=False)), 0, output_field=money),
+                    cancelled_count=Count('id', filter=Q(is_cancelled=True)),
+                    cancelled_amount=Coalesce(Sum('total_amount', filter=Q(is_cancelled=True)), 0, output_field=money),
+                ).order_by()
+            ])
+
+            HourlySales.objects.bulk_create([
+                HourlySales(
+                    location_id=row['location_id'],
+                    date=row['token_date'],
+                    hour=row['hour'],
+                    order_count=row['order_count'],
+                    revenue=row['revenue'],
+                )
+                for row in active.annotate(
+                    hour=ExtractHour('placed_at', tzinfo=timezone.get_current_timezone())
+                ).values('location_id', 'token_date', 'hour').annotate(
+                    order_count=Count('id'),
+                    revenue=Sum('total_amount'),
+                ).order_by()
+            ])
+
+            DailyPaymentModeSales.objects.bulk_create([
+                DailyPaymentModeSales(
+                    location_id=row['location_id'],
+                    date=row['token_date'],
+                    payment_mode=row['payment_mode'],
+                    order_count=row['order_count'],
+                    revenue=row['revenue'],
+                )
+                for row in active.values('location_id', 'token_date', 'payment_mode').annotate(
+                    order_count=Count('id'),
+                    revenue=Sum('total_amount'),
+                ).order_by()
+            ])
+
+            DailyMenuItemSales.objects.bulk_create([
+                DailyMenuItemSales(
+                    location_id=row['order__location_id'],
+                    date=row['order__token_date'],
+                    menu_item_id=row['menu_item_id'],
+                    quantity=row['total_quantity'],
+                    revenue=row['revenue'],
+                )
+                for row in OrderItem.objects.filter(order__is_cancelled=False, **item_filter).values(
+                    'order__location_id', 'order__token_date', 'menu_item_id'
+                ).annotate(
+                    # An alias named like the quantity field would clash with it
+                    total_quantity=Sum('quantity'),
+                    revenue=Sum(F('quantity') * F('price'), output_field=money),
+                ).order_by()
+            ])
+
+        if options['location']:
+            invalidate_locations([options['location']])
+        else:
+            invalidate_locations(LocationModel.objects.values_list('id', flat=True))
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt sales rollups for {len(daily)} location days"))
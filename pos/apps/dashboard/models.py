@@ -1,3 +1,68 @@
 from django.db import models
+from pos.apps.locations.models import LocationModel
+from pos.apps.menu.models import LocationMenuItem
 
-# Create your models here.
+# Rollups are keyed by the local calendar day an order was placed on (the
+# same day as Order.token_date). Revenue and counts cover completed orders;
+# cancelled orders only show up in DailySales.cancelled_*.
+
+
+class DailySales(models.Model):
+    """Per-location totals for one day"""
+    location = models.ForeignKey(LocationModel, on_delete=models.CASCADE)
+    date = models.DateField()
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cancelled_count = models.IntegerField(default=0)
+    cancelled_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('location', 'date')
+
+    def __str__(self):
+        return f"{self.location_id} on {self.date}: {self.order_count} orders, {self.revenue}"
+
+
+class HourlySales(models.Model):
+    """Per-location totals for one local hour of a day"""
+    location = models.ForeignKey(LocationModel, on_delete=models.CASCADE)
+    date = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('location', 'date', 'hour')
+
+    def __str__(self):
+        return f"{self.location_id} on {self.date} {self.hour:02d}:00: {self.revenue}"
+
+
+class DailyPaymentModeSales(models.Model):
+    """Per-location split of a day's sales by payment mode"""
+    location = models.ForeignKey(LocationModel, on_delete=models.CASCADE)
+    date = models.DateField()
+    payment_mode = models.CharField(max_length=50)
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('location', 'date', 'payment_mode')
+
+    def __str__(self):
+        return f"{self.location_id} on {self.date} via {self.payment_mode}: {self.revenue}"
+
+
+class DailyMenuItemSales(models.Model):
+    """Quantity and revenue of one location menu item for a day"""
+    location = models.ForeignKey(LocationModel, on_delete=models.CASCADE)
+    date = models.DateField()
+    menu_item = models.ForeignKey(LocationMenuItem, on_delete=models.CASCADE)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('location', 'date', 'menu_item')
+
+    def __str__(self):
+        return f"{self.menu_item_id} at {self.location_id} on {self.date}: {self.quantity}"
@@ -0,0 +1,106 @@
+"""
+Incremental maintenance of the dashboard sales rollups.
+
+Order writes describe the order before and after the change as snapshots
+(see snapshot_order) and call record_order_change inside the same
+transaction. Each snapshot's contribution is removed or added with F()
+increments, so the rollups never need to rescan orders. The
+rebuild_sales_rollups command recomputes them from scratch for backfills.
+Every applied change also invalidates the cached KPIs of its locations.
+"""
+
+from collections import defaultdict
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from pos.apps.dashboard.kpis import invalidate_locations
+from pos.apps.dashboard.models import DailyMenuItemSales, DailyPaymentModeSales, DailySales, HourlySales
+
+
+def snapshot_order(order, items):
+    """
+    Everything the rollups need to know about an order.
+    `items` is an iterable of (menu_item_id, quantity, price) tuples.
+    """
+    placed_at = timezone.localtime(order.placed_at)
+    return {
+        'location_id': order.location_id,
+        'date': placed_at.date(),
+        'hour': placed_at.hour,
+        'payment_mode': order.payment_mode,
+        'total_amount': order.total_amount,
+        'is_cancelled': order.is_cancelled,
+        'items': list(items),
+    }
+
+
+def order_item_tuples(order_items):
+    """(menu_item_id, quantity, price) tuples from the dicts built by resolve_order_items"""
+    return [(item['menu_item'].id, item['quantity'], item['price']) for item in order_items]
+
+
+def collect_deltas(signed_snapshots):
+    """Net contribution of (snapshot, sign) pairs per rollup row"""
+    deltas = defaultdict(lambda: defaultdict(int))
+
+    def add(model, keys, sign, **values):
+        row = deltas[(model, tuple(sorted(keys.items())))]
+        for field, value in values.items():
+            row[field] += sign * value
+
+    for snapshot, sign in signed_snapshots:
+        day = {'location_id': snapshot['location_id'], 'date': snapshot['date']}
+        total = snapshot['total_amount']
+
+        if snapshot['is_cancelled']:
+            add(DailySales, day, sign, cancelled_count=1, cancelled_amount=total)
+            continue
+
+        add(DailySales, day, sign, order_count=1, revenue=total)
+        add(HourlySales, {**day, 'hour': snapshot['hour']}, sign, order_count=1, revenue=total)
+        add(DailyPaymentModeSales, {**day, 'payment_mode': snapshot['payment_mode']}, sign, order_count=1, revenue=total)
+        for menu_item_id, quantity, price in snapshot['items']:
+            add(DailyMenuItemSales, {**day, 'menu_item_id': menu_item_id}, sign, quantity=quantity, revenue=price * quantity)
+
+    return deltas
+
+
+def increment(model, keys, values):
+    """Add values to the rollup row identified by keys, creating it if needed"""
+    updates = {field: F(field) + value for field, value in values.items()}
+    if model.objects.filter(**keys).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**keys, **values)
+    except IntegrityError:
+        # Another transaction created the row first
+        model.objects.filter(**keys).update(**updates)
+
+
+def apply_deltas(deltas):
+    # A stable row order keeps concurrent writers from deadlocking
+    for (model, keys), values in sorted(deltas.items(), key=lambda entry: (entry[0][0].__name__, str(entry[0][1]))):
+        values = {field: value for field, value in values.items() if value}
+        if values:
+            increment(model, dict(keys), values)
+
+    location_ids = {dict(keys)['location_id'] for _, keys in deltas}
+    if location_ids:
+        # Cached KPIs of these locations are stale once the write commits
+        transaction.on_commit(lambda: invalidate_locations(location_ids))
+
+
+def apply_snapshots(snapshots, sign=1):
+    """Add (sign=1) or remove (sign=-1) the contribution of many order snapshots"""
+    apply_deltas(collect_deltas([(snapshot, sign) for snapshot in snapshots]))
+
+
+def record_order_change(before=None, after=None):
+    """Move an order's contribution from its old snapshot to its new one"""
+    signed_snapshots = []
+    if before is not None:
+        signed_snapshots.append((before, -1))
+    if after is not None:
+        signed_snapshots.append((after, 1))
+    apply_deltas(collect_deltas(signed_snapshots))
@@ -1,8 +1,9 @@
 from django.urls import path
-from . import views
+from .views import SalesSummaryView, HourlySalesView, TopItemsView, LocationLeaderboardView
 
 urlpatterns = [
-   
-    
-    
-]
\ No newline at end of file
+    path('sales/', SalesSummaryView.as_view()),
+    path('hourly/', HourlySalesView.as_view()),
+    path('top-items/', TopItemsView.as_view()),
+    path('leaderboard/', LocationLeaderboardView.as_view()),
+]
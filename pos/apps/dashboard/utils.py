@@ -0,0 +1,42 @@
+from datetime import date
+
+from django.utils import timezone
+
+from pos.apps.locations.models import LocationModel
+from pos.utils.permissions import allowed_location_ids
+
+
+def dashboard_scope(request):
+    """
+    Locations and day a dashboard request covers.
+    Params:
+        - location_id: one location (default: every location the user can access)
+        - date: YYYY-MM-DD (default: today)
+    Raises PermissionError when the user may not see the location(s) and
+    ValueError for malformed params.
+    """
+    user = request.user
+    if not (user.is_super_admin or user.is_franchise_admin):
+        raise PermissionError("Not authorized to view the dashboard")
+
+    day = request.query_params.get('date')
+    try:
+        day = date.fromisoformat(day) if day else timezone.localdate()
+    except ValueError:
+        raise ValueError("Invalid date format. Use YYYY-MM-DD")
+
+    location_ids = allowed_location_ids(user)
+    if location_ids is None:
+        location_ids = LocationModel.objects.values_list('id', flat=True)
+    location_ids = sorted(location_ids)
+    location_id = request.query_params.get('location_id')
+    if not location_id:
+        return location_ids, day
+
+    try:
+        location_id = int(location_id)
+    except ValueError:
+        raise ValueError("Invalid location ID")
+    if location_id not in location_ids:
+        raise PermissionError("You don't have access to this location")
+    return [location_id], day
@@ -1,3 +1,4 @@
-from django.shortcuts import render
-
-# Create your views here.
+from ._views.SalesSummaryView import SalesSummaryView
+from ._views.HourlySalesView import HourlySalesView
+from ._views.TopItemsView import TopItemsView
+from ._views.LocationLeaderboardView import LocationLeaderboardView
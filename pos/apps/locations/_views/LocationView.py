@@ -92,14 +92,15 @@ class LocationView(APIView):
             data = json.loads(request.body)
             
             # Create with any provided fields
-            location = LocationModel.objects.create(
+            location = LocationModel(
                 name=data.get('name', ''),
                 address=data.get('address', ''),
                 city=data.get('city', ''),
                 state=data.get('state', ''),
-                password=data.get('password', ''),
                 phone = data.get('phone', None)
             )
+            location.set_password(data.get('password', ''))
+            location.save()
             logger.info(f"New location '{location.name}' created by {request.user.email}")
             return JsonResponse({'id': location.id, 'status': 'created'}, status=201)
         except json.JSONDecodeError:
@@ -136,6 +137,8 @@ class LocationView(APIView):
                     location.state = data['state']
                 if 'phone' in data:
                     location.phone = data['phone']
+                if 'password' in data:
+                    location.set_password(data['password'])
                 
                 location.save()
                 logger.info(f"Location '{location.name}' updated by {request.user.email}")
@@ -0,0 +1,21 @@
+from django.contrib.auth.hashers import identify_hasher, is_password_usable
+from django.core.management.base import BaseCommand
+
+from pos.apps.locations.models import LocationModel
+
+
+class Command(BaseCommand):
+    help = "Hash location login secrets still stored in plaintext"
+
+    def handle(self, *args, **options):
+        total = 0
+        for location in LocationModel.objects.exclude(password__isnull=True).only('id', 'password'):
+            if not is_password_usable(location.password):
+                continue
+            try:
+                identify_hasher(location.password)
+            except ValueError:
+                location.set_password(location.password)
+                location.save(update_fields=['password'])
+                total += 1
+        self.stdout.write(self.style.SUCCESS(f"Hashed {total} location passwords"))
@@ -1,4 +1,6 @@
+from django.contrib.auth.hashers import check_password, identify_hasher, is_password_usable, make_password
 from django.db import models
+from django.utils.crypto import constant_time_compare
 
 class LocationModel(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -13,3 +15,27 @@ class LocationModel(models.Model):
 
     def __str__(self):
         return self.name
+
+    def set_password(self, raw_password):
+        """Store the terminal login secret hashed; an empty secret disables location login"""
+        self.password = make_password(raw_password or None)
+
+    def check_password(self, raw_password):
+        """
+        Verify a terminal login secret. Secrets stored in plaintext before
+        hashing, or hashed with an outdated hasher, are rehashed on success.
+        """
+        def upgrade(raw_password):
+            self.set_password(raw_password)
+            self.save(update_fields=['password'])
+
+        if not is_password_usable(self.password) or not raw_password:
+            return False
+        try:
+            identify_hasher(self.password)
+        except ValueError:
+            if not constant_time_compare(self.password, raw_password):
+                return False
+            upgrade(raw_password)
+            return True
+        return check_password(raw_password, self.password, upgrade)
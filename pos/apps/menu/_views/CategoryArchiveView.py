@@ -1,6 +1,7 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from pos.apps.menu.images import image_url
 from pos.apps.menu.models import MasterMenuCategory
 from pos.utils.logger import POSLogger
 
@@ -17,7 +18,7 @@ class CategoryArchiveView(APIView):
                 'id': item.id,
                 'name': item.name,
                 'description': item.description,
-                'image': item.image.decode('utf-8') if item.image else None,
+                'image': image_url(item.image_hash),
                 'is_active': item.is_active,
             })
         return Response({
@@ -2,9 +2,9 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from pos.apps.menu.models import CategoryModel
-from pos.apps.accounts.models import User
 from pos.apps.locations.models import LocationModel
 from django.shortcuts import get_object_or_404
+from pos.utils.permissions import allowed_location_ids, can_access_location
 from pos.utils.logger import POSLogger
 
 logger = POSLogger(__name__)
@@ -42,8 +42,7 @@ class CategoryView(APIView):
             return Response({'categories': data})
         
         elif request.user.is_franchise_admin or request.user.is_staff_member:
-            requester = get_object_or_404(User, id=request.user.id)
-            categories = CategoryModel.objects.filter(location__in=requester.locations.all()).order_by('display_order')
+            categories = CategoryModel.objects.filter(location_id__in=allowed_location_ids(request.user)).order_by('display_order')
             data = [{
                 'id': category.id,
                 'name': category.name,
@@ -77,10 +76,7 @@ class CategoryView(APIView):
                     'name': category.name
                 }, status=status.HTTP_201_CREATED)
             elif request.user.is_franchise_admin:
-                admin = get_object_or_404(User, id = request.user.id, is_franchise_admin = True)
-                locations = list(admin.locations.values('id','name'))
-                logger.info(f"\n\n the requested id is {requested_location} \n\n and the access to admin are {locations} \n\n")
-                if requested_location.id not in [loc['id'] for loc in locations]:
+                if not can_access_location(request.user, requested_location.id):
                     return Response({'error': 'Did not have access for that location'})
 
                 category = CategoryModel.objects.create(
@@ -116,9 +112,7 @@ class CategoryView(APIView):
                 pass
             elif request.user.is_franchise_admin:
                 # Franchise admin can only update categories in their locations
-                admin = get_object_or_404(User, id=request.user.id, is_franchise_admin=True)
-                admin_locations = set(admin.locations.values_list('id', flat=True))
-                if category.location.id not in admin_locations:
+                if not can_access_location(request.user, category.location_id):
                     logger.warning(f"{request.user.email} unauthorized to update this category")
                     return Response({'error': 'Unauthorized to update this category'}, 
                                    status=status.HTTP_403_FORBIDDEN)
@@ -134,8 +128,7 @@ class CategoryView(APIView):
                 new_location = get_object_or_404(LocationModel, id=request.data['location_id'])
                 
                 if request.user.is_franchise_admin:
-                    admin_locations = set(request.user.locations.values_list('id', flat=True))
-                    if new_location.id not in admin_locations:
+                    if not can_access_location(request.user, new_location.id):
                         return Response({'error': 'Cannot assign unauthorized location'}, 
                                        status=status.HTTP_403_FORBIDDEN)
                 
@@ -178,9 +171,7 @@ class CategoryView(APIView):
             if request.user.is_super_admin:
                 pass  # Full access
             elif request.user.is_franchise_admin:
-                admin = get_object_or_404(User, id=request.user.id, is_franchise_admin=True)
-                admin_locations = set(admin.locations.values_list('id', flat=True))
-                if category.location.id not in admin_locations:
+                if not can_access_location(request.user, category.location_id):
                     logger.warning(f"{request.user.email} unauthorized to delete this category")
                     return Response({'error': 'Unauthorized to delete this category'}, 
                                   status=status.HTTP_403_FORBIDDEN)
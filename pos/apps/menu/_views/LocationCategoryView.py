@@ -4,6 +4,7 @@ from rest_framework import status
 from pos.apps.menu.models import LocationMenuCategory, MasterMenuCategory
 from pos.apps.locations.models import LocationModel
 from django.shortcuts import get_object_or_404
+from pos.utils.permissions import allowed_location_ids, can_access_location
 
 class LocationCategoryView(APIView):
     """
@@ -14,10 +15,10 @@ class LocationCategoryView(APIView):
     def get(self, request, pk=None):
         if pk:
             try:
-                location_category = LocationMenuCategory.objects.select_related('category', 'location').get(pk=pk)
+                location_category = LocationMenuCategory.objects.select_related('category', 'location').defer('category__image').get(pk=pk)
                 if getattr(request.user, 'is_super_admin', False) or (
                     getattr(request.user, 'is_franchise_admin', False) and
-                    location_category.location in request.user.locations.all()
+                    can_access_location(request.user, location_category.location_id)
                 ):
                     data = {
                         'id': location_category.id,
@@ -34,12 +35,12 @@ class LocationCategoryView(APIView):
                 return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
         else:
             if getattr(request.user, 'is_super_admin', False):
-                items = LocationMenuCategory.objects.select_related('category', 'location').filter(
+                items = LocationMenuCategory.objects.select_related('category', 'location').defer('category__image').filter(
                     category__is_active=True
                 )
             elif getattr(request.user, 'is_franchise_admin', False):
-                items = LocationMenuCategory.objects.select_related('category', 'location').filter(
-                    location__in=request.user.locations.all(),
+                items = LocationMenuCategory.objects.select_related('category', 'location').defer('category__image').filter(
+                    location_id__in=allowed_location_ids(request.user),
                     category__is_active=True
                 )
             else:
@@ -1,7 +1,7 @@
-import base64
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from pos.apps.menu.images import image_url, thumbnail_urls
 from pos.apps.menu.models import LocationMenuItem, MasterMenuItem
 from pos.apps.locations.models import LocationModel
 from django.shortcuts import get_object_or_404
@@ -21,21 +21,14 @@ class LocationMenuItemView(APIView):
         Read assignment rows for their own locations only (GET)
     """
 
-
-    def encode_image_to_data_url(self, raw_bytes):
-        if not raw_bytes:
-            return None
-        base64_string = base64.b64encode(raw_bytes).decode('utf-8')
-        return f"data:image/jpeg;base64,{base64_string}"
-    
     def get(self, request, pk=None):
         """List assigned/unassigned menu items for a location or get a single assignment row."""
 
         if pk:
             try:
                 location_menu_item = LocationMenuItem.objects.select_related(
-                    'menu_item', 'location'
-                ).get(pk=pk)
+                    'menu_item__category', 'location'
+                ).defer('menu_item__image', 'menu_item__category__image').get(pk=pk)
             except LocationMenuItem.DoesNotExist:
                 return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -50,7 +43,8 @@ class LocationMenuItemView(APIView):
                 'menu_item_description': location_menu_item.menu_item.description,
                 'menu_item_category': location_menu_item.menu_item.category.id,
                 'menu_item_category_name': location_menu_item.menu_item.category.name,
-                'menu_item_image': self.encode_image_to_data_url(location_menu_item.menu_item.image),
+                'menu_item_image': image_url(location_menu_item.menu_item.image_hash),
+                'menu_item_thumbnails': thumbnail_urls([location_menu_item.menu_item.image_hash]).get(location_menu_item.menu_item.image_hash, {}),
                 'location_id': location_menu_item.location.id,
                 'location_name': location_menu_item.location.name,
                 'is_assigned': location_menu_item.is_assigned,
@@ -67,7 +61,9 @@ class LocationMenuItemView(APIView):
         if not ensure_can_access_location(request.user, location_id):
             return Response({'error': 'Not allowed'}, status=status.HTTP_403_FORBIDDEN)
 
-        queryset = LocationMenuItem.objects.select_related('menu_item', 'location').filter(
+        queryset = LocationMenuItem.objects.select_related('menu_item__category', 'location').defer(
+            'menu_item__image', 'menu_item__category__image'
+        ).filter(
             location_id=location_id,
             menu_item__is_active=True
         )
@@ -78,6 +74,8 @@ class LocationMenuItemView(APIView):
         elif assigned_param.lower() == 'false':
             queryset = queryset.filter(is_assigned=False)
 
+        queryset = list(queryset)
+        thumbnails = thumbnail_urls(item.menu_item.image_hash for item in queryset)
         data = []
         for item in queryset:
             data.append({
@@ -88,7 +86,8 @@ class LocationMenuItemView(APIView):
                 'menu_item_description': item.menu_item.description,
                 'menu_item_category': item.menu_item.category.id,
                 'menu_item_category_name': item.menu_item.category.name,
-                'menu_item_image': self.encode_image_to_data_url(item.menu_item.image),
+                'menu_item_image': image_url(item.menu_item.image_hash),
+                'menu_item_thumbnails': thumbnails.get(item.menu_item.image_hash, {}),
                 'location_id': item.location.id,
                 'location_name': item.location.name,
                 'is_assigned': item.is_assigned,
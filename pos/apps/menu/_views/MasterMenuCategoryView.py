@@ -1,6 +1,7 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from pos.apps.menu.images import store_upload
 from pos.apps.menu.models import MasterMenuCategory
 from pos.utils.logger import POSLogger
 
@@ -41,7 +42,7 @@ class MasterMenuCategoryView(APIView):
             category = MasterMenuCategory.objects.create(
                 name=request.data.get('name'),
                 description=request.data.get('description', ''),
-                image=request.FILES.get('image').read() if request.FILES.get('image') else None
+                image_hash=store_upload(request.FILES['image']) if request.FILES.get('image') else None
             )
             return Response({
                 'id': category.id,
@@ -65,7 +66,7 @@ class MasterMenuCategoryView(APIView):
             if 'description' in request.data:
                 category.description = request.data['description']
             if request.FILES.get('image'):
-                category.image = request.FILES['image'].read()
+                category.image_hash = store_upload(request.FILES['image'])
             category.save()
             return Response({
                 'id': category.id,
@@ -1,10 +1,10 @@
-import base64
 from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework import status
 from django.db import transaction
+from pos.apps.menu.images import image_url, store_upload, thumbnail_urls
 from pos.apps.menu.models import MasterMenuItem, MasterMenuCategory,LocationMenuItem
 from pos.utils.logger import POSLogger
 
@@ -13,12 +13,6 @@ logger = POSLogger()
 class MasterMenuItemView(APIView):
     parser_classes = (MultiPartParser, FormParser, JSONParser)
 
-    def encode_image_to_data_url(self, raw_bytes):
-        if not raw_bytes:
-            return None
-        base64_string = base64.b64encode(raw_bytes).decode('utf-8')
-        return f"data:image/jpeg;base64,{base64_string}"
-
     def get(self, request, pk=None):
 
         if not (getattr(request.user, "is_super_admin", False) or getattr(request.user, "is_franchise_admin", False)):
@@ -26,7 +20,7 @@ class MasterMenuItemView(APIView):
         # List all or get a specific item by pk
         if pk:
             try:
-                item = MasterMenuItem.objects.get(pk=pk)
+                item = MasterMenuItem.objects.select_related('category').defer('category__image').get(pk=pk)
                 data = {
                     'id': item.id,
                     'name': item.name,
@@ -34,13 +28,15 @@ class MasterMenuItemView(APIView):
                     'price': float(item.price),
                     'category_id': item.category.id,
                     'category_name': item.category.name,
-                    'image': self.encode_image_to_data_url(item.image),
+                    'image': image_url(item.image_hash),
+                    'thumbnails': thumbnail_urls([item.image_hash]).get(item.image_hash, {}),
                 }
                 return Response(data)
             except MasterMenuItem.DoesNotExist:
                 return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
         else:
-            items = MasterMenuItem.objects.filter(is_active=True).select_related('category')
+            items = list(MasterMenuItem.objects.filter(is_active=True).select_related('category').defer('category__image'))
+            thumbnails = thumbnail_urls(item.image_hash for item in items)
             data = [{
                 'id': item.id,
                 'name': item.name,
@@ -48,7 +44,8 @@ class MasterMenuItemView(APIView):
                 'price': float(item.price),
                 'category_id': item.category.id,
                 'category_name': item.category.name,
-                'image': self.encode_image_to_data_url(item.image),
+                'image': image_url(item.image_hash),
+                'thumbnails': thumbnails.get(item.image_hash, {}),
                 'is_active': item.is_active
             } for item in items]
             return Response({'menu_items': data})
@@ -68,16 +65,16 @@ class MasterMenuItemView(APIView):
                 return Response({'error': f'Menu item with name "{name}" already exists'}, status=status.HTTP_400_BAD_REQUEST)
             
             category = MasterMenuCategory.objects.get(pk=category_id)
-            image_bytes = None
+            image_hash = None
             uploaded_file = request.FILES.get('image')
             if uploaded_file:
-                image_bytes = uploaded_file.read()
+                image_hash = store_upload(uploaded_file)
             new_item = MasterMenuItem.objects.create(
                 name=name,
                 price=price,
                 description=description,
                 category=category,
-                image=image_bytes or None
+                image_hash=image_hash
             )
             data = {
                 'id': new_item.id,
@@ -86,7 +83,7 @@ class MasterMenuItemView(APIView):
                 'price': float(new_item.price),
                 'category_id': new_item.category.id,
                 'category_name': new_item.category.name,
-                'image': self.encode_image_to_data_url(new_item.image)
+                'image': image_url(new_item.image_hash)
             }
             return Response(data, status=status.HTTP_201_CREATED)
         except MasterMenuCategory.DoesNotExist:
@@ -120,8 +117,7 @@ class MasterMenuItemView(APIView):
                 item.category = category
             uploaded_file = request.FILES.get('image')
             if uploaded_file:
-                image_bytes = uploaded_file.read()
-                item.image = image_bytes
+                item.image_hash = store_upload(uploaded_file)
             item.save()
             data = {
                 'id': item.id,
@@ -130,7 +126,7 @@ class MasterMenuItemView(APIView):
                 'price': float(item.price),
                 'category_id': item.category.id,
                 'category_name': item.category.name,
-                'image': self.encode_image_to_data_url(item.image)
+                'image': image_url(item.image_hash)
             }
             return Response(data, status=status.HTTP_200_OK)
         except MasterMenuItem.DoesNotExist:
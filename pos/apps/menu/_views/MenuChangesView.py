@@ -0,0 +1,33 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from pos.apps.menu.changes import changes_since
+from pos.utils.permissions import can_access_location
+from pos.utils.logger import POSLogger
+
+logger = POSLogger(__name__)
+
+
+class MenuChangesView(APIView):
+    """
+    Menu changes of a location after sequence number ?since=, as upserts and
+    tombstones. Terminals pass the returned next_since on their next call;
+    when reset is true they reload /menu/snapshot/ and continue from next_since.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            location_id = int(request.query_params.get('location_id'))
+            since = int(request.query_params.get('since', 0))
+        except (TypeError, ValueError):
+            return Response({'error': 'location_id and since must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if since < 0:
+            return Response({'error': 'since must not be negative'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not can_access_location(request.user, location_id):
+            logger.warning(f"Unauthorized menu changes access for location {location_id} by {request.user.email}")
+            return Response({'error': 'Not allowed'}, status=status.HTTP_403_FORBIDDEN)
+
+        return Response({'location_id': location_id, 'since': since, **changes_since(location_id, since)})
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.http import FileResponse, HttpResponseNotModified, JsonResponse
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_safe
+
+from pos.apps.menu.images import IMAGE_HASH_PATTERN, guess_content_type, image_path
+
+
+def cache_headers(response, etag):
+    response['ETag'] = etag
+    # The URL names the content, so it can be cached for as long as clients like
+    response['Cache-Control'] = f'public, max-age={settings.MENU_IMAGE_MAX_AGE}, immutable'
+    return response
+
+
+@require_safe
+def menu_image(request, image_hash):
+    """Raw bytes of a stored menu image. Public: <img> tags cannot send a JWT"""
+    if not IMAGE_HASH_PATTERN.match(image_hash):
+        return JsonResponse({'error': 'Image not found'}, status=404)
+
+    etag = f'"{image_hash}"'
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and (if_none_match.strip() == '*' or etag in parse_etags(if_none_match)):
+        return cache_headers(HttpResponseNotModified(), etag)
+
+    try:
+        image_file = open(image_path(image_hash), 'rb')
+    except FileNotFoundError:
+        return JsonResponse({'error': 'Image not found'}, status=404)
+    content_type = guess_content_type(image_file.read(16))
+    image_file.seek(0)
+    return cache_headers(FileResponse(image_file, content_type=content_type), etag)
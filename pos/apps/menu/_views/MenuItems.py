@@ -1,12 +1,11 @@
-import base64
-from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser,JSONParser
 from rest_framework.response import Response
 from rest_framework import status
-from pos.apps.accounts.models import User
+from pos.apps.menu.images import image_url, store_upload, thumbnail_urls
 from pos.apps.menu.models import MenuItemModel, CategoryModel
 from pos.apps.locations.models import LocationModel
+from pos.utils.permissions import allowed_location_ids, can_access_location
 from pos.utils.logger import POSLogger
 
 logger = POSLogger()
@@ -16,12 +15,6 @@ class MenuItemsView(APIView):
     parser_classes = (MultiPartParser, FormParser,JSONParser)
 
 
-    def encode_image_to_data_url(self,raw_bytes):
-            if not raw_bytes:
-                return None
-            base64_string = base64.b64encode(raw_bytes).decode('utf-8')
-            return f"data:image/jpeg;base64,{base64_string}"
-
     def get(self, request):
         """Get all menu items or specific item if ID provided"""
         
@@ -45,12 +38,12 @@ class MenuItemsView(APIView):
                         'price': float(item.price),
                         'category': item.category.name,
                         'location': item.location.id,
-                        'image': self.encode_image_to_data_url(item.image)
+                        'image': image_url(item.image_hash),
+                        'thumbnails': thumbnail_urls([item.image_hash]).get(item.image_hash, {}),
                     }
                     return Response(data)
                 elif request.user.is_franchise_admin:
-                    admin = get_object_or_404(User, id=request.user.id, is_franchise_admin=True)
-                    if item.location.id not in [loc['id'] for loc in list(admin.locations.values('id', 'name'))]:
+                    if not can_access_location(request.user, item.location_id):
                         return Response({'error': 'not allowed'})
                     data = {
                         'id': item.id,
@@ -59,7 +52,8 @@ class MenuItemsView(APIView):
                         'price': float(item.price),
                         'category': item.category.name,
                         'location': item.location.id,
-                        'image': self.encode_image_to_data_url(item.image)
+                        'image': image_url(item.image_hash),
+                        'thumbnails': thumbnail_urls([item.image_hash]).get(item.image_hash, {}),
                     }
                     return Response(data)
                 else:
@@ -83,6 +77,7 @@ class MenuItemsView(APIView):
                     {'status': 'error', 'message': 'No menu items found for this location'},
                     status=status.HTTP_404_NOT_FOUND
                 )
+            thumbnails = thumbnail_urls(item.image_hash for item in menu_itmes)
             data = [{
                 'id': item.id,
                 'name': item.name,
@@ -90,7 +85,8 @@ class MenuItemsView(APIView):
                 'price': float(item.price),
                 'category': item.category.name,
                 'location_id': item.location.id,
-                'image': self.encode_image_to_data_url(item.image) if item.image else None
+                'image': image_url(item.image_hash),
+                'thumbnails': thumbnails.get(item.image_hash, {})
             } for item in menu_itmes]
             return Response({'menu_items': data})
            
@@ -98,14 +94,14 @@ class MenuItemsView(APIView):
         if request.user.is_super_admin:
             items = MenuItemModel.objects.filter(is_available=True)
         elif request.user.is_franchise_admin or request.user.is_staff_member:
-            requester = get_object_or_404(User, id=request.user.id)
             items = MenuItemModel.objects.filter(
                 is_available=True,
-                location__in=requester.locations.all()
+                location_id__in=allowed_location_ids(request.user)
             )
         else:
             return Response({'error': 'not allowed'})
 
+        thumbnails = thumbnail_urls(item.image_hash for item in items)
         data = [{
             'id': item.id,
             'name': item.name,
@@ -113,7 +109,8 @@ class MenuItemsView(APIView):
             'price': float(item.price),
             'category': item.category.name,
             'location_id': item.location.id,
-            'image': self.encode_image_to_data_url(item.image)
+            'image': image_url(item.image_hash),
+            'thumbnails': thumbnails.get(item.image_hash, {})
         } for item in items]
         return Response({'menu_items': data})
 
@@ -141,10 +138,10 @@ class MenuItemsView(APIView):
                 if not request.user.has_location_access(requested_loc_id):
                     return Response({'error': 'does not have access to this location'})
             
-            image_bytes = None
+            image_hash = None
             uploaded_file = request.FILES.get('image')
             if uploaded_file:
-                 image_bytes = uploaded_file.read()
+                 image_hash = store_upload(uploaded_file)
 
             # Create menu item
             new_item = MenuItemModel.objects.create(
@@ -153,7 +150,7 @@ class MenuItemsView(APIView):
                 description=descritption,
                 category=category,
                 location=location,
-                image=image_bytes or None,
+                image_hash=image_hash,
                 is_available=True
             )
             
@@ -165,7 +162,7 @@ class MenuItemsView(APIView):
                 'price': float(new_item.price),
                 'category': new_item.category.name,
                 'location_id' : new_item.location.id,
-                'image': self.encode_image_to_data_url(new_item.image)
+                'image': image_url(new_item.image_hash)
             }, status=status.HTTP_201_CREATED)
 
         except Exception as e:
@@ -219,8 +216,7 @@ class MenuItemsView(APIView):
                     f"PUT: updating image: name={uploaded_file.name}, "
                     f"size={uploaded_file.size}, content_type={uploaded_file.content_type}"
                 )
-                image_bytes = uploaded_file.read()
-                item.image = image_bytes  # or `None` if you want to allow blank
+                item.image_hash = store_upload(uploaded_file)
 
             # 6) Save all changes
             item.save()
@@ -265,8 +261,7 @@ class MenuItemsView(APIView):
 
             # 1) Permissions (franchise_admin only for their own location, super_admin always OK)
             if request.user.is_franchise_admin:
-                admin = get_object_or_404(User, id=request.user.id, is_franchise_admin=True)
-                if item.location.id not in [loc['id'] for loc in admin.locations.values('id', 'name')]:
+                if not can_access_location(request.user, item.location_id):
                     return Response({'error': 'not allowed'}, status=status.HTTP_403_FORBIDDEN)
             elif not request.user.is_super_admin:
                 return Response({'error': 'not allowed'}, status=status.HTTP_403_FORBIDDEN)
@@ -314,8 +309,7 @@ class MenuItemsView(APIView):
                     f"PATCH: updating image: name={uploaded_file.name}, "
                     f"size={uploaded_file.size}, content_type={uploaded_file.content_type}"
                 )
-                image_bytes = uploaded_file.read()
-                item.image = image_bytes  # or `None` if you want to allow clearing it
+                item.image_hash = store_upload(uploaded_file)
 
             # 7) Save changes
             item.save()
@@ -328,7 +322,7 @@ class MenuItemsView(APIView):
                 'price': float(item.price),
                 'category': item.category.name,
                 'location_id' : item.location.id,
-                'image': self.encode_image_to_data_url(item.image)
+                'image': image_url(item.image_hash)
             }, status=status.HTTP_201_CREATED)
 
         except MenuItemModel.DoesNotExist:
@@ -1,7 +1,7 @@
-import base64
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from pos.apps.menu.images import image_url
 from pos.apps.menu.models import MasterMenuItem
 from pos.utils.logger import POSLogger
 
@@ -15,14 +15,6 @@ class MenuItemsArchive(APIView):
         data = []
 
         for item in archived_items:
-            # Handle image as base64
-            image_base64 = None
-            if item.image:
-                try:
-                    image_base64 = base64.b64encode(bytes(item.image)).decode('utf-8')
-                except Exception as e:
-                    POSLogger.error(f"Error encoding image for item {item.id}: {e}")
-
             data.append({
                 'id': item.id,
                 'name': item.name,
@@ -30,7 +22,7 @@ class MenuItemsArchive(APIView):
                 'description': item.description,
                 'category_id': item.category.id,
                 'category_name': item.category.name,
-                'image': image_base64,
+                'image': image_url(item.image_hash),
                 'is_active': item.is_active,
             })
 
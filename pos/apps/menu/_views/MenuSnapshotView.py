@@ -0,0 +1,69 @@
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from pos.apps.menu.snapshots import get_snapshot, snapshot_etag
+from pos.utils.permissions import can_access_location
+from pos.utils.logger import POSLogger
+
+logger = POSLogger(__name__)
+
+
+def requested_snapshot(request):
+    """(snapshot, None) for ?location_id=, or (None, error response)"""
+    location_id = request.query_params.get('location_id')
+    try:
+        location_id = int(location_id)
+    except (TypeError, ValueError):
+        return None, Response({'error': 'location_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not can_access_location(request.user, location_id):
+        logger.warning(f"Unauthorized menu snapshot access for location {location_id} by {request.user.email}")
+        return None, Response({'error': 'Not allowed'}, status=status.HTTP_403_FORBIDDEN)
+
+    snapshot = get_snapshot(location_id)
+    if snapshot is None:
+        return None, Response({'error': 'Location not found'}, status=status.HTTP_404_NOT_FOUND)
+    return snapshot, None
+
+
+class MenuSnapshotView(APIView):
+    """
+    A location's whole sellable menu as one precompiled JSON document.
+
+    The ETag carries the snapshot version: a terminal sending it back with
+    If-None-Match gets 304 until the menu actually changes.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        snapshot, error = requested_snapshot(request)
+        if error:
+            return error
+
+        etag = snapshot_etag(snapshot)
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            client_etags = parse_etags(if_none_match)
+            if '*' in client_etags or etag in client_etags:
+                response = HttpResponseNotModified()
+                response['ETag'] = etag
+                return response
+
+        # Already serialized when the snapshot was built
+        response = HttpResponse(snapshot.body, content_type='application/json')
+        response['ETag'] = etag
+        return response
+
+
+class MenuSnapshotVersionView(APIView):
+    """Current menu version of a location, for terminals polling for changes"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        snapshot, error = requested_snapshot(request)
+        if error:
+            return error
+        return Response({'location_id': snapshot.location_id, 'version': snapshot.version})
@@ -0,0 +1,86 @@
+"""
+Menu change log and delta sync.
+
+Every menu mutation appends MenuChange rows naming what changed: an item
+(by master item id) or a category, at one location or at all of them.
+Entries carry no data. A terminal asks for the changes after the last
+sequence number it saw and gets the current state of each changed entry,
+shaped like the snapshot entries (menu.snapshots), plus tombstones for
+entries no longer on its menu. An availability toggle costs one log row,
+and a few hundred bytes to sync.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from pos.apps.menu.models import LocationMenuItem, MenuChange
+from pos.apps.menu.snapshots import category_document, item_documents, location_categories
+
+
+def record_changes(kind, keys, location_id=None):
+    """Log a change of these items or categories (location_id None: every location)"""
+    MenuChange.objects.bulk_create([MenuChange(location_id=location_id, kind=kind, key=key) for key in keys])
+
+
+def changes_since(location_id, since):
+    """
+    Delta for a terminal at sequence `since`. With reset set, the log cannot
+    serve it (too far behind, or pruned) and the terminal should load the
+    snapshot instead.
+    """
+    limit = settings.MENU_CHANGES_LIMIT
+    rows = list(
+        MenuChange.objects.filter(Q(location_id=location_id) | Q(location__isnull=True), id__gt=since)
+        .order_by('id').values_list('id', 'kind', 'key', 'created_at')[:limit + 1]
+    )
+    # A transaction that commits late can leave a lower sequence number
+    # behind a visible one, so cursors only pass settled rows. Newer rows
+    # are sent again next time; upserts are idempotent.
+    settled_before = timezone.now() - timedelta(seconds=settings.MENU_CHANGES_SETTLE_SECONDS)
+
+    # Rows after `since` may have been pruned
+    oldest = MenuChange.objects.order_by('id').values_list('id', flat=True).first()
+    if len(rows) > limit or (oldest is not None and since < oldest - 1):
+        latest = MenuChange.objects.filter(created_at__lte=settled_before).order_by('-id').values_list('id', flat=True).first()
+        return {'reset': True, 'next_since': latest or 0}
+
+    next_since = max((row_id for row_id, _, _, created_at in rows if created_at <= settled_before), default=since)
+
+    item_ids = {key for _, kind, key, _ in rows if kind == 'item'}
+    category_ids = {key for _, kind, key, _ in rows if kind == 'category'}
+    categories = location_categories(location_id)
+
+    items = []
+    if item_ids or category_ids:
+        # A category's availability is folded into its items, so they are resent too
+        items = item_documents(
+            location_id, categories, Q(menu_item_id__in=item_ids) | Q(menu_item__category_id__in=category_ids)
+        )
+        # and items of a category that left the menu get tombstones with it
+        item_ids |= set(LocationMenuItem.objects.filter(
+            location_id=location_id, menu_item__category_id__in=category_ids
+        ).values_list('menu_item_id', flat=True))
+    sent_item_ids = {item['menu_item_id'] for item in items}
+
+    return {
+        'reset': False,
+        'next_since': next_since,
+        'upserts': {
+            'categories': [category_document(categories[category_id]) for category_id in sorted(category_ids) if category_id in categories],
+            'items': items,
+        },
+        'deletes': {
+            'categories': sorted(category_ids - set(categories)),
+            'items': sorted(item_ids - sent_item_ids),
+        },
+    }
+
+
+def prune_changes(older_than_days):
+    """Delete log rows older than the retention period; terminals behind them get a reset"""
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    deleted, _ = MenuChange.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,174 @@
+"""
+Content-addressed store for menu images.
+
+Images live on the filesystem under settings.MENU_IMAGE_ROOT, named by the
+SHA-256 of their bytes, and menu rows keep only that hash (image_hash).
+Identical uploads share one file, and a file never changes once written,
+so /media/menu/<hash> can be cached by browsers and CDNs for good.
+API responses carry image URLs, never image bytes.
+
+Uploads are checked with Pillow, and their real MIME type and size are
+recorded in MenuImage. After the upload commits, image_pool renders
+thumbnails that fit MENU_IMAGE_SIZES boxes, with EXIF orientation applied,
+and stores them like any other image. Tablets can then load a few KB
+instead of the original photo.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections, transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from pos.apps.menu.models import LocationMenuItem, MasterMenuItem, MenuImage
+from pos.utils.logger import POSLogger
+
+logger = POSLogger(__name__)
+
+# Thumbnails are rendered here, off the request thread
+image_pool = ThreadPoolExecutor(max_workers=settings.MENU_IMAGE_WORKERS, thread_name_prefix='menu-images')
+
+IMAGE_HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+# Leading bytes of the formats clients upload
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+
+def image_path(image_hash):
+    """File path for a hash; fanned out over two directory levels"""
+    return Path(settings.MENU_IMAGE_ROOT) / image_hash[:2] / image_hash[2:4] / image_hash
+
+
+def store_image(data):
+    """Write image bytes to the store (once per distinct content) and return their hash"""
+    image_hash = hashlib.sha256(data).hexdigest()
+    path = image_path(image_hash)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so readers never see a partial file
+        fd, temp_path = tempfile.mkstemp(dir=path.parent)
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                temp_file.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    return image_hash
+
+
+def inspect_image(data):
+    """(content_type, width, height) of image bytes; ValueError if Pillow cannot read them"""
+    try:
+        with Image.open(BytesIO(data)) as image:
+            return Image.MIME.get(image.format, 'application/octet-stream'), image.width, image.height
+    except (UnidentifiedImageError, Image.DecompressionBombError) as e:
+        raise ValueError('Unsupported image file') from e
+
+
+def register_image(data):
+    """Store image bytes with their MenuImage record and return the hash"""
+    content_type, width, height = inspect_image(data)
+    image_hash = store_image(data)
+    MenuImage.objects.get_or_create(
+        hash=image_hash, defaults={'content_type': content_type, 'width': width, 'height': height}
+    )
+    return image_hash
+
+
+def store_upload(uploaded_file):
+    """
+    Store an uploaded image and return its hash; thumbnails follow once the
+    request's transaction commits. ValueError for files that are not images.
+    """
+    image_hash = register_image(uploaded_file.read())
+    transaction.on_commit(lambda: schedule_variants(image_hash))
+    return image_hash
+
+
+def render_variants(data):
+    """{box size: encoded thumbnail} for every MENU_IMAGE_SIZES entry"""
+    sizes = sorted(settings.MENU_IMAGE_SIZES, reverse=True)
+    variant_format = settings.MENU_IMAGE_VARIANT_FORMAT
+    with Image.open(BytesIO(data)) as image:
+        # Lets JPEG decode at a fraction of its full resolution
+        image.draft('RGB', (sizes[0], sizes[0]))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha and variant_format != 'JPEG' else 'RGB')
+
+        variants = {}
+        # Largest first, each one scaled down from the previous
+        for size in sizes:
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            output = BytesIO()
+            image.save(output, format=variant_format, quality=settings.MENU_IMAGE_VARIANT_QUALITY)
+            variants[size] = output.getvalue()
+    return variants
+
+
+def generate_variants(image_hash):
+    """Render and store the thumbnails of a stored image"""
+    data = image_path(image_hash).read_bytes()
+    variants = {str(size): store_image(variant) for size, variant in render_variants(data).items()}
+    MenuImage.objects.filter(hash=image_hash).update(variants=variants)
+
+    from pos.apps.menu.changes import record_changes
+    from pos.apps.menu.snapshots import mark_stale
+    # Menu snapshots and deltas list thumbnail URLs
+    mark_stale(LocationMenuItem.objects.filter(menu_item__image_hash=image_hash).values('location_id'))
+    record_changes('item', MasterMenuItem.objects.filter(image_hash=image_hash).values_list('id', flat=True))
+    return variants
+
+
+def generate_variants_in_pool(image_hash):
+    try:
+        generate_variants(image_hash)
+    except Exception as e:
+        logger.error(f"Could not render thumbnails for image {image_hash}: {str(e)}")
+    finally:
+        # Pool threads open their own database connections
+        connections.close_all()
+
+
+def schedule_variants(image_hash):
+    image_pool.submit(generate_variants_in_pool, image_hash)
+
+
+def guess_content_type(head):
+    """MIME type from the first bytes of an image"""
+    for signature, content_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+def image_url(image_hash):
+    """Public URL of a stored image, or None"""
+    if not image_hash:
+        return None
+    return f"{settings.MENU_IMAGE_URL}{image_hash}"
+
+
+def thumbnail_urls(image_hashes):
+    """{image_hash: {box size: url}} for images whose thumbnails are ready, in one query"""
+    image_hashes = {image_hash for image_hash in image_hashes if image_hash}
+    if not image_hashes:
+        return {}
+    return {
+        image_hash: {size: image_url(variant_hash) for size, variant_hash in variants.items()}
+        for image_hash, variants in MenuImage.objects.filter(hash__in=image_hashes).values_list('hash', 'variants')
+    }
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from pos.apps.menu.images import generate_variants, image_path, register_image
+from pos.apps.menu.management.commands.migrate_menu_images import IMAGE_MODELS
+from pos.apps.menu.models import MenuImage
+
+
+class Command(BaseCommand):
+    help = "Render thumbnails for stored menu images that have none"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help="Re-render every image, e.g. after MENU_IMAGE_SIZES changed")
+
+    def handle(self, *args, **options):
+        # Images stored before MenuImage records existed
+        known = set(MenuImage.objects.values_list('hash', flat=True))
+        for model in IMAGE_MODELS:
+            hashes = set(model.objects.filter(image_hash__isnull=False).values_list('image_hash', flat=True))
+            for image_hash in hashes - known:
+                try:
+                    register_image(image_path(image_hash).read_bytes())
+                except (OSError, ValueError) as e:
+                    self.stderr.write(f"Image {image_hash} skipped: {str(e)}")
+                known.add(image_hash)
+
+        images = MenuImage.objects.all() if options['rebuild'] else MenuImage.objects.filter(variants={})
+        total = 0
+        for image_hash in images.values_list('hash', flat=True).iterator():
+            try:
+                generate_variants(image_hash)
+                total += 1
+            except Exception as e:
+                self.stderr.write(f"Image {image_hash} failed: {str(e)}")
+        self.stdout.write(self.style.SUCCESS(f"Rendered thumbnails for {total} images"))
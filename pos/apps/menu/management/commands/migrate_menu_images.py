@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from pos.apps.menu.images import register_image, store_image
+from pos.apps.menu.models import CategoryModel, MasterMenuCategory, MasterMenuItem, MenuItemModel
+
+IMAGE_MODELS = (MasterMenuItem, MasterMenuCategory, MenuItemModel, CategoryModel)
+
+
+class Command(BaseCommand):
+    help = "Move menu images stored in the database into the image store"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model in IMAGE_MODELS:
+            total = 0
+            while True:
+                # Only a batch of blobs is held in memory at a time
+                rows = list(
+                    model.objects.with_images().filter(image__isnull=False).order_by('id').values_list('id', 'image', 'image_hash')[:batch_size]
+                )
+                if not rows:
+                    break
+                with transaction.atomic():
+                    for row_id, image, image_hash in rows:
+                        # A hash set by an upload since is newer than the blob
+                        if not image_hash and image:
+                            image_hash = self.store(model, row_id, bytes(image))
+                        model.objects.filter(id=row_id).update(image_hash=image_hash, image=None)
+                total += len(rows)
+            self.stdout.write(self.style.SUCCESS(f"Moved {total} {model.__name__} images"))
+
+    def store(self, model, row_id, data):
+        try:
+            return register_image(data)
+        except ValueError:
+            # Kept as is, but without a MenuImage record no thumbnails are made
+            self.stderr.write(f"{model.__name__} {row_id}: image could not be read, moved without thumbnails")
+            return store_image(data)
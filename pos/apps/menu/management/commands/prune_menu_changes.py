@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from pos.apps.menu.changes import prune_changes
+
+
+class Command(BaseCommand):
+    help = "Delete menu change log rows past the retention period"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.MENU_CHANGES_RETENTION_DAYS)
+
+    def handle(self, *args, **options):
+        deleted = prune_changes(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} menu change log rows"))
@@ -2,13 +2,33 @@
 from django.db import models
 from pos.apps.locations.models import LocationModel
 
+
+class MenuQuerySet(models.QuerySet):
+    def with_images(self):
+        """Load every column, the image blob included"""
+        return self.defer(None)
+
+
+class MenuManager(models.Manager.from_queryset(MenuQuerySet)):
+    """
+    Leaves the image blob unread unless asked for with with_images().
+    Related-object access and refresh_from_db() still use Django's base
+    manager and read the whole row. Queries joining these models with
+    select_related should defer '<relation>__image' themselves.
+    """
+    def get_queryset(self):
+        return super().get_queryset().defer('image')
+
 class CategoryModel(models.Model):
     """Simple food categories like Breakfast, Coffee, Meals, etc."""
     name = models.CharField(max_length=100)
     display_order = models.PositiveIntegerField(default=0)
-    image = models.BinaryField(null=True, blank=True)
+    image = models.BinaryField(null=True, blank=True)  # legacy, emptied by migrate_menu_images
+    image_hash = models.CharField(max_length=64, null=True, blank=True)  # see menu.images
     location = models.ForeignKey(LocationModel, on_delete=models.CASCADE)
     description = models.TextField(blank=True, null=True)  
+
+    objects = MenuManager()
     
     class Meta:
         verbose_name_plural = "Categories"
@@ -24,8 +44,11 @@ class MenuItemModel(models.Model):
     description = models.TextField(blank=True, null=True)
     category = models.ForeignKey(CategoryModel, on_delete=models.CASCADE)
     is_available = models.BooleanField(default=True)
-    image = models.BinaryField(null=True, blank=True)
+    image = models.BinaryField(null=True, blank=True)  # legacy, emptied by migrate_menu_images
+    image_hash = models.CharField(max_length=64, null=True, blank=True)  # see menu.images
     location = models.ForeignKey(LocationModel, on_delete=models.CASCADE)
+
+    objects = MenuManager()
     
     class Meta:
         ordering = ['category__display_order', 'name']
@@ -38,10 +61,13 @@ class MenuItemModel(models.Model):
 class MasterMenuCategory(models.Model):
     """Brand-wide categories: e.g. Coffee, Breakfast"""
     name = models.CharField(max_length=100)
-    image = models.BinaryField(null=True, blank=True)
+    image = models.BinaryField(null=True, blank=True)  # legacy, emptied by migrate_menu_images
+    image_hash = models.CharField(max_length=64, null=True, blank=True)  # see menu.images
     description = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True) 
 
+    objects = MenuManager()
+
     class Meta:
         verbose_name_plural = "Categories"
       
@@ -56,7 +82,10 @@ class MasterMenuItem(models.Model):
     description = models.TextField(blank=True, null=True)
     category = models.ForeignKey(MasterMenuCategory, on_delete=models.CASCADE)
     is_active = models.BooleanField(default=True) # for soft deletion
-    image = models.BinaryField(null=True, blank=True)
+    image = models.BinaryField(null=True, blank=True)  # legacy, emptied by migrate_menu_images
+    image_hash = models.CharField(max_length=64, null=True, blank=True)  # see menu.images
+
+    objects = MenuManager()
     
     class Meta:
         ordering = [ 'name']
@@ -90,4 +119,61 @@ class LocationMenuCategory(models.Model):
         unique_together = ('category', 'location')
 
     def __str__(self):
-        return f"{self.category.name} ({self.location.name})"
\ No newline at end of file
+        return f"{self.category.name} ({self.location.name})"
+
+class MenuImage(models.Model):
+    """
+    What is known about one stored image (see menu.images): its real MIME
+    type, size and the hashes of its thumbnails, keyed by box size
+    """
+    hash = models.CharField(max_length=64, primary_key=True)
+    content_type = models.CharField(max_length=100)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    variants = models.JSONField(default=dict, blank=True)  # {"256": hash, ...}, filled by the image pool
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.hash} ({self.content_type})"
+
+
+class MenuSnapshot(models.Model):
+    """
+    One location's sellable menu compiled into a JSON document for POS
+    terminals (see menu.snapshots). version only grows, and only when the
+    document's content changes.
+    """
+    location = models.OneToOneField(LocationModel, on_delete=models.CASCADE, related_name='menu_snapshot')
+    version = models.PositiveBigIntegerField(default=0)
+    body = models.TextField(blank=True, default='')  # serialized document, version included
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+    is_stale = models.BooleanField(default=True)  # set by menu/signals.py on any menu change
+    built_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Menu of {self.location_id} v{self.version}"
+
+
+class MenuChange(models.Model):
+    """
+    Menu change log for delta sync (see menu.changes). The id is the change
+    sequence number terminals sync from.
+    """
+    KIND_CHOICES = [
+        ('item', 'Item'),
+        ('category', 'Category'),
+    ]
+
+    location = models.ForeignKey(LocationModel, on_delete=models.CASCADE, null=True, blank=True)  # null: every location
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    key = models.BigIntegerField()  # MasterMenuItem or MasterMenuCategory id
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["location", "id"]),
+            models.Index(fields=["created_at"]),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.kind} {self.key} ({self.location_id or 'all locations'})"
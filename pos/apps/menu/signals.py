@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from pos.apps.menu.changes import record_changes
+from pos.apps.menu.models import LocationMenuCategory, LocationMenuItem, MasterMenuCategory, MasterMenuItem
+from pos.apps.menu.snapshots import mark_stale
+
+
+@receiver(post_save, sender=LocationMenuItem)
+@receiver(post_delete, sender=LocationMenuItem)
+def location_item_changed(sender, instance, **kwargs):
+    mark_stale([instance.location_id])
+    record_changes('item', [instance.menu_item_id], instance.location_id)
+
+
+@receiver(post_save, sender=LocationMenuCategory)
+@receiver(post_delete, sender=LocationMenuCategory)
+def location_category_changed(sender, instance, **kwargs):
+    mark_stale([instance.location_id])
+    record_changes('category', [instance.category_id], instance.location_id)
+
+
+@receiver(post_save, sender=MasterMenuItem)
+def master_item_changed(sender, instance, **kwargs):
+    # Deleting the item cascades to its LocationMenuItems, which are handled above
+    mark_stale(LocationMenuItem.objects.filter(menu_item_id=instance.id).values('location_id'))
+    record_changes('item', [instance.id])
+
+
+@receiver(post_save, sender=MasterMenuCategory)
+def master_category_changed(sender, instance, **kwargs):
+    mark_stale(LocationMenuCategory.objects.filter(category_id=instance.id).values('location_id'))
+    record_changes('category', [instance.id])
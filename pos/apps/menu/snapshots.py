@@ -0,0 +1,136 @@
+"""
+Precompiled per-location menus for POS terminals.
+
+A location's snapshot is one JSON document with its categories and its
+sellable items at their effective price and availability. Menu writes only
+flag the affected snapshots as stale (menu/signals.py), inside the writer's
+transaction; the next read rebuilds those locations alone and bumps the
+version if the content changed. Terminals poll the version, or send the
+ETag back, and download the document only when it changed.
+"""
+
+import hashlib
+import json
+
+from django.db import transaction
+from django.utils import timezone
+
+from pos.apps.locations.models import LocationModel
+from pos.apps.menu.images import image_url, thumbnail_urls
+from pos.apps.menu.models import LocationMenuCategory, LocationMenuItem, MenuSnapshot
+
+
+def mark_stale(location_ids):
+    """
+    Flag the snapshots of these locations (a list or a location_id subquery)
+    for rebuilding. Already stale rows are updated too: the row lock held
+    until the writer commits makes a concurrent rebuild_snapshot wait and
+    build from the committed menu.
+    """
+    MenuSnapshot.objects.filter(location_id__in=location_ids).update(is_stale=True)
+
+
+def location_categories(location_id):
+    """The location's assigned, active LocationMenuCategory rows by category id"""
+    rows = LocationMenuCategory.objects.filter(
+        location_id=location_id, is_assigned=True, category__is_active=True
+    ).select_related('category').defer('category__image')
+    return {row.category_id: row for row in rows}
+
+
+def category_document(row):
+    return {
+        'id': row.category_id,
+        'name': row.category.name,
+        'description': row.category.description,
+        'image': image_url(row.category.image_hash),
+        'is_available': row.is_available,
+    }
+
+
+def item_documents(location_id, categories, items_filter=None):
+    """
+    Assigned, active items of the location (optionally narrowed by a Q) at
+    their effective price and availability. categories is location_categories();
+    items of any other category are left out, like the category itself.
+    """
+    items = LocationMenuItem.objects.filter(
+        location_id=location_id, is_assigned=True, menu_item__is_active=True, menu_item__category_id__in=list(categories)
+    )
+    if items_filter is not None:
+        items = items.filter(items_filter)
+    items = list(items.select_related('menu_item').defer('menu_item__image'))
+    thumbnails = thumbnail_urls(item.menu_item.image_hash for item in items)
+
+    documents = []
+    for item in items:
+        menu_item = item.menu_item
+        documents.append({
+            'id': item.id,
+            'menu_item_id': menu_item.id,
+            'name': menu_item.name,
+            'description': menu_item.description,
+            'category_id': menu_item.category_id,
+            'price': float(item.price if item.price is not None else menu_item.price),
+            # Items of a category switched off at this location cannot be sold either
+            'is_available': item.is_available and categories[menu_item.category_id].is_available,
+            'image': image_url(menu_item.image_hash),
+            'thumbnails': thumbnails.get(menu_item.image_hash, {}),
+        })
+    return documents
+
+
+def build_menu_document(location_id):
+    """The location's categories and items, in at most three queries"""
+    categories = location_categories(location_id)
+    return {
+        'categories': sorted(
+            (category_document(row) for row in categories.values()),
+            key=lambda category: (category['name'], category['id']),
+        ),
+        'items': item_documents(location_id, categories),
+    }
+
+
+def rebuild_snapshot(location_id):
+    """Rebuild a stale (or missing) snapshot under a row lock; returns it"""
+    with transaction.atomic():
+        snapshot, _ = MenuSnapshot.objects.select_for_update().get_or_create(location_id=location_id)
+        if not snapshot.is_stale:
+            # Another request rebuilt it while this one waited for the lock
+            return snapshot
+
+        document = build_menu_document(location_id)
+        content = json.dumps(document, sort_keys=True, separators=(',', ':'))
+        content_hash = hashlib.sha256(content.encode()).hexdigest()
+        if content_hash != snapshot.content_hash:
+            snapshot.version += 1
+            snapshot.content_hash = content_hash
+            snapshot.built_at = timezone.now()
+            snapshot.body = json.dumps({
+                'location_id': location_id,
+                'version': snapshot.version,
+                'built_at': snapshot.built_at.isoformat(),
+                **document,
+            }, separators=(',', ':'))
+        snapshot.is_stale = False
+        snapshot.save()
+    return snapshot
+
+
+def get_snapshot(location_id):
+    """
+    Up-to-date snapshot of a location, or None if there is no such location.
+    body is deferred, so answering a version poll or a matching
+    If-None-Match never reads the document.
+    """
+    snapshot = MenuSnapshot.objects.defer('body').filter(location_id=location_id).first()
+    if snapshot is None and not LocationModel.objects.filter(id=location_id).exists():
+        return None
+    if snapshot is None or snapshot.is_stale:
+        snapshot = rebuild_snapshot(location_id)
+    return snapshot
+
+
+def snapshot_etag(snapshot):
+    return f'"menu-{snapshot.location_id}-{snapshot.version}"'
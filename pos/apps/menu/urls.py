@@ -2,7 +2,7 @@ from django.urls import path
 
 from pos.apps.menu._views.CategoryArchiveView import CategoryArchiveView
 from pos.apps.menu._views.MenuItemsArchive import RestoreMenuItem
-from .views import MenuItemsView, CategoryView,MasterMenuItemView, MasterMenuCategoryView,LocationMenuItemView, LocationCategoryView, MasterMenuItemLocationsView,MenuItemsArchive
+from .views import MenuItemsView, CategoryView,MasterMenuItemView, MasterMenuCategoryView,LocationMenuItemView, LocationCategoryView, MasterMenuItemLocationsView,MenuItemsArchive, MenuSnapshotView, MenuSnapshotVersionView, MenuChangesView
 
 urlpatterns = [
     path('menu-items/', MenuItemsView.as_view()),
@@ -20,4 +20,7 @@ urlpatterns = [
     path('archived-menu-items/', MenuItemsArchive.as_view()),  
     path('restore-menu-item/<int:item_id>/', RestoreMenuItem.as_view()),
     path('archived-categories/', CategoryArchiveView.as_view()),  
+    path('snapshot/', MenuSnapshotView.as_view()),  # precompiled menu for POS terminals
+    path('snapshot/version/', MenuSnapshotVersionView.as_view()),
+    path('changes/', MenuChangesView.as_view()),  # delta sync after a snapshot
 ]
\ No newline at end of file
@@ -7,4 +7,7 @@ from ._views.LocationMenuItemView import LocationMenuItemView
 from ._views.LocationCategoryView import LocationCategoryView
 from ._views.MasterMenuItemLocationsView import MasterMenuItemLocationsView
 from ._views.MenuItemsArchive import MenuItemsArchive
-from ._views.CategoryArchiveView import CategoryArchiveView 
\ No newline at end of file
+from ._views.CategoryArchiveView import CategoryArchiveView
+from ._views.MenuImageView import menu_image
+from ._views.MenuSnapshotView import MenuSnapshotView, MenuSnapshotVersionView 
+from ._views.MenuChangesView import MenuChangesView
\ No newline at end of file
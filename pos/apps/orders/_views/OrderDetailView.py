@@ -0,0 +1,49 @@
+from django.db.models import prefetch_related_objects
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from pos.apps.orders.models import Order
+from pos.apps.orders.utils import order_etag, order_items_prefetch, serialize_order_detail, visible_orders
+from pos.utils.logger import POSLogger
+
+logger = POSLogger(__name__)
+
+
+class OrderDetailView(APIView):
+    """
+    Single order with location, processor and items in at most two queries.
+
+    Responses carry an ETag derived from Order.updated_at; a terminal polling
+    an open order with If-None-Match gets 304 after a single query.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, order_id):
+        user = request.user
+        orders = visible_orders(user)
+        if orders is None:
+            logger.warning(f"Unauthorized order access attempt for order {order_id} by {user.email}")
+            return Response({"error": "Not authorized to access this order"}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            order = orders.select_related('location', 'processed_by').get(id=order_id)
+        except Order.DoesNotExist:
+            return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        etag = order_etag(order)
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            client_etags = parse_etags(if_none_match)
+            if '*' in client_etags or etag in client_etags:
+                response = HttpResponseNotModified()
+                response['ETag'] = etag
+                return response
+
+        prefetch_related_objects([order], order_items_prefetch())
+        response = Response(serialize_order_detail(order))
+        response['ETag'] = etag
+        logger.info(f"Order {order_id} details retrieved by {user.email}")
+        return response
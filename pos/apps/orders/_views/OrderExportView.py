@@ -0,0 +1,137 @@
+import csv
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from pos.apps.orders.models import Order
+from pos.apps.orders.utils import filter_placed_at_range, order_items_prefetch
+from pos.utils.permissions import allowed_location_ids, can_access_location
+from pos.utils.logger import POSLogger
+
+logger = POSLogger(__name__)
+
+CSV_HEADER = [
+    'order_id', 'token_number', 'placed_at', 'location_id', 'location_name',
+    'processed_by', 'payment_mode', 'total_amount', 'is_cancelled', 'cancelled_at',
+    'menu_item_id', 'menu_item_name', 'menu_category', 'quantity', 'price',
+]
+
+
+class Echo:
+    """File-like object that hands each written CSV row straight back"""
+    def write(self, value):
+        return value
+
+
+class OrderExportView(APIView):
+    """
+    Stream order history as NDJSON (one order per line) or CSV (one row per item).
+    Params:
+        - export_format: "ndjson" (default) or "csv"
+        - location_id, date_from, date_to: same filters as order history
+
+    Orders are read through a server-side cursor in chunks of
+    ORDER_EXPORT_CHUNK_SIZE, so memory stays flat regardless of range.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        export_format = request.query_params.get('export_format', 'ndjson')
+        location_id = request.query_params.get('location_id')
+
+        if export_format not in ('ndjson', 'csv'):
+            return Response({"error": "export_format must be ndjson or csv"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if user.is_super_admin:
+            orders = Order.objects.all()
+        elif user.is_franchise_admin:
+            orders = Order.objects.filter(location_id__in=allowed_location_ids(user))
+        else:
+            logger.warning(f"Unauthorized order export attempt by {user.email}")
+            return Response({"error": "Not authorized to export orders"}, status=status.HTTP_403_FORBIDDEN)
+
+        if location_id:
+            if not can_access_location(user, location_id):
+                logger.warning(f"Unauthorized export attempt for location {location_id} by {user.email}")
+                return Response({"error": "You don't have access to this location"}, status=status.HTTP_403_FORBIDDEN)
+            orders = orders.filter(location_id=location_id)
+
+        try:
+            orders = filter_placed_at_range(
+                orders, request.query_params.get('date_from'), request.query_params.get('date_to')
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        orders = orders.select_related('location', 'processed_by').prefetch_related(
+            order_items_prefetch()
+        ).order_by('placed_at', 'id').iterator(chunk_size=settings.ORDER_EXPORT_CHUNK_SIZE)
+
+        if export_format == 'csv':
+            response = StreamingHttpResponse(self.csv_rows(orders), content_type='text/csv')
+            response['Content-Disposition'] = 'attachment; filename="orders.csv"'
+        else:
+            response = StreamingHttpResponse(self.ndjson_lines(orders), content_type='application/x-ndjson')
+            response['Content-Disposition'] = 'attachment; filename="orders.ndjson"'
+
+        logger.info(f"Order export ({export_format}) started by {user.email}")
+        return response
+
+    def ndjson_lines(self, orders):
+        for order in orders:
+            yield json.dumps({
+                'order_id': order.id,
+                'token_number': order.token_number,
+                'placed_at': order.placed_at,
+                'location': {
+                    'id': order.location.id,
+                    'name': order.location.name
+                },
+                'processed_by': order.processed_by.email if order.processed_by else None,
+                'payment_mode': order.payment_mode,
+                'total_amount': order.total_amount,
+                'is_cancelled': order.is_cancelled,
+                'cancelled_at': order.cancelled_at,
+                'order_items': [
+                    {
+                        'menu_item_id': item.menu_item_id,
+                        'menu_item_name': item.menu_item.menu_item.name,
+                        'menu_category': item.menu_item.menu_item.category.name,
+                        'quantity': item.quantity,
+                        'price': item.price,
+                    } for item in order.items.all()
+                ],
+            }, cls=DjangoJSONEncoder) + '\n'
+
+    def csv_rows(self, orders):
+        writer = csv.writer(Echo())
+        yield writer.writerow(CSV_HEADER)
+        for order in orders:
+            order_columns = [
+                order.id,
+                order.token_number,
+                order.placed_at.isoformat(),
+                order.location.id,
+                order.location.name,
+                order.processed_by.email if order.processed_by else '',
+                order.payment_mode,
+                order.total_amount,
+                order.is_cancelled,
+                order.cancelled_at.isoformat() if order.cancelled_at else '',
+            ]
+            items = order.items.all()
+            if not items:
+                yield writer.writerow(order_columns + [''] * 5)
+            for item in items:
+                yield writer.writerow(order_columns + [
+                    item.menu_item_id,
+                    item.menu_item.menu_item.name,
+                    item.menu_item.menu_item.category.name,
+                    item.quantity,
+                    item.price,
+                ])
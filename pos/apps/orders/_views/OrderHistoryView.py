@@ -2,15 +2,47 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from django.utils import timezone
 import datetime
+import base64
+from django.conf import settings
 from django.db.models import Q
-from pos.apps.orders.models import Order, OrderItem
+from pos.apps.orders.utils import (
+    filter_placed_at_range, order_items_prefetch, serialize_order_detail, visible_orders
+)
 from django.shortcuts import get_object_or_404
+from pos.utils.permissions import can_access_location
 from pos.utils.logger import POSLogger
 
 logger = POSLogger(__name__)
 
+
+def parse_page_size(value):
+    """Requested page size, capped at ORDER_HISTORY_MAX_PAGE_SIZE"""
+    if not value:
+        return settings.ORDER_HISTORY_PAGE_SIZE
+    try:
+        page_size = int(value)
+    except ValueError:
+        raise ValueError("page_size must be a positive integer")
+    if page_size < 1:
+        raise ValueError("page_size must be a positive integer")
+    return min(page_size, settings.ORDER_HISTORY_MAX_PAGE_SIZE)
+
+
+def encode_cursor(order):
+    """Opaque cursor pointing just past the given order"""
+    raw = f"{order.placed_at.isoformat()}|{order.id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Return (placed_at, id) from a cursor made by encode_cursor"""
+    try:
+        placed_at, order_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        return datetime.datetime.fromisoformat(placed_at), int(order_id)
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor")
+
 class OrderHistoryView(APIView):
     permission_classes = [IsAuthenticated]
     
@@ -22,6 +54,8 @@ class OrderHistoryView(APIView):
             - date_from: Filter by date range (YYYY-MM-DD)
             - date_to: Filter by date range (YYYY-MM-DD)
             - order_id: Get specific order details
+            - page_size: Orders per page (default ORDER_HISTORY_PAGE_SIZE)
+            - cursor: next_cursor from the previous page
         """
         user = request.user
         order_id = request.query_params.get('order_id')
@@ -30,49 +64,17 @@ class OrderHistoryView(APIView):
         if order_id:
             try:
                 # Apply permissions based on user role
-                if hasattr(user, 'is_super_admin') and user.is_super_admin:
-                    order = get_object_or_404(Order, id=order_id)
-                elif hasattr(user, 'is_franchise_admin') and (user.is_franchise_admin or user.is_staff_member):
-                    user_locations = user.locations.all()
-                    order = get_object_or_404(Order, id=order_id, location__in=user_locations)
-                else:
+                orders = visible_orders(user)
+                if orders is None:
                     logger.warning(f"Unauthorized order access attempt for order {order_id} by {user.email}")
                     return Response({"error": "Not authorized to access this order"}, status=status.HTTP_403_FORBIDDEN)
-                
-                # Get order items
-                order_items = order.items.all().values(
-                     'menu_item_id', 'menu_item__menu_item__name', 'quantity', 'price', 'menu_item__menu_item__category__name'
+
+                order = get_object_or_404(
+                    orders.select_related('location', 'processed_by').prefetch_related(order_items_prefetch()),
+                    id=order_id
                 )
-                
-                # Add menu item name if available
-                for item in order_items:
-                    menu_item = order.items.get(id=item['id']).menu_item
-                    item['menu_item__menu_item__name'] = menu_item.name if menu_item else None
-                    item['order_id'] = order.id
-                
-                response_data = {
-                    'order_id': order.id,
-                    'placed_at': order.placed_at,
-                    'total_amount': str(order.total_amount),  # Convert Decimal to string
-                    'is_cancelled': order.is_cancelled,
-                    'updated_at': order.updated_at,
-                    'cancelled_at': order.cancelled_at,
-                    'location': {
-                        'id': order.location.id,
-                        'name': order.location.name
-                    },
-                    'payment_mode': order.payment_mode,
-                    'order_items': list(order_items),
-                    'token_number': order.token_number,
-                }
-                
-                # Add processor information if available
-                if order.processed_by:
-                    response_data['processed_by'] = {
-                        'id': order.processed_by.id,
-                        'name': f"{order.processed_by.first_name} {order.processed_by.last_name}".strip()
-                    }
-                
+                response_data = serialize_order_detail(order)
+
                 logger.info(f"Order {order_id} details retrieved by {user.email}")
                 return Response(response_data)
             except Exception as e:
@@ -87,56 +89,57 @@ class OrderHistoryView(APIView):
             date_to = request.query_params.get('date_to')
             
             # Base queryset with role-based filtering
-            if hasattr(user, 'is_super_admin') and user.is_super_admin:
-                orders = Order.objects.all()
-            elif hasattr(user, 'is_franchise_admin') and (user.is_franchise_admin or user.is_staff_member):
-                user_locations = user.locations.all()
-                orders = Order.objects.filter(location__in=user_locations)
-            else:
+            orders = visible_orders(user)
+            if orders is None:
                 logger.warning(f"Unauthorized order history access attempt by {user.email}")
                 return Response({"error": "Not authorized to view order history"}, status=status.HTTP_403_FORBIDDEN)
             
             # Apply additional filters
             if location_id:
-                if not (hasattr(user, 'is_super_admin') and user.is_super_admin) and \
-                   not (hasattr(user, 'locations') and user.locations.filter(id=location_id).exists()):
+                if not can_access_location(user, location_id):
                     logger.warning(f"Unauthorized location access attempt for location {location_id} by {user.email}")
                     return Response({"error": "You don't have access to this location"}, 
                                    status=status.HTTP_403_FORBIDDEN)
                 orders = orders.filter(location_id=location_id)
             
             # Date range filtering
-            if date_from:
-                # date_from is like '2025-08-12'
-                local_from = datetime.datetime.strptime(date_from, "%Y-%m-%d")
-                local_from = timezone.make_aware(local_from, timezone.get_current_timezone())  # e.g. IST
-                utc_from = local_from.astimezone(datetime.timezone.utc)
-                orders = orders.filter(placed_at__gte=utc_from)
+            try:
+                orders = filter_placed_at_range(orders, date_from, date_to)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-            if date_to:
-                local_to = datetime.datetime.strptime(date_to, "%Y-%m-%d")
-                local_to = datetime.datetime.combine(local_to, datetime.time.min) + datetime.timedelta(days=1) - datetime.timedelta(seconds=1)
-                local_to = timezone.make_aware(local_to, timezone.get_current_timezone())
-                utc_to = local_to.astimezone(datetime.timezone.utc)
-                orders = orders.filter(placed_at__lte=utc_to)
+            # Keyset pagination on (placed_at, id), newest first
+            try:
+                page_size = parse_page_size(request.query_params.get('page_size'))
+                cursor = request.query_params.get('cursor')
+                if cursor:
+                    cursor_placed_at, cursor_id = decode_cursor(cursor)
+                    orders = orders.filter(
+                        Q(placed_at__lt=cursor_placed_at) |
+                        Q(placed_at=cursor_placed_at, id__lt=cursor_id)
+                    )
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            orders = orders.select_related('location', 'processed_by').prefetch_related(
+                order_items_prefetch()
+            ).order_by('-placed_at', '-id')
+
+            page = list(orders[:page_size + 1])
+            has_more = len(page) > page_size
+            page = page[:page_size]
 
-            # Order by date, newest first
-            orders = orders.order_by('-placed_at')
-            
             # Serialize the data
             response_data = []
-            for order in orders:
-                order_items_raw = order.items.all().values(
-                     'menu_item_id', 'menu_item__menu_item__name', 'quantity', 'price', 'menu_item__menu_item__category__name'
-                )
+            for order in page:
                 order_items = []
-                for item in order_items_raw:
+                for item in order.items.all():
                     order_items.append({
-                        'menu_item_id': item['menu_item_id'],
-                        'menu_item_name': item['menu_item__menu_item__name'],  # renamed
-                        'menu_category': item['menu_item__menu_item__category__name'],  # renamed
-                        'quantity': item['quantity'],
-                        'price': item['price'],
+                        'menu_item_id': item.menu_item_id,
+                        'menu_item_name': item.menu_item.menu_item.name,  # renamed
+                        'menu_category': item.menu_item.menu_item.category.name,  # renamed
+                        'quantity': item.quantity,
+                        'price': item.price,
                     })
                 order_data = {
                     'order_id': order.id,
@@ -151,13 +154,16 @@ class OrderHistoryView(APIView):
                         'name': order.location.name
                     },
                     'payment_mode': order.payment_mode,
-                    'order_items': list(order_items),
+                    'order_items': order_items,
                     'token_number': order.token_number,
                 }
                 response_data.append(order_data)
-            
+
             logger.info(f"Order history retrieved by {user.email}")
-            return Response(response_data)
+            return Response({
+                'results': response_data,
+                'next_cursor': encode_cursor(page[-1]) if has_more else None,
+            })
             
         except Exception as e:
             logger.error(f"Error retrieving order history for {user.email}: {str(e)}")
@@ -1,48 +1,47 @@
+from django.http import HttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.utils import timezone
-from pos.apps.orders.models import Order, OrderItem
-from pos.apps.menu.models import MenuItemModel
-from pos.apps.locations.models import LocationModel
-import random
+from rest_framework.permissions import IsAuthenticated
+from pos.apps.orders.receipts import get_receipt
+from pos.utils.permissions import can_access_location
+from pos.utils.logger import POSLogger
+
+logger = POSLogger(__name__)
+
 
 class OrderReceiptView(APIView):
+    """
+    Thermal printer receipt for an order.
+    Params:
+        - output: "text" (default, JSON wrapped) or "escpos" (raw printer bytes)
+    """
+    permission_classes = [IsAuthenticated]
+
     def get(self, request, order_id):
-        try:
-            order = Order.objects.get(id=order_id)
-            items = OrderItem.objects.filter(order=order)
-        except Order.DoesNotExist:
+        output = request.query_params.get('output', 'text')
+        if output not in ('text', 'escpos'):
+            return Response({"error": "output must be text or escpos"}, status=status.HTTP_400_BAD_REQUEST)
+
+        receipt = get_receipt(order_id)
+        if receipt is None:
             return Response(
-                {"error": "Order not found"}, 
+                {"error": "Order not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Build receipt content
-        receipt_content = [
-            f"Order Number: {order.order_number}",
-            f"Date: {order.order_date.strftime('%Y-%m-%d %H:%M:%S')}",
-            f"Location: {order.location.name}",
-            f"Customer: {order.customer_name or 'Walk-in'}",
-            f"Table: {order.table_number or 'N/A'}",
-            "----------------------------------------"
-        ]
-
-        for item in items:
-            receipt_content.extend([
-                f"{item.menu_item.name} x {item.quantity}",
-                f"Price per unit: {item.price}",
-                f"Notes: {item.notes or 'None'}",
-                "----------------------------------------"
-            ])
-
-        receipt_content.append(f"TOTAL AMOUNT: {order.total_amount}")
-        receipt_content.append("\nThank you for your order!")
-
-        # Format for thermal printer
-        receipt_text = "\n".join(receipt_content)
-        
+        user = request.user
+        if not can_access_location(user, receipt['location_id']):
+            logger.warning(f"Unauthorized receipt access attempt for order {order_id} by {user.email}")
+            return Response({"error": "Not authorized to access this order"}, status=status.HTTP_403_FORBIDDEN)
+
+        if output == 'escpos':
+            response = HttpResponse(receipt['escpos'], content_type='application/octet-stream')
+            response['Content-Disposition'] = f'attachment; filename="receipt-{order_id}.bin"'
+            return response
+
         return Response({
-            'receipt': receipt_text,
-            'order_number': order.order_number
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+            'receipt': receipt['text'],
+            'order_id': receipt['order_id'],
+            'order_number': receipt['token_number']
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,232 @@
+from collections import defaultdict
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from pos.apps.orders.models import Order, OrderItem, TokenSequence
+from pos.apps.orders.utils import fetch_menu_items, parse_order_lines, parse_placed_at, resolve_order_items
+from pos.apps.locations.models import LocationModel
+from pos.apps.dashboard.rollups import apply_snapshots, order_item_tuples, record_order_change, snapshot_order
+from pos.utils.permissions import allowed_location_ids
+from pos.utils.logger import POSLogger
+
+logger = POSLogger(__name__)
+
+# Upper bound on orders accepted in one sync request
+MAX_SYNC_BATCH_SIZE = 500
+
+
+class OrderSyncView(APIView):
+    """
+    Bulk ingestion of orders queued by a terminal while it was offline.
+
+    POST body:
+        orders: list of {idempotency_key, location_id, placed_at, payment_mode, items}
+
+    Every order carries a client generated idempotency_key, so a batch can be
+    replayed after a failed upload: orders that already exist are reported as
+    duplicates instead of being created again. The response maps each key to
+    its own result ("created", "duplicate" or "error").
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        user = request.user
+        orders_payload = request.data.get('orders')
+
+        if not isinstance(orders_payload, list) or not orders_payload:
+            return Response({"error": "orders must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(orders_payload) > MAX_SYNC_BATCH_SIZE:
+            return Response(
+                {"error": f"At most {MAX_SYNC_BATCH_SIZE} orders can be synced per request"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        keys = []
+        for entry in orders_payload:
+            key = entry.get('idempotency_key') if isinstance(entry, dict) else None
+            if not isinstance(key, str) or not key or len(key) > 64:
+                logger.warning(f"Order sync with missing or invalid idempotency key by {user.email}")
+                return Response(
+                    {"error": "Every order needs an idempotency_key of at most 64 characters"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            keys.append(key)
+
+        if len(set(keys)) != len(keys):
+            return Response({"error": "Duplicate idempotency_key in batch"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Location access is resolved once for the whole batch
+        accessible_location_ids = allowed_location_ids(user)
+
+        results = {}
+        candidates = []
+        for key, entry in zip(keys, orders_payload):
+            try:
+                location_id = int(entry.get('location_id'))
+            except (TypeError, ValueError):
+                results[key] = {'status': 'error', 'error': 'Invalid location ID'}
+                continue
+
+            if accessible_location_ids is not None and location_id not in accessible_location_ids:
+                results[key] = {'status': 'error', 'error': 'You do not have access to this location'}
+                continue
+
+            try:
+                placed_at = parse_placed_at(entry.get('placed_at'))
+                lines = parse_order_lines(entry.get('items', []))
+            except ValueError as e:
+                results[key] = {'status': 'error', 'error': str(e)}
+                continue
+
+            candidates.append({
+                'key': key,
+                'location_id': location_id,
+                'placed_at': placed_at,
+                'payment_mode': entry.get('payment_mode', 'cash'),
+                'items': entry.get('items'),
+                'menu_item_ids': [menu_item_id for menu_item_id, _ in lines],
+            })
+
+        # One query each for locations, already synced orders and menu items
+        locations = LocationModel.objects.in_bulk({c['location_id'] for c in candidates})
+        existing = {
+            (order['location_id'], order['idempotency_key']): order
+            for order in Order.objects.filter(
+                idempotency_key__in=[c['key'] for c in candidates]
+            ).values('id', 'location_id', 'idempotency_key', 'token_number')
+        }
+        menu_items = fetch_menu_items(
+            menu_item_id for candidate in candidates for menu_item_id in candidate['menu_item_ids']
+        )
+
+        pending = []
+        for candidate in candidates:
+            key = candidate['key']
+            if candidate['location_id'] not in locations:
+                results[key] = {'status': 'error', 'error': 'Invalid location ID'}
+                continue
+
+            synced = existing.get((candidate['location_id'], key))
+            if synced:
+                results[key] = {
+                    'status': 'duplicate',
+                    'order_id': synced['id'],
+                    'token_number': synced['token_number'],
+                }
+                continue
+
+            try:
+                candidate['order_items'], candidate['total_amount'] = resolve_order_items(
+                    candidate['items'], candidate['location_id'], menu_items=menu_items
+                )
+            except ValueError as e:
+                results[key] = {'status': 'error', 'error': str(e)}
+                continue
+            pending.append(candidate)
+
+        if pending:
+            try:
+                with transaction.atomic():
+                    results.update(self.bulk_create_orders(pending, user))
+            except IntegrityError as e:
+                # A token or key collided (stale counter or a concurrent replay);
+                # fall back to creating orders one at a time
+                logger.warning(f"Bulk order sync collided, retrying one by one for {user.email}: {str(e)}")
+                results.update(self.create_orders_one_by_one(pending, user))
+
+        created = sum(1 for result in results.values() if result['status'] == 'created')
+        logger.info(f"Order sync by {user.email}: {created} created out of {len(keys)} submitted")
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+    def bulk_create_orders(self, pending, user):
+        """Allocate tokens per (location, day) in blocks and insert all orders and items in bulk"""
+        by_day = defaultdict(list)
+        for candidate in pending:
+            candidate['token_date'] = timezone.localtime(candidate['placed_at']).date()
+            by_day[(candidate['location_id'], candidate['token_date'])].append(candidate)
+
+        for (location_id, token_date), group in by_day.items():
+            last_token = TokenSequence.objects.allocate(location_id, token_date, count=len(group))
+            # Tokens follow the order in which the terminal placed the orders
+            group.sort(key=lambda candidate: candidate['placed_at'])
+            for offset, candidate in enumerate(group):
+                candidate['token_number'] = last_token - len(group) + 1 + offset
+
+        orders = Order.objects.bulk_create([
+            Order(
+                location_id=candidate['location_id'],
+                placed_at=candidate['placed_at'],
+                total_amount=candidate['total_amount'],
+                processed_by=user,
+                payment_mode=candidate['payment_mode'],
+                token_number=candidate['token_number'],
+                token_date=candidate['token_date'],
+                idempotency_key=candidate['key'],
+            )
+            for candidate in pending
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                menu_item=item['menu_item'],
+                quantity=item['quantity'],
+                price=item['price']
+            )
+            for order, candidate in zip(orders, pending)
+            for item in candidate['order_items']
+        ])
+        apply_snapshots([
+            snapshot_order(order, order_item_tuples(candidate['order_items']))
+            for order, candidate in zip(orders, pending)
+        ])
+
+        return {
+            candidate['key']: {'status': 'created', 'order_id': order.id, 'token_number': order.token_number}
+            for order, candidate in zip(orders, pending)
+        }
+
+    def create_orders_one_by_one(self, pending, user):
+        """Slow path: each order gets its own transaction and Order.save's token retry"""
+        results = {}
+        for candidate in pending:
+            key = candidate['key']
+            # The bulk insert may have collided on this key (a concurrent
+            # replay); report it instead of running Order.save's token retries
+            synced = Order.objects.filter(location_id=candidate['location_id'], idempotency_key=key).first()
+            if synced:
+                results[key] = {'status': 'duplicate', 'order_id': synced.id, 'token_number': synced.token_number}
+                continue
+            try:
+                with transaction.atomic():
+                    order = Order(
+                        location_id=candidate['location_id'],
+                        placed_at=candidate['placed_at'],
+                        total_amount=candidate['total_amount'],
+                        processed_by=user,
+                        payment_mode=candidate['payment_mode'],
+                        idempotency_key=key,
+                    )
+                    order.save()
+                    OrderItem.objects.bulk_create([
+                        OrderItem(
+                            order=order,
+                            menu_item=item['menu_item'],
+                            quantity=item['quantity'],
+                            price=item['price']
+                        )
+                        for item in candidate['order_items']
+                    ])
+                    record_order_change(after=snapshot_order(order, order_item_tuples(candidate['order_items'])))
+                results[key] = {'status': 'created', 'order_id': order.id, 'token_number': order.token_number}
+            except IntegrityError as e:
+                synced = Order.objects.filter(location_id=candidate['location_id'], idempotency_key=key).first()
+                if synced:
+                    results[key] = {'status': 'duplicate', 'order_id': synced.id, 'token_number': synced.token_number}
+                else:
+                    logger.error(f"Error syncing order {key} for {user.email}: {str(e)}")
+                    results[key] = {'status': 'error', 'error': str(e)}
+        return results
@@ -1,18 +1,20 @@
-from django.shortcuts import get_object_or_404
+from django.db import transaction
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.utils import timezone
-from django.utils.dateparse import parse_datetime
 from pos.apps.orders.models import Order, OrderItem
-from pos.apps.menu.models import LocationMenuItem
+from pos.apps.orders.utils import parse_placed_at, resolve_order_items
+from pos.apps.orders.idempotency import idempotent
+from pos.apps.dashboard.rollups import order_item_tuples, record_order_change, snapshot_order
 from pos.apps.locations.models import LocationModel
-from pos.apps.accounts.models import User
+from pos.utils.permissions import can_access_location
 from pos.utils.logger import POSLogger
 
 logger = POSLogger(__name__)
 
 class OrderView(APIView):
+    @idempotent
     def post(self, request):
         """Create a new order"""
         # Extract basic order data
@@ -20,20 +22,17 @@ class OrderView(APIView):
         location_id = data.get('location_id')
         items = data.get('items', [])
         payment_mode = data.get('payment_mode', 'cash')
-        placed_at_str = data.get('placed_at')
-        if placed_at_str:
-            dt = parse_datetime(placed_at_str)  # parse to datetime
-            if timezone.is_naive(dt):
-                dt = timezone.make_aware(dt, timezone.utc)  # force UTC awareness
-            placed_at = dt
-        else:
-            logger.info(f"\n\n\n\n\n the placed at is not parsed \n\n\n")
-            placed_at = timezone.now()
         # Validate authentication   
         if not request.user.is_authenticated:
             logger.warning("Unauthorized order creation attempt by anonymous user")
             return Response({"error": "Authentication required"}, status=status.HTTP_401_UNAUTHORIZED)
 
+        try:
+            placed_at = parse_placed_at(data.get('placed_at'))
+        except ValueError as e:
+            logger.warning(f"Order creation attempt with {str(e)} by {request.user.email}")
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         # Validate location
         try:
             location = LocationModel.objects.get(id=location_id)
@@ -43,78 +42,39 @@ class OrderView(APIView):
 
         # Check location access for franchise admin
         if request.user.is_franchise_admin:
-            admin = get_object_or_404(User, id=request.user.id, is_franchise_admin=True)
-            if location_id not in [loc['id'] for loc in list(admin.locations.values('id'))]:
+            if not can_access_location(request.user, location_id):
                 logger.warning(f"Franchise admin {request.user.email} attempted to create order in unauthorized location {location_id}")
                 return Response({"error": "You do not have access to this location"}, status=status.HTTP_403_FORBIDDEN)
 
-        # Validate items
-        if not items:
-            logger.warning(f"Order creation attempt with no items by {request.user.email}")
-            return Response({"error": "No items in order"}, status=status.HTTP_400_BAD_REQUEST)
-
-        total_amount = 0
-        order_items = []
-
-        # Process each item
-        for item in items:
-            menu_item_id = item.get('menu_item_id')
-            quantity = item.get('quantity', 1)
-
-            try:
-                menu_item = LocationMenuItem.objects.get(id=menu_item_id)
-                # Ensure menu item belongs to the location
-                if menu_item.location.id != location_id:
-                    logger.warning(f"Menu item {menu_item_id} does not belong to location {location_id} in order by {request.user.email}")
-                    return Response(
-                        {"error": f"Menu item {menu_item_id} does not belong to location {location_id}"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-            except LocationMenuItem.DoesNotExist:
-                logger.warning(f"Attempt to add invalid menu item ID {menu_item_id} to order by {request.user.email}")
-                return Response(
-                    {"error": f"Invalid menu item ID: {menu_item_id}"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Validate quantity
-            if not isinstance(quantity, int) or quantity < 1:
-                logger.warning(f"Invalid quantity {quantity} for menu item {menu_item_id} by {request.user.email}")
-                return Response(
-                    {"error": f"Invalid quantity for menu item {menu_item_id}"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Calculate item total
-            item_price = menu_item.price
-            total_amount += item_price * quantity
-
-            # Store item details
-            order_items.append({
-                'menu_item': menu_item,
-                'quantity': quantity,
-                'price': item_price
-            })
+        # Validate items against the location menu in one query
+        try:
+            order_items, total_amount = resolve_order_items(items, location.id)
+        except ValueError as e:
+            logger.warning(f"Invalid order items for location {location.id} by {request.user.email}: {str(e)}")
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Create order
+        # Create order and its items in a single transaction
         try:
-            order = Order(
-                location=location,
-                total_amount=total_amount,
-                processed_by=request.user,
-                placed_at=placed_at or timezone.now(),
-                is_cancelled=False,
-                payment_mode=payment_mode,
-            )
-            order.save()
-            # Create order items
-            for item in order_items:
-                OrderItem.objects.create(
-                    order=order,
-                    menu_item=item['menu_item'],
-                    quantity=item['quantity'],
-                    price=item['price']
+            with transaction.atomic():
+                order = Order(
+                    location=location,
+                    total_amount=total_amount,
+                    processed_by=request.user,
+                    placed_at=placed_at or timezone.now(),
+                    is_cancelled=False,
+                    payment_mode=payment_mode,
                 )
+                order.save()
+                OrderItem.objects.bulk_create([
+                    OrderItem(
+                        order=order,
+                        menu_item=item['menu_item'],
+                        quantity=item['quantity'],
+                        price=item['price']
+                    )
+                    for item in order_items
+                ])
+                record_order_change(after=snapshot_order(order, order_item_tuples(order_items)))
             logger.info(f"Order {order.id} created by {request.user.email} with total {total_amount}")
         except Exception as e:
             logger.error(f"Error creating order for {request.user.email}: {str(e)}")
@@ -126,7 +86,14 @@ class OrderView(APIView):
         return Response({
             'order_id': order.id,
             'total_amount': str(order.total_amount),
-            'order_items': list(order.items.values('menu_item_id', 'menu_item__menu_item__name', 'quantity', 'price')),
+            'order_items': [
+                {
+                    'menu_item_id': item['menu_item'].id,
+                    'menu_item__menu_item__name': item['menu_item'].menu_item.name,
+                    'quantity': item['quantity'],
+                    'price': item['price'],
+                } for item in order_items
+            ],
             'placed_at': order.placed_at,
             'is_cancelled': order.is_cancelled,
             'updated_at': order.updated_at,
@@ -139,6 +106,7 @@ class OrderView(APIView):
             'token_number': order.token_number,
         }, status=status.HTTP_201_CREATED)
 
+    @idempotent
     def put(self, request):
         """Update an existing order"""
         # Extract order ID and data
@@ -165,8 +133,7 @@ class OrderView(APIView):
 
         # Check location access for franchise admin
         if request.user.is_franchise_admin:
-            admin = get_object_or_404(User, id=request.user.id, is_franchise_admin=True)
-            if order.location.id not in [loc['id'] for loc in list(admin.locations.values('id'))]:
+            if not can_access_location(request.user, order.location_id):
                 logger.warning(f"Franchise admin {request.user.email} attempted to update order {order_id} in unauthorized location {order.location.id}")
                 return Response({"error": "You do not have access to this order’s location"}, status=status.HTTP_403_FORBIDDEN)
 
@@ -176,7 +143,7 @@ class OrderView(APIView):
                 location = LocationModel.objects.get(id=location_id)
                 # Check location access for franchise admin
                 if request.user.is_franchise_admin:
-                    if location_id not in [loc['id'] for loc in list(admin.locations.values('id'))]:
+                    if not can_access_location(request.user, location_id):
                         logger.warning(f"Franchise admin {request.user.email} attempted to update order {order_id} to unauthorized location {location_id}")
                         return Response({"error": "You do not have access to this location"}, status=status.HTTP_403_FORBIDDEN)
             except LocationModel.DoesNotExist:
@@ -185,74 +152,37 @@ class OrderView(APIView):
         else:
             location = order.location
 
-        # Validate items
-        if not items:
-            logger.warning(f"Order update attempt with no items for order {order_id} by {request.user.email}")
-            return Response({"error": "No items in order"}, status=status.HTTP_400_BAD_REQUEST)
-
-        total_amount = 0
-        order_items = []
-
-        # Process each item
-        for item in items:
-            menu_item_id = item.get('menu_item_id')
-            quantity = item.get('quantity', 1)
-
-            try:
-                menu_item = LocationMenuItem.objects.get(id=menu_item_id)
-                # Ensure menu item belongs to the location
-                if menu_item.location.id != location.id:
-                    logger.warning(f"Menu item {menu_item_id} does not belong to location {location.id} in order update by {request.user.email}")
-                    return Response(
-                        {"error": f"Menu item {menu_item_id} does not belong to location {location.id}"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-            except LocationMenuItem.DoesNotExist:
-                logger.warning(f"Attempt to add invalid menu item ID {menu_item_id} to order {order_id} by {request.user.email}")
-                return Response(
-                    {"error": f"Invalid menu item ID: {menu_item_id}"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Validate quantity
-            if not isinstance(quantity, int) or quantity < 1:
-                logger.warning(f"Invalid quantity {quantity} for menu item {menu_item_id} in order {order_id} by {request.user.email}")
-                return Response(
-                    {"error": f"Invalid quantity for menu item {menu_item_id}"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Calculate item total
-            item_price = menu_item.price
-            total_amount += item_price * quantity
-
-            # Store item details
-            order_items.append({
-                'menu_item': menu_item,
-                'quantity': quantity,
-                'price': item_price
-            })
+        # Validate items against the location menu in one query
+        try:
+            order_items, total_amount = resolve_order_items(items, location.id)
+        except ValueError as e:
+            logger.warning(f"Invalid order items for order {order_id} by {request.user.email}: {str(e)}")
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         # Update order
         try:
-            # Update order fields
-            order.location = location
-            order.total_amount = total_amount
-            order.processed_by = request.user
-            order.payment_mode = payment_mode
-            order.save()  # updated_at is automatically set by the model
-
-            # Delete existing order items
-            order.items.all().delete()
-
-            # Create new order items
-            for item in order_items:
-                OrderItem.objects.create(
-                    order=order,
-                    menu_item=item['menu_item'],
-                    quantity=item['quantity'],
-                    price=item['price']
-                )
+            with transaction.atomic():
+                before = snapshot_order(order, order.items.values_list('menu_item_id', 'quantity', 'price'))
+
+                # Update order fields
+                order.location = location
+                order.total_amount = total_amount
+                order.processed_by = request.user
+                order.payment_mode = payment_mode
+                order.save()  # updated_at is automatically set by the model
+
+                # Replace existing order items
+                order.items.all().delete()
+                OrderItem.objects.bulk_create([
+                    OrderItem(
+                        order=order,
+                        menu_item=item['menu_item'],
+                        quantity=item['quantity'],
+                        price=item['price']
+                    )
+                    for item in order_items
+                ])
+                record_order_change(before, snapshot_order(order, order_item_tuples(order_items)))
             logger.info(f"Order {order.id} updated by {request.user.email} with total {total_amount}")
         except Exception as e:
             logger.error(f"Error updating order {order_id} for {request.user.email}: {str(e)}")
@@ -278,6 +208,7 @@ class OrderView(APIView):
             'token_number': order.token_number
         }, status=status.HTTP_200_OK)
 
+    @idempotent
     def delete(self, request):
         """Cancel an order (soft deletion)"""
         # Extract order ID
@@ -306,15 +237,17 @@ class OrderView(APIView):
 
         # Check location access for franchise admin
         if request.user.is_franchise_admin:
-            admin = get_object_or_404(User, id=request.user.id, is_franchise_admin=True)
-            if order.location.id not in [loc['id'] for loc in list(admin.locations.values('id'))]:
+            if not can_access_location(request.user, order.location_id):
                 logger.warning(f"Franchise admin {request.user.email} attempted to cancel order {order_id} from unauthorized location {order.location.id}")
                 return Response({"error": "You do not have access to this order’s location"}, status=status.HTTP_403_FORBIDDEN)
 
         try:
-            order.is_cancelled = True
-            order.cancelled_at = timezone.now()
-            order.save()
+            with transaction.atomic():
+                before = snapshot_order(order, order.items.values_list('menu_item_id', 'quantity', 'price'))
+                order.is_cancelled = True
+                order.cancelled_at = timezone.now()
+                order.save()
+                record_order_change(before, snapshot_order(order, before['items']))
             logger.info(f"Order {order_id} cancelled by {request.user.email}")
             return Response({
                 "order_id": order.id,
@@ -0,0 +1,146 @@
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from pos.apps.orders.models import IdempotencyRecord
+from pos.utils.logger import POSLogger
+
+logger = POSLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+
+def get_idempotency_ttl():
+    return getattr(settings, 'IDEMPOTENCY_KEY_TTL', timedelta(hours=24))
+
+
+def get_pending_lease():
+    return getattr(settings, 'IDEMPOTENCY_PENDING_LEASE', timedelta(minutes=1))
+
+
+def request_fingerprint(request):
+    """Hash of method, path and payload, so a key cannot be reused for a different request"""
+    payload = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{request.method}:{request.path}:{payload}".encode('utf-8')).hexdigest()
+
+
+def claim_key(user, key, fingerprint):
+    """
+    Insert a pending record for (user, key).
+    Returns (record, None) when the key was claimed, or (None, existing) when
+    an unexpired record already exists.
+
+    A record still pending after the lease belongs to a request that died:
+    its response is saved in the same transaction as the write, so nothing
+    was written and the key can be claimed again.
+    """
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                record = IdempotencyRecord.objects.create(
+                    user=user,
+                    key=key,
+                    request_hash=fingerprint,
+                    expires_at=timezone.now() + get_idempotency_ttl()
+                )
+            return record, None
+        except IntegrityError:
+            existing = IdempotencyRecord.objects.filter(user=user, key=key).first()
+            if existing is None:
+                return None, None
+            current = timezone.now()
+            if existing.expires_at <= current:
+                evictable = Q(expires_at__lte=current)
+            elif existing.status_code is None and existing.created_at <= current - get_pending_lease():
+                evictable = Q(status_code__isnull=True)
+            else:
+                return None, existing
+            # Evict the record and claim the key again. Conditional, because
+            # a request still running holds the row lock and may complete it.
+            IdempotencyRecord.objects.filter(evictable, pk=existing.pk).delete()
+    return None, None
+
+
+def replay(record, fingerprint):
+    """Build the response for a retried request from its stored record"""
+    if record is not None and record.request_hash != fingerprint:
+        return Response(
+            {"error": "Idempotency-Key was already used for a different request"},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    if record is None or record.status_code is None:
+        return Response(
+            {"error": "A request with this Idempotency-Key is still being processed"},
+            status=status.HTTP_409_CONFLICT
+        )
+    response = HttpResponse(record.response_body, status=record.status_code, content_type='application/json')
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view_method):
+    """
+    Make an APIView handler safe to retry.
+
+    When the client sends an Idempotency-Key header, the first response for
+    (user, key) is stored and replayed for every retry until the key expires
+    (settings.IDEMPOTENCY_KEY_TTL). Server errors are not stored, so those
+    requests can be retried for real. Requests without the header run as
+    before.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key or not request.user.is_authenticated:
+            return view_method(self, request, *args, **kwargs)
+
+        if len(key) > 255:
+            return Response(
+                {"error": f"{IDEMPOTENCY_HEADER} must be at most 255 characters"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fingerprint = request_fingerprint(request)
+        record, existing = claim_key(request.user, key, fingerprint)
+        if record is None:
+            logger.info(f"Replaying {request.method} {request.path} for key {key} by {request.user.email}")
+            return replay(existing, fingerprint)
+
+        try:
+            # The write and its stored response commit together, so a crash
+            # in between cannot leave a written order behind a pending key
+            with transaction.atomic():
+                # Locked until commit, so a retry cannot evict the key as abandoned
+                if not IdempotencyRecord.objects.select_for_update().filter(pk=record.pk).exists():
+                    return replay(None, fingerprint)
+
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code >= 500:
+                    transaction.set_rollback(True)
+                else:
+                    if hasattr(response, 'data'):
+                        body = JSONRenderer().render(response.data)
+                    else:
+                        body = response.content
+                    record.status_code = response.status_code
+                    record.response_body = body.decode('utf-8')
+                    record.save(update_fields=['status_code', 'response_body'])
+        except Exception:
+            record.delete()
+            raise
+
+        if response.status_code >= 500:
+            record.delete()
+        return response
+
+    return wrapper
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from pos.apps.orders.models import IdempotencyRecord
+
+
+class Command(BaseCommand):
+    help = "Delete expired idempotency records in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+        while True:
+            ids = list(
+                IdempotencyRecord.objects.filter(expires_at__lte=timezone.now())
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            deleted, _ = IdempotencyRecord.objects.filter(id__in=ids).delete()
+            total += deleted
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} expired idempotency records"))
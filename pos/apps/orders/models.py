@@ -1,9 +1,73 @@
-from django.db import models
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import Max
+from django.db.models.functions import Greatest
 from pos.apps.locations.models import LocationModel
 from pos.apps.menu.models import LocationMenuItem
 from pos.apps.accounts.models import User
 from django.utils import timezone
 
+# How many times Order.save re-allocates a token after hitting the
+# (location, token_date, token_number) unique constraint
+TOKEN_ALLOCATION_RETRIES = 3
+
+
+class TokenSequenceManager(models.Manager):
+    def allocate(self, location_id, token_date, count=1):
+        """
+        Reserve `count` consecutive token numbers for a location and day.
+        Returns the last reserved number; the block starts at last - count + 1.
+
+        On PostgreSQL this is a single INSERT ... ON CONFLICT ... RETURNING,
+        so concurrent terminals serialize on one counter row instead of
+        scanning orders for the current maximum.
+        """
+        connection = connections[self.db]
+        if connection.vendor == 'postgresql':
+            table = connection.ops.quote_name(self.model._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table} (location_id, token_date, last_number) "
+                    f"VALUES (%s, %s, %s) "
+                    f"ON CONFLICT (location_id, token_date) "
+                    f"DO UPDATE SET last_number = {table}.last_number + EXCLUDED.last_number "
+                    f"RETURNING last_number",
+                    [location_id, token_date, count]
+                )
+                return cursor.fetchone()[0]
+
+        with transaction.atomic(using=self.db):
+            sequence, _ = self.select_for_update().get_or_create(
+                location_id=location_id, token_date=token_date
+            )
+            sequence.last_number += count
+            sequence.save(update_fields=['last_number'])
+            return sequence.last_number
+
+    def resync(self, location_id, token_date):
+        """Move the counter past any token already used by an order that day."""
+        current = Order.objects.filter(
+            location_id=location_id, token_date=token_date
+        ).aggregate(Max('token_number'))['token_number__max'] or 0
+        self.filter(location_id=location_id, token_date=token_date).update(
+            last_number=Greatest('last_number', current)
+        )
+
+
+class TokenSequence(models.Model):
+    """Per-location, per-day token counter used to number orders"""
+    location = models.ForeignKey(LocationModel, on_delete=models.CASCADE)
+    token_date = models.DateField()
+    last_number = models.PositiveIntegerField(default=0)
+
+    objects = TokenSequenceManager()
+
+    class Meta:
+        unique_together = ('location', 'token_date')
+
+    def __str__(self):
+        return f"{self.location_id} on {self.token_date}: {self.last_number}"
+
+
 class Order(models.Model):
     id = models.AutoField(primary_key=True)  # backend unique ID
     location = models.ForeignKey(LocationModel, on_delete=models.CASCADE)
@@ -17,17 +81,43 @@ class Order(models.Model):
     payment_mode = models.CharField(max_length=50, default='cash')
     token_number = models.PositiveIntegerField()
     token_date = models.DateField(default=timezone.localdate)
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)  # client generated, sent by offline sync
 
     class Meta:
-        unique_together = ('location', 'token_date', 'token_number')  # ensure uniqueness
+        unique_together = [
+            ('location', 'token_date', 'token_number'),  # ensure uniqueness
+            ('location', 'idempotency_key'),  # replayed sync batches never duplicate an order
+        ]
+        indexes = [
+            # keyset pagination of order history, overall and per location
+            models.Index(fields=['placed_at', 'id']),
+            models.Index(fields=['location', 'placed_at', 'id']),
+        ]
 
     def save(self, *args, **kwargs):
-        if not self.token_number:
-            local_date = timezone.localtime(self.placed_at).date()
-            last_token = Order.objects.filter(location=self.location, token_date=local_date).order_by('-token_number').first()
-            self.token_number = (last_token.token_number + 1) if last_token else 1
-            self.token_date = local_date
-        super().save(*args, **kwargs)
+        if self.token_number:
+            super().save(*args, **kwargs)
+            return
+
+        self.token_date = timezone.localtime(self.placed_at).date()
+        for attempt in range(TOKEN_ALLOCATION_RETRIES):
+            self.token_number = TokenSequence.objects.allocate(self.location_id, self.token_date)
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                # A replayed idempotency key is not a token collision, so
+                # report it before spending more tokens on retries
+                replayed = self.idempotency_key and Order.objects.filter(
+                    location_id=self.location_id, idempotency_key=self.idempotency_key
+                ).exists()
+                # Counter is behind tokens written without it (e.g. orders
+                # created before the sequence existed); catch up and retry
+                if replayed or attempt == TOKEN_ALLOCATION_RETRIES - 1:
+                    self.token_number = None
+                    raise
+                TokenSequence.objects.resync(self.location_id, self.token_date)
 
     def __str__(self):
         status = "Cancelled" if self.is_cancelled else "Active"
@@ -40,4 +130,21 @@ class OrderItem(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
 
     def __str__(self):
-        return f"{self.quantity}x {self.menu_item.name} for Order #{self.order.id}"
\ No newline at end of file
+        return f"{self.quantity}x {self.menu_item.name} for Order #{self.order.id}"
+
+
+class IdempotencyRecord(models.Model):
+    """Stored outcome of an order write, replayed when a client retries with the same Idempotency-Key"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_records')
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)  # null while the request is in flight
+    response_body = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ('user', 'key')
+
+    def __str__(self):
+        return f"{self.key} for user {self.user_id} ({self.status_code or 'pending'})"
@@ -0,0 +1,108 @@
+"""
+Receipt rendering for thermal printers.
+
+The layout lives in templates/receipt.txt; this module computes the fixed
+width lines it needs and converts the text to ESC/POS bytes. Rendered
+receipts are cached under the order's updated_at, which every save bumps,
+so a reprint costs one primary key lookup. Entries of an older version are
+never read again, even in another worker's local cache, and simply expire.
+"""
+
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.template.loader import render_to_string
+from django.utils import timezone
+from pos.apps.orders.models import Order, OrderItem
+
+# ESC/POS control sequences
+ESC_INIT = b'\x1b@'
+ESC_CODEPAGE_PC437 = b'\x1bt\x00'
+ESC_FEED_LINES = b'\x1bd\x03'
+GS_PARTIAL_CUT = b'\x1dV\x01'
+
+
+def receipt_cache_key(order_id, updated_at):
+    return f"orders:receipt:{order_id}:{updated_at.timestamp()}"
+
+
+def format_columns(name, quantity, amount, width):
+    """Item name on the left, quantity and amount right aligned in fixed columns"""
+    right = f"{quantity:>4} {amount:>10}"
+    name_width = width - len(right) - 1
+    return f"{name[:name_width]:<{name_width}} {right}"
+
+
+def build_receipt_context(order):
+    width = settings.RECEIPT_LINE_WIDTH
+    placed_at = timezone.localtime(order.placed_at)
+
+    header_lines = [
+        order.location.name.center(width).rstrip(),
+        f"{order.location.city}, {order.location.state}".center(width).rstrip(),
+        '',
+        f"Token #{order.token_number}".ljust(width - 16) + placed_at.strftime('%Y-%m-%d %H:%M'),
+        f"Order #{order.id}",
+    ]
+
+    item_lines = [format_columns('Item', 'Qty', 'Amount', width)]
+    for item in order.items.all():
+        amount = (item.price * item.quantity).quantize(Decimal('0.01'))
+        item_lines.append(format_columns(item.menu_item.menu_item.name, item.quantity, amount, width))
+
+    total = f"{order.total_amount:.2f}"
+    return {
+        'header_lines': header_lines,
+        'rule': '-' * width,
+        'item_lines': item_lines,
+        'total_line': 'TOTAL'.ljust(width - len(total)) + total,
+        'payment_mode': order.payment_mode,
+        'is_cancelled': order.is_cancelled,
+        'cancelled_line': '*** CANCELLED ***'.center(width).rstrip(),
+        'footer': 'Thank you for your order!'.center(width).rstrip(),
+    }
+
+
+def render_receipt_text(order):
+    return render_to_string('receipt.txt', build_receipt_context(order))
+
+
+def render_receipt_escpos(text):
+    """Printer-ready bytes: reset, select PC437, the receipt text, feed and cut"""
+    body = text.replace('\n', '\r\n').encode('cp437', errors='replace')
+    return ESC_INIT + ESC_CODEPAGE_PC437 + body + ESC_FEED_LINES + GS_PARTIAL_CUT
+
+
+def get_receipt(order_id):
+    """
+    Rendered receipt for an order, from cache when possible.
+    Returns a dict with order_id, location_id, token_number, text and escpos,
+    or None if the order does not exist.
+    """
+    updated_at = Order.objects.filter(id=order_id).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None
+    receipt = cache.get(receipt_cache_key(order_id, updated_at))
+    if receipt is not None:
+        return receipt
+
+    order = Order.objects.select_related('location').prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('menu_item__menu_item').only(
+            'order', 'quantity', 'price', 'menu_item__menu_item__name',
+        ))
+    ).filter(id=order_id).first()
+    if order is None:
+        return None
+
+    text = render_receipt_text(order)
+    receipt = {
+        'order_id': order.id,
+        'location_id': order.location_id,
+        'token_number': order.token_number,
+        'text': text,
+        'escpos': render_receipt_escpos(text),
+    }
+    # Keyed by the version actually rendered, in case the order changed in between
+    cache.set(receipt_cache_key(order.id, order.updated_at), receipt, settings.RECEIPT_CACHE_TIMEOUT)
+    return receipt
@@ -1,10 +1,13 @@
 from django.urls import path
-from .views import OrderView, OrderReceiptView, OrderHistoryView
+from .views import OrderView, OrderReceiptView, OrderHistoryView, OrderSyncView, OrderExportView, OrderDetailView
 
 urlpatterns = [
    
     path('create-order/', OrderView.as_view()),
     path('generate-order-receipt/<int:order_id>/', OrderReceiptView.as_view()),
     path('history/', OrderHistoryView.as_view()),
+    path('sync/', OrderSyncView.as_view()),
+    path('export/', OrderExportView.as_view()),
+    path('<int:order_id>/', OrderDetailView.as_view()),
 
 ]
\ No newline at end of file
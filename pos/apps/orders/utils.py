@@ -0,0 +1,187 @@
+import datetime
+
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from pos.apps.menu.models import LocationMenuItem
+from pos.apps.orders.models import Order, OrderItem
+from pos.utils.permissions import allowed_location_ids
+
+
+def parse_placed_at(value):
+    """
+    Parse a client supplied placed_at timestamp, treating naive values as UTC.
+    Falls back to the current time when no timestamp is sent.
+    Raises ValueError for malformed timestamps.
+    """
+    if not value:
+        return timezone.now()
+    dt = parse_datetime(value) if isinstance(value, str) else None
+    if dt is None:
+        raise ValueError(f"Invalid placed_at: {value}")
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt, datetime.timezone.utc)  # force UTC awareness
+    return dt
+
+
+def parse_order_lines(items):
+    """
+    Validate the shape of requested order lines.
+    Returns a list of (menu_item_id, quantity) tuples; raises ValueError with
+    a client-facing message for the first invalid line.
+    """
+    if not items:
+        raise ValueError("No items in order")
+
+    requested = []
+    for item in items:
+        menu_item_id = item.get('menu_item_id')
+        quantity = item.get('quantity', 1)
+
+        try:
+            menu_item_id = int(menu_item_id)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid menu item ID: {menu_item_id}")
+
+        if not isinstance(quantity, int) or quantity < 1:
+            raise ValueError(f"Invalid quantity for menu item {menu_item_id}")
+
+        requested.append((menu_item_id, quantity))
+    return requested
+
+
+def fetch_menu_items(menu_item_ids):
+    """Load LocationMenuItems (master item joined in) with one id__in query, keyed by id."""
+    return {
+        menu_item.id: menu_item
+        for menu_item in LocationMenuItem.objects.filter(
+            id__in=set(menu_item_ids)
+        ).select_related('menu_item').defer('menu_item__image')
+    }
+
+
+def resolve_order_items(items, location_id, menu_items=None):
+    """
+    Validate requested order lines against a location's menu.
+
+    All referenced LocationMenuItems are loaded with a single query, so the
+    cost no longer grows with the number of lines in the order. Callers that
+    validate several orders at once can pass a prefetched `menu_items` map
+    from fetch_menu_items().
+
+    Returns (order_items, total_amount) where order_items is a list of
+    dicts with 'menu_item', 'quantity' and 'price'. Raises ValueError with a
+    client-facing message for the first invalid line.
+    """
+    requested = parse_order_lines(items)
+    if menu_items is None:
+        menu_items = fetch_menu_items(menu_item_id for menu_item_id, _ in requested)
+
+    total_amount = 0
+    order_items = []
+    for menu_item_id, quantity in requested:
+        menu_item = menu_items.get(menu_item_id)
+        if menu_item is None:
+            raise ValueError(f"Invalid menu item ID: {menu_item_id}")
+
+        # Ensure menu item belongs to the location
+        if menu_item.location_id != location_id:
+            raise ValueError(f"Menu item {menu_item_id} does not belong to location {location_id}")
+
+        # Location price overrides the master price when set
+        item_price = menu_item.price if menu_item.price is not None else menu_item.menu_item.price
+        total_amount += item_price * quantity
+
+        order_items.append({
+            'menu_item': menu_item,
+            'quantity': quantity,
+            'price': item_price
+        })
+
+    return order_items, total_amount
+
+
+def filter_placed_at_range(orders, date_from=None, date_to=None):
+    """
+    Restrict orders to local calendar days given as YYYY-MM-DD strings.
+    Raises ValueError for malformed dates.
+    """
+    if date_from:
+        # date_from is like '2025-08-12'
+        local_from = datetime.datetime.strptime(date_from, "%Y-%m-%d")
+        local_from = timezone.make_aware(local_from, timezone.get_current_timezone())  # e.g. IST
+        utc_from = local_from.astimezone(datetime.timezone.utc)
+        orders = orders.filter(placed_at__gte=utc_from)
+
+    if date_to:
+        local_to = datetime.datetime.strptime(date_to, "%Y-%m-%d")
+        local_to = datetime.datetime.combine(local_to, datetime.time.min) + datetime.timedelta(days=1) - datetime.timedelta(seconds=1)
+        local_to = timezone.make_aware(local_to, timezone.get_current_timezone())
+        utc_to = local_to.astimezone(datetime.timezone.utc)
+        orders = orders.filter(placed_at__lte=utc_to)
+
+    return orders
+
+
+def order_items_prefetch():
+    """Prefetch for Order.items carrying only the menu item and category names used in listings"""
+    return Prefetch('items', queryset=OrderItem.objects.select_related(
+        'menu_item__menu_item__category'
+    ).only(
+        'order', 'quantity', 'price',
+        'menu_item__menu_item__name',
+        'menu_item__menu_item__category__name',
+    ))
+
+
+def visible_orders(user):
+    """
+    Orders the user may read: every order for super admins, orders of their
+    own locations for franchise admins and staff. Returns None for any other role.
+    """
+    if user.is_super_admin:
+        return Order.objects.all()
+    if user.is_franchise_admin or user.is_staff_member:
+        return Order.objects.filter(location_id__in=allowed_location_ids(user))
+    return None
+
+
+def order_etag(order):
+    """Strong ETag that changes whenever the order row is saved"""
+    return f'"{order.id}-{int(order.updated_at.timestamp() * 1000000)}"'
+
+
+def serialize_order_detail(order):
+    """Full order payload; expects location, processed_by and items already loaded"""
+    response_data = {
+        'order_id': order.id,
+        'placed_at': order.placed_at,
+        'total_amount': str(order.total_amount),  # Convert Decimal to string
+        'is_cancelled': order.is_cancelled,
+        'updated_at': order.updated_at,
+        'cancelled_at': order.cancelled_at,
+        'location': {
+            'id': order.location.id,
+            'name': order.location.name
+        },
+        'payment_mode': order.payment_mode,
+        'order_items': [
+            {
+                'order_id': order.id,
+                'menu_item_id': item.menu_item_id,
+                'menu_item__menu_item__name': item.menu_item.menu_item.name,
+                'menu_item__menu_item__category__name': item.menu_item.menu_item.category.name,
+                'quantity': item.quantity,
+                'price': item.price,
+            } for item in order.items.all()
+        ],
+        'token_number': order.token_number,
+    }
+
+    # Add processor information if available
+    if order.processed_by:
+        response_data['processed_by'] = {
+            'id': order.processed_by.id,
+            'name': f"{order.processed_by.first_name} {order.processed_by.last_name}".strip()
+        }
+    return response_data
@@ -4,4 +4,7 @@ from django.shortcuts import render
 
 from ._views.OrderReceiptView import OrderReceiptView
 from ._views.OrderView import OrderView
-from ._views.OrderHistoryView import OrderHistoryView
\ No newline at end of file
+from ._views.OrderHistoryView import OrderHistoryView
+from ._views.OrderSyncView import OrderSyncView
+from ._views.OrderExportView import OrderExportView
+from ._views.OrderDetailView import OrderDetailView
\ No newline at end of file
@@ -1,17 +1,11 @@
 from django.conf import settings
-from django.core.mail import send_mail
+from pos.apps.accounts.outbox import queue_email
 from pos.apps.locations.models import LocationModel
+from pos.utils.permissions import allowed_location_ids, can_access_location
 
 def send_email(subject, message,  to_email_list):
-    """ Send Email"""
-
-    send_mail(
-        subject,
-        message,
-        settings.EMAIL_HOST_USER,
-        to_email_list,
-        fail_silently=False,
-    )
+    """ Queue an email for the outbox worker (send_outbound_emails)"""
+    queue_email(subject, message, to_email_list, from_email=settings.EMAIL_HOST_USER)
 
 
 def user_allowed_locations(user):
@@ -24,11 +18,13 @@ def user_allowed_locations(user):
     if getattr(user, 'is_super_admin', False):
         return LocationModel.objects.all()
     if getattr(user, 'is_franchise_admin', False):
-        return user.locations.all()  
+        return LocationModel.objects.filter(id__in=allowed_location_ids(user))
     return LocationModel.objects.none()
 
 def ensure_can_access_location(user, location_id):
     """
     Return True if user can access the given location_id.
     """
+    if getattr(user, 'is_franchise_admin', False):
+        return can_access_location(user, location_id)
     return user_allowed_locations(user).filter(pk=location_id).exists()
\ No newline at end of file
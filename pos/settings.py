@@ -73,17 +73,27 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'pos.utils.middleware.AdminMiddlewareStack',
+    'pos.utils.middleware.RequestScopeMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+# Browser middleware, run by AdminMiddlewareStack only for these prefixes.
+# The JWT API needs none of it (compare with manage.py benchmark_middleware)
+ADMIN_PATH_PREFIXES = ['/admin/']
+ADMIN_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
+
+# The admin checks look for the middleware above in MIDDLEWARE only
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         "pos.apps.accounts.auth.BlacklistJWTAuthentication",
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
 }
 
@@ -110,6 +120,87 @@ SIMPLE_JWT = {
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
 
+# Argon2 first: existing PBKDF2 hashes still verify and are rehashed with
+# the preferred hasher (and current cost settings) on the user's next login
+PASSWORD_HASHERS = [
+    'pos.apps.accounts.hashers.Argon2PasswordHasher',
+    'pos.apps.accounts.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2))
+PASSWORD_ARGON2_MEMORY_COST = int(os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 102400))  # KiB
+PASSWORD_ARGON2_PARALLELISM = int(os.environ.get('PASSWORD_ARGON2_PARALLELISM', 8))
+PASSWORD_BCRYPT_ROUNDS = int(os.environ.get('PASSWORD_BCRYPT_ROUNDS', 12))
+
+# Threads that check login passwords, and the login latency histogram
+# bucket bounds in seconds (served at /accounts/login/metrics/)
+LOGIN_HASHER_THREADS = int(os.environ.get('LOGIN_HASHER_THREADS', 4))
+LOGIN_LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5]
+
+# Location (terminal) login: how long a verified secret is cached, and the
+# per-client token bucket (requests per second, burst size) of each worker
+LOCATION_LOGIN_CACHE_TIMEOUT = 5 * 60
+LOCATION_LOGIN_THROTTLE_RATE = 0.5
+LOCATION_LOGIN_THROTTLE_BURST = 10
+
+# Callable returning ({kid: PEM certificate}, max_age) for Google Sign-In, and
+# how long to keep certificates when the response carries no max-age
+GOOGLE_CERTS_FETCHER = 'pos.apps.accounts.google_certs.fetch_google_certs'
+GOOGLE_CERTS_DEFAULT_MAX_AGE = 60 * 60
+# Minimum seconds between certificate fetches; tokens with an unknown kid
+# are rejected without fetching until it has passed
+GOOGLE_CERTS_MIN_REFETCH_INTERVAL = 60
+
+# Seconds between a worker's incremental reloads of blacklisted JTIs; a
+# logout on another worker takes at most this long to be enforced here
+JTI_BLACKLIST_REFRESH_INTERVAL = 5
+
+# Seconds each refresh looks back before the previous one, to pick up
+# blacklist rows whose transaction committed after a higher id was read
+JTI_BLACKLIST_REFRESH_MARGIN = 60
+
+# Seconds a worker trusts its cached copy of a user's token version; tokens
+# issued before an email or location change stop working within this window
+TOKEN_VERSION_CACHE_TIMEOUT = 60
+
+# How long a stored response is replayed for a retried Idempotency-Key
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+# A key still pending after this long belongs to a request that died before
+# committing; a retry may claim it again
+IDEMPOTENCY_PENDING_LEASE = timedelta(minutes=1)
+
+# Keyset pagination for order history
+ORDER_HISTORY_PAGE_SIZE = 50
+ORDER_HISTORY_MAX_PAGE_SIZE = 200
+# Rows fetched per server-side cursor round trip when streaming exports
+ORDER_EXPORT_CHUNK_SIZE = 2000
+
+# Thermal receipts: characters per line (42 fits 80mm paper) and cache lifetime
+RECEIPT_LINE_WIDTH = 42
+RECEIPT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Process-local cache by default. Set CACHE_DIR to share entries (and
+# dashboard invalidations) between workers through a file-backed cache.
+if os.environ.get('CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['CACHE_DIR'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'pos-default',
+        }
+    }
+
+# Upper bound on a dashboard KPI cache entry; order writes invalidate sooner
+DASHBOARD_CACHE_TIMEOUT = 60 * 15
+
 ROOT_URLCONF = 'pos.urls'
 
 TEMPLATES = [
@@ -185,6 +276,13 @@ EMAIL_USE_TLS = True
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_TEMPLATES_DIR = THIS_DIR/ "templates"
 
+# Outbox worker (manage.py send_outbound_emails): emails per SMTP connection,
+# attempts before giving up, and backoff in seconds (doubling, capped)
+OUTBOUND_EMAIL_BATCH_SIZE = 50
+OUTBOUND_EMAIL_MAX_ATTEMPTS = 5
+OUTBOUND_EMAIL_RETRY_DELAY = 60
+OUTBOUND_EMAIL_MAX_RETRY_DELAY = 60 * 60
+
 
 
 
@@ -212,6 +310,26 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Content-addressed menu image store (pos.apps.menu.images). Point
+# MENU_IMAGE_URL at a CDN that pulls from /media/menu/ to offload serving
+MENU_IMAGE_ROOT = os.environ.get('MENU_IMAGE_ROOT', BASE_DIR / 'media' / 'menu')
+MENU_IMAGE_URL = os.environ.get('MENU_IMAGE_URL', '/media/menu/')
+MENU_IMAGE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Thumbnails rendered for every uploaded menu image: box sizes in pixels,
+# encoding, and threads rendering them
+MENU_IMAGE_SIZES = [64, 256, 768]
+MENU_IMAGE_VARIANT_FORMAT = 'WEBP'
+MENU_IMAGE_VARIANT_QUALITY = 80
+MENU_IMAGE_WORKERS = int(os.environ.get('MENU_IMAGE_WORKERS', 2))
+
+# Menu delta sync (/menu/changes/): most log rows served before telling a
+# terminal to reload the snapshot, seconds before a row counts as committed
+# for the cursor, and days of log kept by prune_menu_changes
+MENU_CHANGES_LIMIT = 500
+MENU_CHANGES_SETTLE_SECONDS = 5
+MENU_CHANGES_RETENTION_DAYS = 30
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -1,4 +1,8 @@
-from django.test import TestCase
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.test import RequestFactory, TestCase, override_settings
+from django.contrib.auth.hashers import make_password
+from django.http import HttpResponse
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
@@ -6,19 +10,66 @@ from django.contrib.auth import get_user_model
 from pos.apps.locations.models import LocationModel
 from pos.apps.menu.models import (
     MasterMenuItem, LocationMenuItem, 
-    MasterMenuCategory, LocationMenuCategory
+    MasterMenuCategory, LocationMenuCategory, MenuImage, MenuChange
 )
+from pos.apps.menu.images import generate_variants
 from pos.apps.inventory.models import (
     MasterIngredient, LocationIngredient,
     PurchaseEntry, PurchaseList
 )
-from pos.apps.orders.models import Order, OrderItem
+from pos.apps.orders.models import IdempotencyRecord, Order, OrderItem, TokenSequence
+from pos.apps.orders.receipts import receipt_cache_key
+from pos.apps.orders._views.OrderSyncView import OrderSyncView
+from pos.apps.accounts.models import BlacklistedToken, OutboundEmail
+from pos.apps.accounts.blacklist import is_blacklisted, jti_blacklist
+from rest_framework_simplejwt.tokens import AccessToken
+from pos.apps.accounts.tokens import user_from_claims
+from pos.apps.accounts.google_certs import GoogleCertCache
+from pos.apps.accounts._views.login import location_login_buckets
+from pos.apps.utils import ensure_can_access_location
+from pos.utils.middleware import AdminMiddlewareStack, RequestScopeMiddleware, current_request_scope
+from pos.apps.dashboard.models import DailyMenuItemSales, DailyPaymentModeSales, DailySales, HourlySales
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from datetime import timedelta
 from decimal import Decimal
+from PIL import Image
+import io
+import json
 import logging
+import tempfile
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
+def local_google_certs():
+    """Offline stand-in for Google's certificate endpoint"""
+    local_google_certs.calls += 1
+    return {'key-1': 'PEM-1'}, 3600
+
+local_google_certs.calls = 0
+
+def encoded_image(image_format, size, orientation=None):
+    """Bytes of a solid test image, optionally with an EXIF orientation"""
+    output = io.BytesIO()
+    options = {}
+    if orientation:
+        options['exif'] = Image.Exif()
+        options['exif'][0x0112] = orientation
+    Image.new('RGB', size, (200, 120, 40)).save(output, format=image_format, **options)
+    return output.getvalue()
+
+class FailingEmailBackend(BaseEmailBackend):
+    """Email backend whose every send fails, as with an SMTP outage"""
+    def send_messages(self, email_messages):
+        raise ConnectionError('SMTP unavailable')
+
 class BaseTestCase(APITestCase):
     """Base test case with authentication setup and shared data"""
     
@@ -127,6 +178,30 @@ class AccountsTestCase(BaseTestCase):
         self.assertIn('access', response.json())
         self.assertIn('refresh', response.json())
 
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    ])
+    def test_login_rehashes_outdated_password_hash(self):
+        logger.info("Testing Accounts App - Rehash On Login")
+        user = User.objects.create_user(
+            email='rehash@test.com', password=None, first_name='Rehash', last_name='User', is_staff_member=True
+        )
+        user.password = make_password('rehash123', hasher='pbkdf2_sha1')
+        user.save(update_fields=['password'])
+
+        response = self.client.post('/accounts/login/', {
+            'email': 'rehash@test.com',
+            'password': 'rehash123'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, f"Login failed: {response.content}")
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('md5$'))
+
+        response = self.client.get('/accounts/login/metrics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreaterEqual(response.json()['count'], 1)
+
     def test_token_refresh(self):
         logger.info("Testing Accounts App - Token Refresh")
         login_response = self.client.post('/accounts/login/', {
@@ -145,6 +220,205 @@ class AccountsTestCase(BaseTestCase):
                         f"Token refresh failed: {response.content}")
         self.assertIn('access', response.json())
 
+    def test_request_user_comes_from_token_claims(self):
+        logger.info("Testing Accounts App - Claim Backed User")
+        user = user_from_claims(AccessToken(self.access_token))
+        self.assertEqual(user.pk, self.superuser.pk)
+        self.assertEqual(user, self.superuser)
+        self.assertEqual(user.email, 'admin@test.com')
+        self.assertTrue(user.is_super_admin)
+        self.assertIn('first_name', user.get_deferred_fields())
+
+        # Deferred fields still load on demand
+        self.assertEqual(user.first_name, self.superuser.first_name)
+        response = self.client.get('/orders/history/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_location_claims_follow_assignment_changes(self):
+        logger.info("Testing Accounts App - Location Claims")
+        first = LocationModel.objects.create(name='Claims One', address='1 Claim St', city='Claim City', state='CL')
+        second = LocationModel.objects.create(name='Claims Two', address='2 Claim St', city='Claim City', state='CL')
+        admin = User.objects.create_user(
+            email='claims@test.com', password='claims123', first_name='Claims', last_name='Admin',
+            is_franchise_admin=True
+        )
+        admin.locations.set([first])
+
+        access = self.client.post('/accounts/login/', {
+            'email': 'claims@test.com', 'password': 'claims123'
+        }, format='json').json()['access']
+        self.assertEqual(AccessToken(access)['location_ids'], [first.id])
+        user = user_from_claims(AccessToken(access))
+        self.assertTrue(user.has_location_access(first.id))
+        self.assertFalse(user.has_location_access(second.id))
+
+        # Reassigning locations invalidates tokens issued with the old claims
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch('/accounts/franchise-admin/', {
+                'id': admin.id, 'location_ids': [first.id, second.id]
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, f"Update failed: {response.content}")
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        response = self.client.get('/orders/history/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_location_scope_is_resolved_once_per_request(self):
+        logger.info("Testing Accounts App - Request Location Scope")
+        location = LocationModel.objects.create(name='Scope One', address='1 Scope St', city='Scope City', state='SC')
+        admin = User.objects.create_user(
+            email='scope@test.com', password='scope123', first_name='Scope', last_name='Admin',
+            is_franchise_admin=True
+        )
+        admin.locations.set([location])
+
+        def view(request):
+            # A user loaded from the database has no claims: one query, then memoized
+            with self.assertNumQueries(1):
+                self.assertEqual(request.scope.allowed_location_ids, frozenset([location.id]))
+                self.assertTrue(ensure_can_access_location(request.user, location.id))
+                self.assertFalse(request.user.has_location_access(location.id + 1))
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        request.user = User.objects.get(pk=admin.pk)
+        RequestScopeMiddleware(view)(request)
+
+        # Under ASGI the middleware stays async instead of being adapted
+        async def async_view(request):
+            self.assertIs(current_request_scope(), request.scope)
+            return HttpResponse()
+
+        middleware = RequestScopeMiddleware(async_view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertEqual(async_to_sync(middleware)(RequestFactory().get('/')).status_code, status.HTTP_200_OK)
+
+    def test_browser_middleware_runs_only_for_admin(self):
+        logger.info("Testing Accounts App - Admin Middleware Stack")
+        stack = AdminMiddlewareStack(lambda request: HttpResponse())
+        request = RequestFactory().get('/orders/history/')
+        stack(request)
+        self.assertFalse(hasattr(request, 'session'))
+        self.assertIsNone(stack.process_view(request, HttpResponse, (), {}))
+
+        request = RequestFactory().get('/admin/')
+        stack(request)
+        self.assertTrue(hasattr(request, 'session'))
+        self.assertTrue(hasattr(request, '_messages'))
+        # CSRF is still enforced for admin forms
+        request = RequestFactory().post('/admin/login/')
+        stack(request)
+        response = stack.process_view(request, HttpResponse, (), {})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        async def async_handler(request):
+            return HttpResponse()
+
+        stack = AdminMiddlewareStack(async_handler)
+        self.assertTrue(iscoroutinefunction(stack))
+        request = RequestFactory().get('/admin/')
+        async_to_sync(stack)(request)
+        self.assertTrue(hasattr(request, 'session'))
+
+    @override_settings(GOOGLE_CERTS_FETCHER='pos.tests.test_suite.local_google_certs')
+    def test_google_certs_are_cached_by_kid(self):
+        logger.info("Testing Accounts App - Google Certificate Cache")
+        local_google_certs.calls = 0
+        certs = GoogleCertCache()
+        self.assertEqual(certs.get_cert('key-1'), 'PEM-1')
+        self.assertEqual(certs.get_cert('key-1'), 'PEM-1')
+        self.assertEqual(local_google_certs.calls, 1)
+
+        # Made-up kids cannot make every login fetch from Google
+        for kid in ('random-1', 'random-2'):
+            with self.assertRaises(ValueError):
+                certs.get_cert(kid)
+        self.assertEqual(local_google_certs.calls, 1)
+
+        # Once the interval has passed, an unknown kid refetches before giving up
+        certs.fetched_at -= settings.GOOGLE_CERTS_MIN_REFETCH_INTERVAL
+        with self.assertRaises(ValueError):
+            certs.get_cert('rotated-key')
+        self.assertEqual(local_google_certs.calls, 2)
+
+    def test_logout_blacklists_token(self):
+        logger.info("Testing Accounts App - Logout Blacklist")
+        response = self.client.post('/accounts/logout/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, f"Logout failed: {response.content}")
+        response = self.client.get('/orders/history/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Rows written by another worker show up after a refresh
+        jti = AccessToken.for_user(self.superuser)['jti']
+        BlacklistedToken.objects.create(jti=jti)
+        jti_blacklist.refresh(force=True)
+        self.assertTrue(is_blacklisted(jti))
+
+    def test_prune_blacklisted_tokens_keeps_unexpired(self):
+        logger.info("Testing Accounts App - Prune Blacklisted Tokens")
+        response = self.client.post('/accounts/logout/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, f"Logout failed: {response.content}")
+
+        # Logout stores the token's expiry, so pruning can drop the row later
+        logged_out = BlacklistedToken.objects.get()
+        self.assertIsNotNone(logged_out.expires_at)
+        BlacklistedToken.objects.create(jti=AccessToken.for_user(self.superuser)['jti'], expires_at=timezone.now())
+        call_command('prune_blacklisted_tokens', stdout=io.StringIO())
+        self.assertEqual(list(BlacklistedToken.objects.values_list('id', flat=True)), [logged_out.id])
+
+    def test_blacklist_loads_only_live_rows(self):
+        logger.info("Testing Accounts App - Blacklist Skips Expired Rows")
+        expired = BlacklistedToken.objects.create(jti='expired-jti', expires_at=timezone.now())
+        legacy = BlacklistedToken.objects.create(jti='legacy-jti')
+        BlacklistedToken.objects.filter(pk=legacy.pk).update(
+            blacklisted_on=timezone.now() - settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME']
+        )
+        live = BlacklistedToken.objects.create(jti='live-jti')
+
+        jti_blacklist.clear()
+        jti_blacklist.refresh(force=True)
+        self.assertNotIn(expired.jti, jti_blacklist.expiries)
+        self.assertNotIn(legacy.jti, jti_blacklist.expiries)
+        self.assertIn(live.jti, jti_blacklist.expiries)
+
+    def test_blacklist_refresh_picks_up_late_commits(self):
+        logger.info("Testing Accounts App - Blacklist Late Commit")
+        jti_blacklist.clear()
+        jti_blacklist.refresh(force=True)
+        early = BlacklistedToken.objects.create(jti=AccessToken.for_user(self.superuser)['jti'])
+        late = BlacklistedToken.objects.create(jti=AccessToken.for_user(self.superuser)['jti'])
+
+        # Another worker read the higher id before the lower one committed
+        jti_blacklist.expiries.pop(early.jti, None)
+        jti_blacklist.high_water_mark = late.id
+        jti_blacklist.refresh(force=True)
+        self.assertTrue(is_blacklisted(early.jti))
+
+    def test_welcome_mail_goes_through_outbox(self):
+        logger.info("Testing Accounts App - Email Outbox")
+        response = self.client.post('/accounts/franchise-admin/', {
+            'email': 'outbox@test.com', 'first_name': 'Outbox', 'last_name': 'Admin',
+            'location_ids': [self.shared_location_id]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, f"Create failed: {response.content}")
+        # The request only queues the mail
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.recipients, ['outbox@test.com'])
+
+        # A failed send is retried later instead of being dropped
+        with override_settings(EMAIL_BACKEND='pos.tests.test_suite.FailingEmailBackend'):
+            call_command('send_outbound_emails', stdout=io.StringIO())
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertGreater(email.next_attempt_at, timezone.now())
+
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+        call_command('send_outbound_emails', stdout=io.StringIO())
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'sent')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['outbox@test.com'])
+
 class LocationsTestCase(BaseTestCase):
     """Test location management"""
 
@@ -199,6 +473,32 @@ class LocationsTestCase(BaseTestCase):
         response = self.client.delete(f"/locations/?id={location_id}")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    @override_settings(LOCATION_LOGIN_THROTTLE_RATE=0.001, LOCATION_LOGIN_THROTTLE_BURST=2)
+    def test_location_login_hashes_caches_and_throttles(self):
+        logger.info("Testing Locations App - Location Login")
+        location_login_buckets.clear()
+        # Secrets stored before hashing still work and are hashed on first use
+        location = LocationModel.objects.create(
+            name='Terminal Location', password='terminal123', address='1 Terminal St', city='Terminal City', state='TL'
+        )
+        credentials = {'location_name': 'Terminal Location', 'location_password': 'terminal123'}
+        response = self.client.post('/accounts/login-location/', credentials, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, f"Location login failed: {response.content}")
+        location.refresh_from_db()
+        self.assertNotEqual(location.password, 'terminal123')
+        self.assertTrue(location.check_password('terminal123'))
+
+        # A cached verification costs only the location lookup
+        with self.assertNumQueries(1):
+            response = self.client.post('/accounts/login-location/', credentials, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # The burst is spent: further attempts are refused before any lookup
+        with self.assertNumQueries(0):
+            response = self.client.post('/accounts/login-location/', credentials, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        location_login_buckets.clear()
+
 class MenuTestCase(BaseTestCase):
     """Test menu management"""
 
@@ -336,6 +636,167 @@ class MenuTestCase(BaseTestCase):
                 response = self.client.delete(f"/menu/location-menu-items/{location_item_id}/")
                 self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_menu_images_are_served_from_the_image_store(self):
+        logger.info("Testing Menu App - Image Store")
+        image_bytes = encoded_image('PNG', (40, 30))
+        with tempfile.TemporaryDirectory() as image_root, override_settings(MENU_IMAGE_ROOT=image_root):
+            response = self.client.post('/menu/master-menu-items/', {
+                'name': 'Image Store Coffee', 'price': '3.50', 'category_id': self.shared_category_id,
+                'image': SimpleUploadedFile('coffee.png', image_bytes, content_type='image/png'),
+            }, format='multipart')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED, f"Create failed: {response.content}")
+            image_url = response.json()['image']
+            self.assertTrue(image_url.startswith('/media/menu/'))
+
+            # List endpoints carry the URL, not the bytes
+            items = self.client.get('/menu/master-menu-items/').json()['menu_items']
+            self.assertIn(image_url, [item['image'] for item in items])
+
+            response = self.client.get(image_url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(b''.join(response.streaming_content), image_bytes)
+            self.assertEqual(response['Content-Type'], 'image/png')
+            self.assertIn('immutable', response['Cache-Control'])
+            response = self.client.get(image_url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+            # Blobs stored in the database before the image store are moved out
+            category = MasterMenuCategory.objects.get(pk=self.shared_category_id)
+            legacy = MasterMenuItem.objects.create(name='Legacy Image Tea', price='2.00', category=category, image=image_bytes)
+            call_command('migrate_menu_images', stdout=io.StringIO())
+            legacy.refresh_from_db()
+            self.assertIsNone(legacy.image)
+            self.assertEqual(f"/media/menu/{legacy.image_hash}", image_url)
+
+    def test_menu_image_uploads_get_oriented_thumbnails(self):
+        logger.info("Testing Menu App - Image Thumbnails")
+        # A landscape JPEG whose EXIF says it was shot in portrait
+        photo = encoded_image('JPEG', (1600, 1200), orientation=6)
+        with tempfile.TemporaryDirectory() as image_root, override_settings(MENU_IMAGE_ROOT=image_root):
+            response = self.client.post('/menu/master-menu-items/', {
+                'name': 'Thumbnail Coffee', 'price': '3.50', 'category_id': self.shared_category_id,
+                'image': SimpleUploadedFile('coffee.png', photo, content_type='image/png'),
+            }, format='multipart')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED, f"Create failed: {response.content}")
+            image_hash = response.json()['image'].rsplit('/', 1)[1]
+            # The recorded type comes from the bytes, not from the client
+            self.assertEqual(MenuImage.objects.get(hash=image_hash).content_type, 'image/jpeg')
+
+            # Rendered by image_pool after commit in production
+            generate_variants(image_hash)
+            thumbnails = self.client.get(f"/menu/master-menu-items/{response.json()['id']}/").json()['thumbnails']
+            self.assertEqual(set(thumbnails), {'64', '256', '768'})
+            response = self.client.get(thumbnails['64'])
+            self.assertEqual(response['Content-Type'], 'image/webp')
+            with Image.open(io.BytesIO(b''.join(response.streaming_content))) as thumbnail:
+                self.assertEqual(thumbnail.size, (48, 64))
+
+            response = self.client.post('/menu/master-menu-items/', {
+                'name': 'Not An Image', 'price': '3.50', 'category_id': self.shared_category_id,
+                'image': SimpleUploadedFile('notes.png', b'not an image', content_type='image/png'),
+            }, format='multipart')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_menu_queries_leave_image_blobs_unread(self):
+        logger.info("Testing Menu App - Deferred Image Column")
+        location = LocationModel.objects.get(pk=self.shared_location_id)
+        category = MasterMenuCategory.objects.get(pk=self.shared_category_id)
+        master_item = MasterMenuItem.objects.create(name='Deferred Blob Coffee', price='3.00', category=category, image=b'blob')
+        location_item = LocationMenuItem.objects.create(menu_item=master_item, location=location)
+
+        def selected_sql(action):
+            with CaptureQueriesContext(connection) as queries:
+                action()
+            return ' '.join(query['sql'] for query in queries.captured_queries)
+
+        self.assertNotIn('"image"', selected_sql(lambda: list(MasterMenuItem.objects.all())))
+        self.assertIn('"image"', selected_sql(lambda: list(MasterMenuItem.objects.with_images())))
+        for url in (
+            f'/menu/location-menu-items/?location_id={location.id}',
+            f'/menu/location-menu-items/{location_item.id}/',
+            '/menu/master-menu-items/',
+            f'/menu/master-menu-items/{master_item.id}/',
+            f'/menu/master-menu-item-locations/{master_item.id}/',
+            '/menu/location-categories/',
+        ):
+            sql = selected_sql(lambda: self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK))
+            self.assertNotIn('"image"', sql, url)
+
+    def test_menu_snapshot_is_versioned_and_served_with_etag(self):
+        logger.info("Testing Menu App - Menu Snapshot")
+        location = LocationModel.objects.get(pk=self.shared_location_id)
+        category = MasterMenuCategory.objects.get(pk=self.shared_category_id)
+        master_item = MasterMenuItem.objects.create(name='Snapshot Coffee', price='3.00', category=category)
+        location_item = LocationMenuItem.objects.create(menu_item=master_item, location=location, price='3.50')
+        LocationMenuCategory.objects.create(category=category, location=location)
+        url = f'/menu/snapshot/?location_id={location.id}'
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, f"Snapshot failed: {response.content}")
+        snapshot = json.loads(response.content)
+        self.assertEqual(snapshot['version'], 1)
+        self.assertEqual([(item['name'], item['price'], item['is_available']) for item in snapshot['items']],
+                         [('Snapshot Coffee', 3.5, True)])
+        self.assertEqual([c['id'] for c in snapshot['categories']], [category.id])
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Saving without changing anything keeps the version
+        location_item.save()
+        self.assertEqual(self.client.get(f'/menu/snapshot/version/?location_id={location.id}').json()['version'], 1)
+
+        response = self.client.patch(f'/menu/location-menu-items/{location_item.id}/', {'is_available': False}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(f'/menu/snapshot/version/?location_id={location.id}').json()['version'], 2)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(json.loads(response.content)['items'][0]['is_available'])
+
+    @override_settings(MENU_CHANGES_SETTLE_SECONDS=0)
+    def test_menu_changes_return_upserts_and_tombstones(self):
+        logger.info("Testing Menu App - Menu Changes")
+        location = LocationModel.objects.get(pk=self.shared_location_id)
+        category = MasterMenuCategory.objects.get(pk=self.shared_category_id)
+        location_category, _ = LocationMenuCategory.objects.get_or_create(category=category, location=location)
+        master_item = MasterMenuItem.objects.create(name='Delta Tea', price='2.00', category=category)
+        location_item = LocationMenuItem.objects.create(menu_item=master_item, location=location, price='2.50')
+        since = MenuChange.objects.order_by('-id').values_list('id', flat=True).first()
+        url = f'/menu/changes/?location_id={location.id}'
+
+        response = self.client.get(f'{url}&since={since}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, f"Changes failed: {response.content}")
+        self.assertEqual(response.json()['upserts'], {'categories': [], 'items': []})
+        self.assertEqual(response.json()['next_since'], since)
+
+        response = self.client.patch(f'/menu/location-menu-items/{location_item.id}/', {'is_available': False}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        delta = self.client.get(f'{url}&since={since}').json()
+        self.assertFalse(delta['reset'])
+        self.assertEqual([(item['menu_item_id'], item['is_available']) for item in delta['upserts']['items']],
+                         [(master_item.id, False)])
+        self.assertEqual(delta['deletes'], {'categories': [], 'items': []})
+        self.assertGreater(delta['next_since'], since)
+
+        response = self.client.delete(f'/menu/location-menu-items/{location_item.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        delta = self.client.get(f"{url}&since={delta['next_since']}").json()
+        self.assertEqual(delta['upserts']['items'], [])
+        self.assertEqual(delta['deletes']['items'], [master_item.id])
+
+        # Unassigning a category takes its items off the menu with it
+        other_item = MasterMenuItem.objects.create(name='Delta Coffee', price='3.00', category=category)
+        LocationMenuItem.objects.create(menu_item=other_item, location=location)
+        since = delta['next_since']
+        response = self.client.delete(f'/menu/location-categories/{location_category.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        delta = self.client.get(f'{url}&since={since}').json()
+        self.assertEqual(delta['upserts'], {'categories': [], 'items': []})
+        self.assertEqual(delta['deletes'], {'categories': [category.id], 'items': sorted([master_item.id, other_item.id])})
+        snapshot = json.loads(self.client.get(f'/menu/snapshot/?location_id={location.id}').content)
+        self.assertEqual((snapshot['categories'], snapshot['items']), ([], []))
+
+        self.assertEqual(self.client.get(f'{url}&since=abc').status_code, status.HTTP_400_BAD_REQUEST)
+
 class InventoryTestCase(BaseTestCase):
     """Test inventory management"""
 
@@ -787,6 +1248,291 @@ class OrdersTestCase(BaseTestCase):
         response = self.client.get(f'/orders/history/?location_id={self.shared_location_id}')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+class OrderPipelineTestCase(BaseTestCase):
+    """Test order creation against menu data built directly in the DB"""
+
+    def setUp(self):
+        super().setUp()
+        self.location = LocationModel.objects.create(
+            name='Pipeline Location', address='1 Pipeline St', city='Pipeline City', state='PL'
+        )
+        category = MasterMenuCategory.objects.create(name='Pipeline Category')
+        coffee = MasterMenuItem.objects.create(name='Pipeline Coffee', price=Decimal('4.00'), category=category)
+        tea = MasterMenuItem.objects.create(name='Pipeline Tea', price=Decimal('2.50'), category=category)
+        self.coffee = LocationMenuItem.objects.create(menu_item=coffee, location=self.location, price=Decimal('5.00'))
+        self.tea = LocationMenuItem.objects.create(menu_item=tea, location=self.location)
+
+    def test_order_create_multiple_items(self):
+        logger.info("Testing Orders App - Multi-item Order Creation")
+        order_data = {
+            'location_id': self.location.id,
+            'payment_mode': 'cash',
+            'items': [
+                {'menu_item_id': self.coffee.id, 'quantity': 2},
+                {'menu_item_id': self.tea.id, 'quantity': 1},
+            ]
+        }
+        response = self.client.post('/orders/create-order/', order_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED,
+                        f"Failed to create order: {response.content}")
+        # Location price for coffee, master price fallback for tea
+        self.assertEqual(Decimal(response.json()['total_amount']), Decimal('12.50'))
+        self.assertEqual(len(response.json()['order_items']), 2)
+        self.assertEqual(OrderItem.objects.filter(order_id=response.json()['order_id']).count(), 2)
+
+    def test_order_create_rejects_foreign_item(self):
+        logger.info("Testing Orders App - Order Item From Another Location")
+        other_location = LocationModel.objects.create(
+            name='Other Pipeline Location', address='2 Pipeline St', city='Pipeline City', state='PL'
+        )
+        order_data = {
+            'location_id': other_location.id,
+            'items': [{'menu_item_id': self.coffee.id, 'quantity': 1}]
+        }
+        response = self.client.post('/orders/create-order/', order_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.filter(location=other_location).exists())
+
+    def test_token_numbers_are_sequential(self):
+        logger.info("Testing Orders App - Token Sequence")
+        tokens = [
+            Order.objects.create(location=self.location, placed_at=timezone.now(), total_amount=Decimal('1.00')).token_number
+            for _ in range(3)
+        ]
+        self.assertEqual(tokens, [1, 2, 3])
+        sequence = TokenSequence.objects.get(location=self.location, token_date=timezone.localdate())
+        self.assertEqual(sequence.last_number, 3)
+
+    def test_token_sequence_catches_up_with_existing_tokens(self):
+        logger.info("Testing Orders App - Token Sequence Resync")
+        Order.objects.create(
+            location=self.location, placed_at=timezone.now(), total_amount=Decimal('1.00'),
+            token_number=1, token_date=timezone.localdate()
+        )
+        order = Order.objects.create(location=self.location, placed_at=timezone.now(), total_amount=Decimal('1.00'))
+        self.assertEqual(order.token_number, 2)
+
+    def test_order_sync_is_idempotent(self):
+        logger.info("Testing Orders App - Offline Order Sync")
+        sync_data = {
+            'orders': [
+                {
+                    'idempotency_key': f'terminal-1-{n}',
+                    'location_id': self.location.id,
+                    'placed_at': f'2025-08-30T10:0{n}:00Z',
+                    'items': [{'menu_item_id': self.coffee.id, 'quantity': 1}],
+                } for n in range(3)
+            ] + [{
+                'idempotency_key': 'terminal-1-bad',
+                'location_id': self.location.id,
+                'items': [{'menu_item_id': self.coffee.id, 'quantity': 0}],
+            }]
+        }
+        response = self.client.post('/orders/sync/', sync_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, f"Order sync failed: {response.content}")
+        results = response.json()['results']
+        self.assertEqual([results[f'terminal-1-{n}']['token_number'] for n in range(3)], [1, 2, 3])
+        self.assertEqual(results['terminal-1-bad']['status'], 'error')
+
+        # Replaying the same batch must not create anything new
+        response = self.client.post('/orders/sync/', sync_data, format='json')
+        results = response.json()['results']
+        self.assertEqual(results['terminal-1-0']['status'], 'duplicate')
+        self.assertEqual(Order.objects.filter(location=self.location).count(), 3)
+
+        # The one-by-one fallback reports a replayed key without allocating tokens
+        counters = list(TokenSequence.objects.values_list('id', 'last_number'))
+        results = OrderSyncView().create_orders_one_by_one([{
+            'key': 'terminal-1-0', 'location_id': self.location.id, 'placed_at': timezone.now(),
+            'total_amount': Decimal('5.00'), 'payment_mode': 'cash', 'order_items': [],
+        }], self.superuser)
+        self.assertEqual(results['terminal-1-0']['status'], 'duplicate')
+        self.assertEqual(list(TokenSequence.objects.values_list('id', 'last_number')), counters)
+
+    def test_order_create_replays_idempotency_key(self):
+        logger.info("Testing Orders App - Idempotent Order Creation")
+        order_data = {
+            'location_id': self.location.id,
+            'items': [{'menu_item_id': self.coffee.id, 'quantity': 1}]
+        }
+        first = self.client.post('/orders/create-order/', order_data, format='json', HTTP_IDEMPOTENCY_KEY='retry-1')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED, f"Failed to create order: {first.content}")
+        retry = self.client.post('/orders/create-order/', order_data, format='json', HTTP_IDEMPOTENCY_KEY='retry-1')
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json()['order_id'], first.json()['order_id'])
+        self.assertEqual(Order.objects.filter(location=self.location).count(), 1)
+
+        # Same key with a different payload is rejected
+        order_data['items'][0]['quantity'] = 2
+        response = self.client.post('/orders/create-order/', order_data, format='json', HTTP_IDEMPOTENCY_KEY='retry-1')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+        # A key left pending by a request that died is claimed again after the lease
+        abandoned = IdempotencyRecord.objects.create(
+            user=self.superuser, key='retry-2', request_hash='', expires_at=timezone.now() + timedelta(hours=1)
+        )
+        IdempotencyRecord.objects.filter(pk=abandoned.pk).update(created_at=timezone.now() - timedelta(minutes=5))
+        response = self.client.post('/orders/create-order/', order_data, format='json', HTTP_IDEMPOTENCY_KEY='retry-2')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, f"Failed to create order: {response.content}")
+        self.assertEqual(IdempotencyRecord.objects.get(key='retry-2').status_code, status.HTTP_201_CREATED)
+
+    def test_order_history_keyset_pagination(self):
+        logger.info("Testing Orders App - Order History Pagination")
+        for n in range(5):
+            order = Order.objects.create(
+                location=self.location, placed_at=timezone.now(), total_amount=Decimal('5.00')
+            )
+            OrderItem.objects.create(order=order, menu_item=self.coffee, quantity=1, price=Decimal('5.00'))
+
+        seen = []
+        cursor = None
+        while True:
+            url = f'/orders/history/?location_id={self.location.id}&page_size=2'
+            if cursor:
+                url += f'&cursor={cursor}'
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, f"History failed: {response.content}")
+            page = response.json()
+            self.assertLessEqual(len(page['results']), 2)
+            seen.extend(order['order_id'] for order in page['results'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+        self.assertEqual(
+            seen, list(Order.objects.filter(location=self.location).order_by('-placed_at', '-id').values_list('id', flat=True))
+        )
+
+    def test_order_export_streams_csv_and_ndjson(self):
+        logger.info("Testing Orders App - Order Export")
+        order = Order.objects.create(location=self.location, placed_at=timezone.now(), total_amount=Decimal('7.50'))
+        OrderItem.objects.create(order=order, menu_item=self.coffee, quantity=1, price=Decimal('5.00'))
+        OrderItem.objects.create(order=order, menu_item=self.tea, quantity=1, price=Decimal('2.50'))
+
+        response = self.client.get(f'/orders/export/?location_id={self.location.id}&export_format=csv')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode('utf-8').strip().splitlines()
+        self.assertEqual(len(lines), 3)  # header + one row per item
+
+        response = self.client.get(f'/orders/export/?location_id={self.location.id}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode('utf-8').strip().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(len(json.loads(lines[0])['order_items']), 2)
+
+    def test_order_detail_etag(self):
+        logger.info("Testing Orders App - Order Detail ETag")
+        order = Order.objects.create(location=self.location, placed_at=timezone.now(), total_amount=Decimal('5.00'))
+        OrderItem.objects.create(order=order, menu_item=self.coffee, quantity=1, price=Decimal('5.00'))
+
+        response = self.client.get(f'/orders/{order.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, f"Order detail failed: {response.content}")
+        self.assertEqual(len(response.json()['order_items']), 1)
+        etag = response['ETag']
+
+        response = self.client.get(f'/orders/{order.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Any change to the order invalidates the ETag
+        order.payment_mode = 'card'
+        order.save()
+        response = self.client.get(f'/orders/{order.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # The legacy history lookup returns the same payload
+        response = self.client.get(f'/orders/history/?order_id={order.id}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['order_items'][0]['menu_item_id'], self.coffee.id)
+
+    def test_order_receipt_is_cached_until_order_changes(self):
+        logger.info("Testing Orders App - Cached Receipt")
+        order = Order.objects.create(location=self.location, placed_at=timezone.now(), total_amount=Decimal('10.00'))
+        OrderItem.objects.create(order=order, menu_item=self.coffee, quantity=2, price=Decimal('5.00'))
+
+        response = self.client.get(f'/orders/generate-order-receipt/{order.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, f"Receipt failed: {response.content}")
+        self.assertIn('Pipeline Coffee', response.json()['receipt'])
+        self.assertIsNotNone(cache.get(receipt_cache_key(order.id, order.updated_at)))
+
+        response = self.client.get(f'/orders/generate-order-receipt/{order.id}/?output=escpos')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.content.startswith(b'\x1b@'))
+
+        # A save moves the key on, so no worker can serve the old receipt
+        previous_key = receipt_cache_key(order.id, order.updated_at)
+        order.is_cancelled = True
+        order.save()
+        self.assertIsNone(cache.get(receipt_cache_key(order.id, order.updated_at)))
+        response = self.client.get(f'/orders/generate-order-receipt/{order.id}/')
+        self.assertIn('CANCELLED', response.json()['receipt'])
+        self.assertNotIn('CANCELLED', cache.get(previous_key)['text'])
+
+    def test_sales_rollups_follow_order_writes(self):
+        logger.info("Testing Dashboard - Incremental Sales Rollups")
+        order_data = {
+            'location_id': self.location.id,
+            'payment_mode': 'cash',
+            'items': [{'menu_item_id': self.coffee.id, 'quantity': 2}]
+        }
+        response = self.client.post('/orders/create-order/', order_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, f"Failed to create order: {response.content}")
+        order_id = response.json()['order_id']
+
+        daily = DailySales.objects.get(location=self.location, date=timezone.localdate())
+        self.assertEqual((daily.order_count, daily.revenue), (1, Decimal('10.00')))
+        item_sales = DailyMenuItemSales.objects.get(location=self.location, menu_item=self.coffee)
+        self.assertEqual((item_sales.quantity, item_sales.revenue), (2, Decimal('10.00')))
+
+        response = self.client.delete('/orders/create-order/', {'order_id': order_id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, f"Failed to cancel order: {response.content}")
+        daily.refresh_from_db()
+        self.assertEqual((daily.order_count, daily.revenue), (0, Decimal('0.00')))
+        self.assertEqual((daily.cancelled_count, daily.cancelled_amount), (1, Decimal('10.00')))
+        self.assertEqual(DailyPaymentModeSales.objects.get(location=self.location, payment_mode='cash').order_count, 0)
+
+        # A rebuild from the orders table lands on the same numbers
+        call_command('rebuild_sales_rollups', location=self.location.id, stdout=io.StringIO())
+        daily = DailySales.objects.get(location=self.location, date=timezone.localdate())
+        self.assertEqual((daily.order_count, daily.cancelled_count), (0, 1))
+        self.assertFalse(HourlySales.objects.filter(location=self.location).exists())
+
+    def test_dashboard_kpis_are_invalidated_by_order_writes(self):
+        logger.info("Testing Dashboard - Cached KPIs")
+        order_data = {
+            'location_id': self.location.id,
+            'payment_mode': 'card',
+            'items': [{'menu_item_id': self.tea.id, 'quantity': 2}]
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/orders/create-order/', order_data, format='json')
+
+        response = self.client.get(f'/dashboard/sales/?location_id={self.location.id}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, f"Dashboard failed: {response.content}")
+        self.assertEqual(response.json()['order_count'], 1)
+        self.assertEqual(Decimal(response.json()['revenue']), Decimal('5.00'))
+
+        # The next sale drops the cached entry for this location
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/orders/create-order/', order_data, format='json')
+        response = self.client.get(f'/dashboard/sales/?location_id={self.location.id}')
+        self.assertEqual(response.json()['order_count'], 2)
+
+        response = self.client.get(f'/dashboard/top-items/?location_id={self.location.id}')
+        self.assertEqual(response.json()['items'][0]['name'], 'Pipeline Tea')
+        self.assertEqual(response.json()['items'][0]['quantity'], 4)
+
+        response = self.client.get('/dashboard/hourly/')
+        self.assertEqual(sum(hour['order_count'] for hour in response.json()['hours']), 2)
+
+        response = self.client.get('/dashboard/leaderboard/')
+        self.assertEqual(response.json()['locations'][0]['location_id'], self.location.id)
+
+        response = self.client.get('/dashboard/sales/?date=yesterday')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 class IntegrationTestCase(BaseTestCase):
     """Test integration between different apps"""
 
@@ -17,6 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path,include
 from pos.health_view import health_check
+from pos.apps.menu.views import menu_image
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('accounts/', include('pos.apps.accounts.urls')),
@@ -26,5 +27,6 @@ urlpatterns = [
     path('orders/', include('pos.apps.orders.urls')),
     path('inventory/', include('pos.apps.inventory.urls')),
     path('dashboard/', include('pos.apps.dashboard.urls')),
+    path('media/menu/<str:image_hash>', menu_image, name='menu_image'),
 
 ]
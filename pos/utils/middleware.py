@@ -0,0 +1,113 @@
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+_current_scope = ContextVar('request_scope', default=None)
+
+
+class RequestScope:
+    """
+    Values derived from the authenticated user, computed at most once per
+    request. Reachable as request.scope or through current_request_scope()
+    from helpers that only receive the user.
+    """
+    def __init__(self, request):
+        self.request = request
+        self.memo = {}
+
+    def memoize(self, key, compute):
+        if key not in self.memo:
+            self.memo[key] = compute()
+        return self.memo[key]
+
+    @property
+    def allowed_location_ids(self):
+        """frozenset of location IDs the request's user can access (None: all)"""
+        from pos.utils.permissions import allowed_location_ids
+        # DRF authenticates lazily and then sets the user on the Django request
+        return allowed_location_ids(self.request.user)
+
+
+def current_request_scope():
+    return _current_scope.get()
+
+
+class RequestScopeMiddleware:
+    """
+    Attach a fresh RequestScope to every request. Sync and async capable, so
+    under ASGI the async views below it are not forced onto the sync thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.scope = RequestScope(request)
+        token = _current_scope.set(request.scope)
+        try:
+            return self.get_response(request)
+        finally:
+            _current_scope.reset(token)
+
+    async def __acall__(self, request):
+        request.scope = RequestScope(request)
+        token = _current_scope.set(request.scope)
+        try:
+            return await self.get_response(request)
+        finally:
+            _current_scope.reset(token)
+
+
+class AdminMiddlewareStack:
+    """
+    Run settings.ADMIN_MIDDLEWARE (sessions, CSRF, auth, messages) only for
+    paths under settings.ADMIN_PATH_PREFIXES. The API authenticates with
+    JWT, so every other request skips loading a session, the CSRF checks
+    and message storage. Sync and async capable like the middleware it wraps.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefixes = tuple(settings.ADMIN_PATH_PREFIXES)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+        # Chained the way Django's handler chains settings.MIDDLEWARE
+        handler = get_response
+        middleware = []
+        for middleware_path in reversed(settings.ADMIN_MIDDLEWARE):
+            handler = import_string(middleware_path)(handler)
+            middleware.insert(0, handler)
+        self.admin_handler = handler
+        self.view_hooks = [instance.process_view for instance in middleware if hasattr(instance, 'process_view')]
+
+    def uses_admin_stack(self, request):
+        return request.path_info.startswith(self.prefixes)
+
+    def __call__(self, request):
+        # The admin middleware picks the same mode as get_response, so both
+        # handlers are coroutine functions in async mode
+        if self.uses_admin_stack(request):
+            return self.admin_handler(request)
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Django only calls process_view on settings.MIDDLEWARE, so pass it on
+        # (CsrfViewMiddleware checks tokens here)
+        if not self.uses_admin_stack(request):
+            return None
+        for hook in self.view_hooks:
+            response = hook(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
@@ -1,8 +1,38 @@
 from rest_framework.permissions import BasePermission
 from pos.utils.logger import POSLogger
+from pos.utils.middleware import current_request_scope
 
 logger = POSLogger(__name__)
 
+def resolve_allowed_location_ids(user):
+    if user.is_super_admin:
+        return None
+    location_ids = getattr(user, 'location_ids', None)
+    if location_ids is None:
+        location_ids = frozenset(user.locations.values_list('id', flat=True))
+    return location_ids
+
+def allowed_location_ids(user):
+    """
+    IDs of the locations the user can access, or None for super admins (all).
+    Taken from the token claims when present, otherwise from the database,
+    and resolved once per request (see RequestScopeMiddleware).
+    """
+    scope = current_request_scope()
+    if scope is None:
+        return resolve_allowed_location_ids(user)
+    return scope.memoize(('allowed_location_ids', user.pk), lambda: resolve_allowed_location_ids(user))
+
+def can_access_location(user, location_id):
+    """Check location access in memory when the token carries the claims"""
+    location_ids = allowed_location_ids(user)
+    if location_ids is None:
+        return True
+    try:
+        return int(location_id) in location_ids
+    except (TypeError, ValueError):
+        return False
+
 class IsSuperAdmin(BasePermission):
     """
     Allows access only to super admin users.
@@ -60,7 +90,7 @@ class HasLocationAccess(BasePermission):
             logger.warning("Location ID not provided in request")
             return False
             
-        has_access = request.user.has_location_access(location_id)
+        has_access = can_access_location(request.user, location_id)
         if not has_access:
             logger.warning(f"User {request.user.email} tried to access location {location_id} without permission")
         return has_access 
\ No newline at end of file
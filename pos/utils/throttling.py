@@ -0,0 +1,70 @@
+"""
+Local-memory token bucket throttling.
+
+Buckets live in the worker process, so checking one costs no cache or
+database round trip; limits therefore apply per process. A bucket holds up
+to `burst` tokens and refills at `rate` tokens per second, and every request
+spends one.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBuckets:
+    # Past this many buckets, refilled (idle) ones are dropped
+    max_buckets = 10000
+
+    def __init__(self):
+        self.buckets = {}  # key -> (tokens, monotonic time of last update)
+        self.lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        """Spend a token: 0 if one was available, else seconds until the next one"""
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens < 1:
+                self.buckets[key] = (tokens, now)
+                return (1 - tokens) / rate
+
+            self.buckets[key] = (tokens - 1, now)
+            if len(self.buckets) > self.max_buckets:
+                self.buckets = {
+                    bucket_key: (bucket_tokens, bucket_updated)
+                    for bucket_key, (bucket_tokens, bucket_updated) in self.buckets.items()
+                    if bucket_tokens + (now - bucket_updated) * rate < burst
+                }
+            return 0
+
+    def clear(self):
+        with self.lock:
+            self.buckets = {}
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    DRF throttle backed by TokenBuckets, one bucket per client address.
+    Subclasses set `buckets` and the names of the rate and burst settings.
+    """
+    buckets = None
+    rate_setting = None
+    burst_setting = None
+
+    def get_key(self, request, view):
+        return self.get_ident(request)
+
+    def allow_request(self, request, view):
+        self.retry_after = self.buckets.take(
+            self.get_key(request, view),
+            getattr(settings, self.rate_setting),
+            getattr(settings, self.burst_setting),
+        )
+        return self.retry_after == 0
+
+    def wait(self):
+        return self.retry_after
@@ -1,6 +1,8 @@
 #!/bin/sh
 
-python manage.py makemigrations accounts locations menu orders inventory
+python manage.py makemigrations accounts locations menu orders inventory dashboard
 python manage.py migrate
+python manage.py migrate_menu_images
+python manage.py build_menu_thumbnails
 
 python manage.py runserver 0.0.0.0:8000
\ No newline at end of file